@@ -1,11 +1,15 @@
 import math
+import re
+from collections import OrderedDict
 import tkinter as tk
 from tkinter import filedialog, messagebox
 import pandas as pd
 from tkinter import ttk
 import numpy as np
 import matplotlib.pyplot as plt
+from matplotlib.collections import LineCollection
 from datetime import datetime
+from carta_psicrometrica import FondoCartaPsicrometrica
 
 class CalculadoraPropiedades:
     def __init__(self):
@@ -49,6 +53,16 @@ class CalculadoraPropiedades:
 
         return math.exp(ln_pws) / 1000  # Convertir Pa a kPa
 
+    def calcular_pvs_arreglo(self, Tbs):
+        # Versión vectorizada de calcular_pvs: acepta arreglos de cualquier forma
+        Tbs = np.clip(np.asarray(Tbs, dtype=float), -100, 200)
+        Tbs_K = self.Grados_Kelvin(Tbs)
+        ln_hielo = (-5.6745359e3 / Tbs_K + 6.3925247e0 - 9.6778430e-3 * Tbs_K + 6.2215701e-7 * Tbs_K ** 2
+                    + 2.0747825e-9 * Tbs_K ** 3 - 9.4840240e-13 * Tbs_K ** 4 + 4.1635019e0 * np.log(Tbs_K))
+        ln_agua = (-5.8002206e3 / Tbs_K + 1.3914993e0 - 4.8640239e-2 * Tbs_K + 4.1764768e-5 * Tbs_K ** 2
+                   - 1.4452093e-8 * Tbs_K ** 3 + 6.5459673e0 * np.log(Tbs_K))
+        return np.exp(np.where(Tbs <= 0, ln_hielo, ln_agua)) / 1000  # Convertir Pa a kPa
+
     def calcular_pv(self, Hr, pvs2):
         return (Hr / 100) * pvs2
 
@@ -221,6 +235,237 @@ class CalculadoraPropiedades:
             raise ValueError("Error en los valores ingresados. Verifica que Tbs >= Tbh y que las temperaturas estén en rangos razonables.")
 
 
+class GeneradorIsolineas:
+    # Familias de curvas de la carta psicrométrica calculadas en bloque:
+    # cada método devuelve (valores, W) con W de forma (n_valores, n_T) y NaN
+    # donde la curva no está definida (Tbs menor que Tbh o Tpr).
+    def __init__(self, calculadora, presionAt, Tbs_range):
+        self.calculadora = calculadora
+        self.presionAt = presionAt  # kPa
+        self.Tbs = np.asarray(Tbs_range, dtype=float)
+        self.pvs_Tbs = calculadora.calcular_pvs_arreglo(self.Tbs)
+
+    @staticmethod
+    def deduplicar(valores, decimales=2):
+        # Valores casi iguales (iguales al redondear) producen la misma curva
+        valores = np.asarray([v for v in valores if v is not None], dtype=float)
+        valores = valores[np.isfinite(valores)]
+        return np.unique(np.round(valores, decimales))
+
+    def humedad_relativa(self, valores):
+        Hr = self.deduplicar(valores)
+        Pv = (Hr[:, None] / 100) * self.pvs_Tbs[None, :]
+        W = self.calculadora.razon_humedad(Pv * 1000, self.presionAt * 1000)
+        return Hr, W
+
+    def entalpia(self, valores):
+        h = self.deduplicar(valores)
+        W = (h[:, None] - 1.006 * self.Tbs[None, :]) / (2501 + 1.86 * self.Tbs[None, :])
+        return h, W
+
+    def bulbo_humedo(self, valores):
+        Tbh = self.deduplicar(valores)[:, None]
+        pvs_Tbh = self.calculadora.calcular_pvs_arreglo(Tbh) * 1000  # Convertir kPa a Pa
+        Ws_Tbh = self.calculadora.razon_humedad_saturada(pvs_Tbh, self.presionAt * 1000)
+        T = self.Tbs[None, :]
+        W = ((2501 - 2.381 * Tbh) * Ws_Tbh - 1.006 * (T - Tbh)) / (2501 + 1.805 * T - 4.186 * Tbh)
+        return Tbh[:, 0], np.where(T >= Tbh, W, np.nan)
+
+    def punto_rocio(self, valores):
+        Tpr = self.deduplicar(valores)[:, None]
+        Pv = self.calculadora.calcular_pvs_arreglo(Tpr)
+        W = self.calculadora.razon_humedad(Pv * 1000, self.presionAt * 1000)
+        W = np.broadcast_to(W, (len(Tpr), len(self.Tbs)))
+        return Tpr[:, 0], np.where(self.Tbs[None, :] >= Tpr, W, np.nan)
+
+    def volumen_especifico(self, valores):
+        # De v = Ra·T/P·(1 + 1.6078·W)/(1 + W) despejando W
+        v = self.deduplicar(valores, decimales=3)[:, None]
+        a = v * self.presionAt * 1000 / (self.calculadora.Ra * self.calculadora.Grados_Kelvin(self.Tbs[None, :]))
+        return v[:, 0], (a - 1) / (1.6078 - a)
+
+    def saturacion(self):
+        return self.calculadora.razon_humedad(self.pvs_Tbs * 1000, self.presionAt * 1000)
+
+    def segmentos(self, W):
+        # Una polilínea (n, 2) por fila, sin los puntos no definidos
+        lineas = []
+        for fila in W:
+            validos = np.isfinite(fila)
+            lineas.append(np.column_stack((self.Tbs[validos], fila[validos])))
+        return lineas
+
+
+class CursorCarta:
+    # Lectura del estado completo del aire bajo el cursor de la carta. Tbh es
+    # la única propiedad sin fórmula cerrada: al mover el ratón se interpola
+    # en una tabla Tbh(Tbs, W) calculada una vez por presión y rango de ejes
+    # (compartida entre gráficas); el método iterativo exacto sólo se usa al
+    # hacer clic. El texto se redibuja con blitting y los eventos de
+    # movimiento se agrupan a la frecuencia de refresco de la pantalla.
+    tablas = OrderedDict()
+    max_tablas = 8
+    paso_presion = 0.1  # kPa
+    intervalo_ms = 16   # ~60 Hz
+
+    def __init__(self, calculadora, ax, presionAt, T_rango, W_rango):
+        self.calculadora = calculadora
+        self.ax = ax
+        self.canvas = ax.figure.canvas
+        self.presionAt = presionAt  # kPa
+        self.tabla = self.tabla_bulbo_humedo(calculadora, presionAt, T_rango, W_rango)
+        self.texto = ax.text(0.99, 0.02, '', transform=ax.transAxes, ha='right', va='bottom', fontsize=9,
+                             family='monospace', animated=True, zorder=10,
+                             bbox=dict(facecolor='white', alpha=0.85, edgecolor='gray'))
+        self.marca, = ax.plot([], [], marker='+', color='magenta', markersize=12, animated=True, zorder=10)
+        self.fondo = None
+        self.pendiente = None
+        self.temporizador = self.canvas.new_timer(interval=self.intervalo_ms)
+        self.temporizador.single_shot = True
+        self.temporizador.add_callback(self.dibujar_pendiente)
+        # Métodos ligados: quien crea el cursor debe conservar la referencia
+        self.conexiones = [
+            self.canvas.mpl_connect('draw_event', self.al_dibujar),
+            self.canvas.mpl_connect('motion_notify_event', self.al_mover),
+            self.canvas.mpl_connect('button_press_event', self.al_hacer_clic),
+            self.canvas.mpl_connect('axes_leave_event', self.al_salir),
+        ]
+
+    @classmethod
+    def tabla_bulbo_humedo(cls, calculadora, presionAt, T_rango, W_rango, paso_T=0.1, n_W=400):
+        # Rejilla regular Tbh[i_T, i_W]; por encima de la saturación se repite
+        # Tbh = Tbs para que la interpolación junto a la curva siga definida
+        presion = round(round(presionAt / cls.paso_presion) * cls.paso_presion, 6)
+        clave = (presion, tuple(T_rango), tuple(W_rango))
+        if clave in cls.tablas:
+            cls.tablas.move_to_end(clave)
+            return cls.tablas[clave]
+
+        Tbs = np.arange(T_rango[0], T_rango[1] + paso_T / 2, paso_T)
+        W = np.linspace(W_rango[0], W_rango[1], n_W)
+        # W sobre las isolíneas de Tbh (creciente con Tbh para cada Tbs)
+        Tbh = np.arange(T_rango[0] - 40, T_rango[1] + 0.05, 0.05)
+        pvs_Tbh = calculadora.calcular_pvs_arreglo(Tbh)[:, None] * 1000  # Convertir kPa a Pa
+        Ws_Tbh = calculadora.razon_humedad_saturada(pvs_Tbh, presion * 1000)
+        T = Tbs[None, :]
+        Tbh_col = Tbh[:, None]
+        W_iso = ((2501 - 2.381 * Tbh_col) * Ws_Tbh - 1.006 * (T - Tbh_col)) / (2501 + 1.805 * T - 4.186 * Tbh_col)
+        valores = np.full((len(Tbs), n_W), np.nan)
+        for i in range(len(Tbs)):
+            validos = Tbh <= Tbs[i]
+            valores[i] = np.interp(W, W_iso[validos, i], Tbh[validos], left=np.nan, right=Tbs[i])
+
+        tabla = {'Tbs': Tbs, 'W': W, 'Tbh': valores}
+        cls.tablas[clave] = tabla
+        while len(cls.tablas) > cls.max_tablas:
+            cls.tablas.popitem(last=False)
+        return tabla
+
+    def interpolar_tbh(self, Tbs, W):
+        # Interpolación bilineal en la tabla (NaN fuera de ella)
+        Tbs_t, W_t = self.tabla['Tbs'], self.tabla['W']
+        fi = (Tbs - Tbs_t[0]) / (Tbs_t[1] - Tbs_t[0])
+        fj = (W - W_t[0]) / (W_t[1] - W_t[0])
+        if not (0 <= fi <= len(Tbs_t) - 1 and 0 <= fj <= len(W_t) - 1):
+            return float('nan')
+        i = min(int(fi), len(Tbs_t) - 2)
+        j = min(int(fj), len(W_t) - 2)
+        di, dj = fi - i, fj - j
+        t = self.tabla['Tbh']
+        return float((t[i, j] * (1 - di) + t[i + 1, j] * di) * (1 - dj)
+                     + (t[i, j + 1] * (1 - di) + t[i + 1, j + 1] * di) * dj)
+
+    def propiedades(self, Tbs, W, exacto=False):
+        # Estado del aire en (Tbs, W); None por encima de la curva de saturación
+        calc = self.calculadora
+        presion_Pa = self.presionAt * 1000
+        pvs = calc.calcular_pvs(Tbs)
+        Pv = W * presion_Pa / (0.622 + W) / 1000  # kPa
+        if W < 0 or Pv > pvs:
+            return None
+        if exacto:
+            Tbh = calc.bulbo_humedo(presion_Pa, Tbs, W)
+        else:
+            Tbh = self.interpolar_tbh(Tbs, W)
+        return {
+            'Tbs (°C)': Tbs,
+            'W (kg/kg)': W,
+            'φ (%)': Pv / pvs * 100,
+            'Tbh (°C)': Tbh,
+            'Tpr (°C)': calc.temperatura_punto_rocio_old(Tbs, Pv * 1000),
+            'h (kJ/kg)': calc.entalpia(Tbs, W),
+            'v (m³/kg)': calc.volumen_especifico(Tbs, presion_Pa, W),
+        }
+
+    def formatear(self, props, exacto=False):
+        if props is None:
+            return 'Sobre la curva de saturación'
+        formatos = {'W (kg/kg)': '{:.5f}', 'v (m³/kg)': '{:.4f}'}
+        lineas = []
+        for nombre, valor in props.items():
+            texto = '--' if valor is None or valor != valor else formatos.get(nombre, '{:.2f}').format(valor)
+            lineas.append(f'{nombre:<10} {texto:>9}')
+        if exacto:
+            lineas.append('(Tbh exacto)')
+        return '\n'.join(lineas)
+
+    def al_dibujar(self, event):
+        # Fondo sin los artistas animados, para restaurarlo en cada blit
+        self.fondo = self.canvas.copy_from_bbox(self.ax.figure.bbox)
+        self.ax.draw_artist(self.texto)
+        self.ax.draw_artist(self.marca)
+
+    def al_mover(self, event):
+        if event.inaxes is not self.ax or event.xdata is None:
+            return
+        # Se conserva sólo la última posición; el temporizador dibuja a ~60 Hz
+        primera = self.pendiente is None
+        self.pendiente = (event.xdata, event.ydata, False)
+        if primera:
+            self.temporizador.start()
+
+    def al_hacer_clic(self, event):
+        if event.inaxes is not self.ax or event.xdata is None or event.button != 1:
+            return
+        if self.canvas.toolbar is not None and self.canvas.toolbar.mode:
+            return  # zoom o desplazamiento activos
+        self.temporizador.stop()
+        self.pendiente = None
+        self.mostrar(event.xdata, event.ydata, exacto=True)
+
+    def al_salir(self, event):
+        if event.inaxes is self.ax:
+            self.temporizador.stop()
+            self.pendiente = None
+            self.texto.set_text('')
+            self.marca.set_data([], [])
+            self.blit()
+
+    def dibujar_pendiente(self):
+        if self.pendiente is not None:
+            Tbs, W, exacto = self.pendiente
+            self.pendiente = None
+            self.mostrar(Tbs, W, exacto)
+
+    def mostrar(self, Tbs, W, exacto=False):
+        self.texto.set_text(self.formatear(self.propiedades(Tbs, W, exacto), exacto))
+        self.marca.set_data([Tbs], [W])
+        self.blit()
+
+    def blit(self):
+        if self.fondo is None:
+            return
+        self.canvas.restore_region(self.fondo)
+        self.ax.draw_artist(self.texto)
+        self.ax.draw_artist(self.marca)
+        self.canvas.blit(self.ax.figure.bbox)
+
+    def desconectar(self):
+        self.temporizador.stop()
+        for cid in self.conexiones:
+            self.canvas.mpl_disconnect(cid)
+
+
 
 
 
@@ -238,6 +483,16 @@ class InterfazGrafica:
         self.delay_timer = None
         self.calculo_automatico = False  # Ahora inicia en modo manual
         self.last_calculated_vars = {}  # Almacenar las últimas variables calculadas
+        self.columna_orden = None
+        self.orden_descendente = False
+        self.expresion_filtro = ''  # Filtro activo de la tabla ('' sin filtro)
+        # Valores de cada fila por item, en orden de captura y con las filas ocultas por el
+        # filtro: es la fuente de los datos para guardar, graficar, numerar, ordenar y filtrar
+        self.filas_tabla = {}
+        self.columnas_cache = {}  # Columna -> arreglo con sus valores en orden de captura
+        self.ordenes_cache = {}  # Columna -> argsort de esa columna
+        self.fondos_carta = FondoCartaPsicrometrica(calculadora, factor_presion=1000)  # Fondos de la carta por presión y rango
+        self.cursor_carta = None  # Lectura bajo el cursor de la última carta (conserva sus callbacks)
 
     def iniciar_interfaz(self):
         self.root = tk.Tk()
@@ -349,6 +604,24 @@ class InterfazGrafica:
         boton_climograma = ttk.Button(frame_botones, text="Graficar Climograma o Temp&Humed", command=self.graficar_climograma)
         boton_climograma.pack(side='left', padx=5)
 
+        # Barra de filtro, p. ej. "Tbs > 30 and φ > 80"
+        boton_quitar_filtro = ttk.Button(frame_botones, text="Quitar Filtro", command=self.quitar_filtro)
+        boton_quitar_filtro.pack(side='right', padx=5)
+
+        boton_filtrar = ttk.Button(frame_botones, text="Filtrar", command=self.aplicar_filtro)
+        boton_filtrar.pack(side='right', padx=5)
+
+        self.filtro_var = tk.StringVar()
+        entrada_filtro = ttk.Entry(frame_botones, textvariable=self.filtro_var, width=40)
+        entrada_filtro.pack(side='right', padx=5)
+        entrada_filtro.bind('<Return>', lambda e: self.aplicar_filtro())
+
+        ttk.Label(frame_botones, text="Filtro:").pack(side='right', padx=5)
+
+        # Aviso breve de lo copiado al portapapeles (sin ventana modal)
+        self.etiqueta_copia = ttk.Label(frame_botones, text="")
+        self.etiqueta_copia.pack(side='left', padx=10)
+
     def crear_leyenda(self):
         descripciones = {
             "Altura (m)": "Altura sobre el nivel del mar en metros.",
@@ -394,9 +667,9 @@ class InterfazGrafica:
         columnas = ("Eliminar", "#", "Fecha", "Hora", "Altura (m)", "Tbs (°C)", "Tbh (°C)", "φ (%)",
                     "Tpr (°C)", "Pvs (kPa)", "Pv (kPa)", "Ws (kg_vp/kg_AS)",
                     "W (kg_vp/kg_AS)", "μ [G_sat] (%)", "Veh (m³/kg_AS)", "h (kJ/kg_AS)")
-        self.tabla = ttk.Treeview(self.frame_tabla, columns=columnas, show='headings', selectmode='browse')
+        self.tabla = ttk.Treeview(self.frame_tabla, columns=columnas, show='headings', selectmode='extended')
         for col in columnas:
-            self.tabla.heading(col, text=col)
+            self.tabla.heading(col, text=col, command=lambda c=col: self.ordenar_tabla(c))
             self.tabla.column(col, anchor='center')
 
         # Añadir barras de desplazamiento
@@ -412,6 +685,11 @@ class InterfazGrafica:
         # Añadir evento para doble clic
         self.tabla.bind("<Double-1>", self.on_double_click)
 
+        # Copiar las filas seleccionadas (Shift/Ctrl + clic para rangos) como TSV
+        self.tabla.bind("<Control-c>", lambda e: self.copiar_filas_seleccionadas())
+        self.tabla.bind("<Control-C>", lambda e: self.copiar_filas_seleccionadas())
+        self.tabla.bind("<Control-a>", lambda e: self.tabla.selection_set(self.tabla.get_children()))
+
     def limpiar_entradas(self):
         # Limpiar los campos de entrada y desmarcar los checkboxes
         for prop in self.variables:
@@ -528,7 +806,7 @@ class InterfazGrafica:
             messagebox.showwarning("Advertencia", "Debe ingresar y seleccionar la Altura y al menos dos variables psicrométricas.")
 
     def agregar_a_tabla(self, altura, resultados):
-        idx = len(self.tabla.get_children()) + 1
+        idx = len(self.filas_tabla) + 1
         fecha_actual = datetime.now().strftime('%Y-%m-%d')
         hora_actual = datetime.now().strftime('%H:%M:%S')
         valores = ("Eliminar", idx, fecha_actual, hora_actual, altura,
@@ -543,13 +821,19 @@ class InterfazGrafica:
                    resultados.get("μ [G_sat] (%)", ""),
                    resultados.get("Veh (m³/kg_AS)", ""),
                    resultados.get("h (kJ/kg_AS)", ""))
-        self.tabla.insert("", "end", values=valores)
+        item = self.tabla.insert("", "end", values=valores)
+        self.filas_tabla[item] = valores
+        self.invalidar_columnas()
+        # La fila nueva pasa por el filtro y el orden activos
+        if self.expresion_filtro or self.columna_orden is not None:
+            self.mostrar_filas()
 
     def guardar_excel(self):
         try:
             ruta_guardado = filedialog.asksaveasfilename(defaultextension=".xlsx", filetypes=[("Excel Files", "*.xlsx")], parent=self.root)
             if ruta_guardado:
-                datos_guardar = [self.tabla.item(item)['values'][1:] for item in self.tabla.get_children()]
+                # Todas las filas capturadas, también las ocultas por el filtro
+                datos_guardar = [valores[1:] for valores in self.filas_tabla.values()]
                 columnas = ["#", "Fecha", "Hora", "Altura (m)", "Tbs (°C)", "Tbh (°C)", "φ (%)",
                             "Tpr (°C)", "Pvs (kPa)", "Pv (kPa)", "Ws (kg_vp/kg_AS)",
                             "W (kg_vp/kg_AS)", "μ [G_sat] (%)", "Veh (m³/kg_AS)", "h (kJ/kg_AS)"]
@@ -572,32 +856,160 @@ class InterfazGrafica:
                 respuesta = messagebox.askyesno("Confirmación", "¿Desea eliminar esta fila?")
                 if respuesta:
                     self.tabla.delete(item)
+                    self.filas_tabla.pop(item, None)
                     self.actualizar_indices_tabla()
+                    if self.expresion_filtro or self.columna_orden is not None:
+                        self.mostrar_filas()
             else:
                 # Si es cualquier otra columna, copiar contenido al portapapeles
-                valor = self.tabla.item(item, 'values')[col_index]
+                valor = self.filas_tabla[item][col_index]
                 self.root.clipboard_clear()
                 self.root.clipboard_append(str(valor))
-                messagebox.showinfo("Copiado", f"Se copió al portapapeles: {valor}")
+                self.avisar_copia(f"Copiado: {valor}")
+
+    def copiar_filas_seleccionadas(self):
+        # Copiar las filas seleccionadas como texto separado por tabuladores, en un solo bloque
+        seleccion = self.tabla.selection()
+        if not seleccion:
+            return "break"
+        columnas = self.tabla["columns"][1:]
+        lineas = ['\t'.join(columnas)]
+        lineas.extend('\t'.join(map(str, self.filas_tabla[item][1:])) for item in seleccion)
+        self.root.clipboard_clear()
+        self.root.clipboard_append('\n'.join(lineas) + '\n')
+        self.avisar_copia(f"{len(seleccion)} filas copiadas")
+        return "break"
+
+    def avisar_copia(self, texto):
+        self.etiqueta_copia.config(text=texto)
+        self.root.after(3000, lambda: self.etiqueta_copia.config(text=""))
+
+    # Alias aceptados en la barra de filtro
+    ALIAS_FILTRO = {
+        "Altura": "Altura (m)", "Tbs": "Tbs (°C)", "Tbh": "Tbh (°C)", "φ": "φ (%)",
+        "Hr": "φ (%)", "HR": "φ (%)", "Tpr": "Tpr (°C)", "Pvs": "Pvs (kPa)",
+        "Pv": "Pv (kPa)", "Ws": "Ws (kg_vp/kg_AS)", "W": "W (kg_vp/kg_AS)",
+        "μ": "μ [G_sat] (%)", "Veh": "Veh (m³/kg_AS)", "h": "h (kJ/kg_AS)"
+    }
+
+    OPERADORES_FILTRO = {
+        '>=': np.greater_equal, '<=': np.less_equal, '==': np.equal,
+        '!=': np.not_equal, '>': np.greater, '<': np.less, '=': np.equal
+    }
+
+    def invalidar_columnas(self):
+        # Las filas cambiaron: los arreglos por columna y los órdenes se recalculan al usarse
+        self.columnas_cache = {}
+        self.ordenes_cache = {}
+
+    def columna_numerica(self, col):
+        # Valores de una columna como arreglo numérico (NaN si no es número), en orden de captura
+        if col not in self.columnas_cache:
+            if col in ("Fecha", "Hora"):
+                # Fecha y hora juntas: el texto 'AAAA-MM-DD HH:MM:SS' ordena cronológicamente
+                valores = np.array([f"{fila[2]} {fila[3]}" for fila in self.filas_tabla.values()])
+            else:
+                j = self.tabla["columns"].index(col)
+                valores = pd.to_numeric(pd.Series([fila[j] for fila in self.filas_tabla.values()], dtype=object),
+                                        errors='coerce').to_numpy(dtype=float)
+            self.columnas_cache[col] = valores
+        return self.columnas_cache[col]
+
+    def orden_columna(self, col):
+        # argsort estable de una columna, guardado hasta que cambien las filas
+        if col not in self.ordenes_cache:
+            self.ordenes_cache[col] = np.argsort(self.columna_numerica(col), kind='stable')
+        return self.ordenes_cache[col]
+
+    def ordenar_tabla(self, col):
+        # Ordenar por la columna; un segundo clic invierte el sentido
+        if col == "Eliminar":
+            return
+        if self.columna_orden == col:
+            self.orden_descendente = not self.orden_descendente
+        else:
+            self.columna_orden = col
+            self.orden_descendente = False
+
+        self.mostrar_filas()
+
+        for c in self.tabla["columns"]:
+            flecha = (' ▼' if self.orden_descendente else ' ▲') if c == col else ''
+            self.tabla.heading(c, text=c + flecha)
+
+    def mostrar_filas(self):
+        # Muestra las filas que pasan el filtro, en el orden activo, con una sola llamada al Treeview
+        items = np.array(list(self.filas_tabla), dtype=object)
+        if self.columna_orden is not None:
+            orden = self.orden_columna(self.columna_orden)
+            if self.orden_descendente:
+                orden = orden[::-1]
+        else:
+            orden = np.arange(len(items))
+        if self.expresion_filtro:
+            orden = orden[self.evaluar_filtro(self.expresion_filtro)[orden]]
+        self.tabla.set_children('', *items[orden])
+
+    def aplicar_filtro(self):
+        # Mostrar sólo las filas que cumplen la expresión del filtro
+        expresion = self.filtro_var.get().strip()
+        if expresion:
+            try:
+                self.evaluar_filtro(expresion)
+            except ValueError as e:
+                messagebox.showerror("Error", f"Filtro no válido: {e}")
+                return
+        self.expresion_filtro = expresion
+        self.mostrar_filas()
+
+    def quitar_filtro(self):
+        self.filtro_var.set('')
+        self.expresion_filtro = ''
+        self.mostrar_filas()
+
+    def evaluar_filtro(self, expresion):
+        # Expresión del tipo "Tbs > 30 and φ > 80" evaluada sobre columnas completas (orden de captura)
+        mascara_o = None
+        for parte_o in re.split(r'\s+(?:or|o)\s+', expresion):
+            mascara_y = None
+            for condicion in re.split(r'\s+(?:and|y)\s+', parte_o):
+                coincidencia = re.fullmatch(r'(.+?)\s*(>=|<=|==|!=|>|<|=)\s*(.+)', condicion.strip())
+                if not coincidencia:
+                    raise ValueError(f"condición no válida '{condicion}'")
+                campo, operador, valor = (g.strip() for g in coincidencia.groups())
+                col = self.ALIAS_FILTRO.get(campo, campo)
+                if col not in self.tabla["columns"]:
+                    raise ValueError(f"columna desconocida '{campo}'")
+                try:
+                    referencia = float(valor)
+                except ValueError:
+                    raise ValueError(f"valor no numérico '{valor}'")
+                m = self.OPERADORES_FILTRO[operador](self.columna_numerica(col), referencia)
+                mascara_y = m if mascara_y is None else (mascara_y & m)
+            mascara_o = mascara_y if mascara_o is None else (mascara_o | mascara_y)
+        return mascara_o
 
     def actualizar_indices_tabla(self):
-        # Actualizar los índices de la tabla después de eliminar una fila
-        for idx, item in enumerate(self.tabla.get_children()):
-            valores = self.tabla.item(item, 'values')
-            nuevos_valores = (valores[0], idx + 1) + valores[2:]
-            self.tabla.item(item, values=nuevos_valores)
-            
+        # Renumerar todas las filas en orden de captura (también las ocultas) después de eliminar una
+        for idx, (item, valores) in enumerate(self.filas_tabla.items()):
+            if valores[1] != idx + 1:
+                nuevos_valores = (valores[0], idx + 1) + tuple(valores[2:])
+                self.tabla.item(item, values=nuevos_valores)
+                self.filas_tabla[item] = nuevos_valores
+        self.invalidar_columnas()
+
     def graficar_psicrometrica(self):
         try:
             # Verificar que haya datos en la tabla
-            datos_tabla = [self.tabla.item(item)['values'] for item in self.tabla.get_children()]
+            datos_tabla = list(self.filas_tabla.values())
             if not datos_tabla:
                 raise ValueError("No hay datos en la tabla para graficar.")
 
-            # Obtener rangos de Tbs y W basados en los datos
-            Tbs_min = min(float(row[5]) for row in datos_tabla if row[5] != '')
-            Tbs_max = max(float(row[5]) for row in datos_tabla if row[5] != '')
-            Tbs_range = np.linspace(Tbs_min - 5, Tbs_max + 5, 200)
+            filas = [row for row in datos_tabla if row[5] != '' and row[12] != '']
+            T_data = [float(row[5]) for row in filas]  # Tbs
+            W_data = [float(row[12]) for row in filas]  # W
+            if not T_data:
+                raise ValueError("No hay datos en la tabla para graficar.")
 
             # Usar la presión atmosférica correspondiente a la altura promedio de los datos
             alturas = [float(row[4]) for row in datos_tabla if row[4] != '']
@@ -609,100 +1021,80 @@ class InterfazGrafica:
 
             fig, ax = plt.subplots(figsize=(12, 8))
 
-            Hr_values = set()
-            Tbh_values = set()
-            Tpr_values = set()
-            h_values = set()
-            if datos_tabla:
-                T_data = []
-                W_data = []
-                for data_row in datos_tabla:
-                    if data_row[5] != '' and data_row[12] != '':
-                        T = float(data_row[5])  # Tbs
-                        W = float(data_row[12])  # W
-                        T_data.append(T)
-                        W_data.append(W)
-                        Hr = float(data_row[7])  # φ (%)
-                        Tbh = float(data_row[6])  # Tbh
-                        Tpr = float(data_row[8])  # Tpr
-                        h = float(data_row[15])  # h
-                        Hr_values.add(Hr)
-                        Tbh_values.add(Tbh)
-                        Tpr_values.add(Tpr)
-                        h_values.add(h)
-                # Dibujar los puntos una sola vez
-                ax.scatter(T_data, W_data, color='black', marker='o', label='Datos Ingresados')
-
-            # Dibujar líneas de humedad relativa constante
-            Hr_values.update([10.0, 100.0])  # Añadir 10% y 100% como referencia
-            for Hr in Hr_values:
-                W_Hr = []
-                for T in Tbs_range:
-                    pvs = self.calculadora.calcular_pvs(T)
-                    Pv = (Hr / 100) * pvs
-                    W_point = self.calculadora.razon_humedad(Pv * 1000, presionAt * 1000)
-                    W_Hr.append(W_point)
-                ax.plot(Tbs_range, W_Hr, label=f'HR {Hr:.2f}%')
-
-            # Dibujar líneas de entalpía constante
-            for h in h_values:
-                W_h = []
-                for T in Tbs_range:
-                    W_point = (h - 1.006 * T) / (2501 + 1.86 * T)
-                    W_h.append(W_point)
-                ax.plot(Tbs_range, W_h, linestyle='--', color='red', linewidth=0.5)
-                ax.text(Tbs_range[-1], W_h[-1], f'{h:.2f} kJ/kg', color='red', fontsize=8)
-
-            # Dibujar líneas de temperatura de bulbo húmedo constante
-            for Tbh in Tbh_values:
-                W_Tbh = []
-                for T in Tbs_range:
-                    if T >= Tbh:
-                        pvs_Tbh = self.calculadora.calcular_pvs(Tbh) * 1000  # Convertir kPa a Pa
-                        Ws_Tbh = self.calculadora.razon_humedad_saturada(pvs_Tbh, presionAt * 1000)
-                        numerator = (2501 - 2.381 * Tbh) * Ws_Tbh - 1.006 * (T - Tbh)
-                        denominator = 2501 + 1.805 * T - 4.186 * Tbh
-                        W_point = numerator / denominator
-                        W_Tbh.append(W_point)
-                    else:
-                        W_Tbh.append(None)
-                ax.plot(Tbs_range, W_Tbh, linestyle='-.', color='green', linewidth=0.5)
-                # Mover el texto al lado izquierdo
-                for idx, W_val in enumerate(W_Tbh):
-                    if W_val is not None:
-                        ax.text(Tbs_range[idx], W_val, f'Tbh {Tbh:.2f}°C', color='green', fontsize=8, verticalalignment='bottom')
-                        break
-
-            # Dibujar líneas de temperatura de punto de rocío constante
-            for Tpr in Tpr_values:
-                W_Tpr = []
-                for T in Tbs_range:
-                    if T >= Tpr:
-                        pvs_Tpr = self.calculadora.calcular_pvs(Tpr)
-                        Pv = pvs_Tpr
-                        W_point = self.calculadora.razon_humedad(Pv * 1000, presionAt * 1000)
-                        W_Tpr.append(W_point)
-                    else:
-                        W_Tpr.append(None)
-                ax.plot(Tbs_range, W_Tpr, linestyle=':', color='blue', linewidth=0.5)
-                # Ajustar la posición de la etiqueta para evitar superposición
-                label_pos = Tbs_range[-1] - 5  # Mover un poco a la izquierda
-                ax.text(label_pos, W_Tpr[-1], f'Tpr {Tpr:.2f}°C', color='blue', fontsize=8)
+            # El fondo (curvas fijas) sale del caché; sólo los datos se dibujan cada vez
+            T_rango, W_rango = self.fondos_carta.rango_ejes(T_data, W_data)
+            self.fondos_carta.dibujar(ax, presionAt, T_rango, W_rango)
+
+            # Dibujar los puntos una sola vez
+            ax.scatter(T_data, W_data, color='black', marker='o', label='Datos Ingresados', zorder=3)
+
+            # Curvas que pasan por las filas seleccionadas en la tabla
+            seleccion = [self.filas_tabla[item] for item in self.tabla.selection()]
+            seleccion = [row for row in seleccion if row[5] != '' and row[12] != '']
+            if seleccion:
+                self.dibujar_isolineas_filas(ax, seleccion, presionAt, T_rango)
 
             # Configurar ejes
             ax.set_xlabel('Temperatura de Bulbo Seco Tbs (°C)')
             ax.set_ylabel('Razón de Humedad W (kg_vp/kg_AS)')
             ax.set_title('Carta Psicrométrica')
             ax.grid(True)
-            ax.legend()
+            ax.legend(loc='upper left')
             plt.tight_layout()
+
+            # Lectura del estado del aire bajo el cursor (clic: Tbh exacto)
+            if self.cursor_carta is not None:
+                self.cursor_carta.desconectar()
+            self.cursor_carta = CursorCarta(self.calculadora, ax, presionAt, T_rango, W_rango)
             plt.show()
         except Exception as e:
             messagebox.showerror("Error", f"Error al generar el gráfico psicrométrico: {e}")
 
+    def dibujar_isolineas_filas(self, ax, filas, presionAt, T_rango):
+        # Curvas de HR, h, Tbh y Tpr constantes por los puntos indicados
+        Tbs_range = np.linspace(T_rango[0], T_rango[1], 200)
+        isolineas = GeneradorIsolineas(self.calculadora, presionAt, Tbs_range)
+        Hr_values = [float(row[7]) for row in filas]  # φ (%)
+        Tbh_values = [float(row[6]) for row in filas]  # Tbh
+        Tpr_values = [float(row[8]) for row in filas]  # Tpr
+        h_values = [float(row[15]) for row in filas]  # h
+
+        # Dibujar líneas de humedad relativa constante
+        Hr_unicos, W_Hr = isolineas.humedad_relativa(Hr_values)
+        ax.add_collection(LineCollection(isolineas.segmentos(W_Hr), colors='tab:blue', linewidths=1.2, zorder=2))
+        for Hr, W_fila in zip(Hr_unicos, W_Hr):
+            ax.text(Tbs_range[-1], W_fila[-1], f'HR {Hr:.2f}%', color='tab:blue', fontsize=8, clip_on=True)
+
+        # Dibujar líneas de entalpía constante
+        h_unicos, W_h = isolineas.entalpia(h_values)
+        ax.add_collection(LineCollection(isolineas.segmentos(W_h), colors='red', linewidths=1,
+                                         linestyles='--', zorder=2))
+        for h, W_fila in zip(h_unicos, W_h):
+            ax.text(Tbs_range[-1], W_fila[-1], f'{h:.2f} kJ/kg', color='red', fontsize=8, clip_on=True)
+
+        # Dibujar líneas de temperatura de bulbo húmedo constante
+        Tbh_unicos, W_Tbh = isolineas.bulbo_humedo(Tbh_values)
+        ax.add_collection(LineCollection(isolineas.segmentos(W_Tbh), colors='green', linewidths=1,
+                                         linestyles='-.', zorder=2))
+        # Etiqueta en el primer punto definido de cada curva (lado izquierdo)
+        for Tbh, W_fila in zip(Tbh_unicos, W_Tbh):
+            validos = np.flatnonzero(np.isfinite(W_fila))
+            if len(validos):
+                ax.text(Tbs_range[validos[0]], W_fila[validos[0]], f'Tbh {Tbh:.2f}°C', color='green',
+                        fontsize=8, verticalalignment='bottom', clip_on=True)
+
+        # Dibujar líneas de temperatura de punto de rocío constante
+        Tpr_unicos, W_Tpr = isolineas.punto_rocio(Tpr_values)
+        ax.add_collection(LineCollection(isolineas.segmentos(W_Tpr), colors='blue', linewidths=1,
+                                         linestyles=':', zorder=2))
+        # Ajustar la posición de la etiqueta para evitar superposición
+        label_pos = Tbs_range[-1] - 5  # Mover un poco a la izquierda
+        for Tpr, W_fila in zip(Tpr_unicos, W_Tpr):
+            ax.text(label_pos, W_fila[-1], f'Tpr {Tpr:.2f}°C', color='blue', fontsize=8, clip_on=True)
+
     def graficar_climograma(self):
         try:
-            datos_tabla = [self.tabla.item(item)['values'] for item in self.tabla.get_children()]
+            datos_tabla = list(self.filas_tabla.values())
             if not datos_tabla:
                 raise ValueError("No hay datos en la tabla para graficar.")
 
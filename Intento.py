@@ -5,10 +5,12 @@ import pandas as pd
 from tkinter import ttk
 import numpy as np
 import matplotlib.pyplot as plt
-from scipy.interpolate import griddata
+from scipy.spatial import Delaunay
 import openpyxl
 import tkinter.simpledialog as simpledialog  # Para cuadros de diálogo
 from datetime import datetime
+from collections import OrderedDict
+from carta_psicrometrica import FondoCartaPsicrometrica
 
 import math
 import numpy as np
@@ -53,6 +55,16 @@ class CalculadoraPropiedades:
 
         return math.exp(ln_pws)
 
+    def calcular_pvs_arreglo(self, Tbs):
+        # Versión vectorizada de calcular_pvs (Pa) para arreglos de cualquier forma
+        Tbs = np.clip(np.asarray(Tbs, dtype=float), -100, 200)
+        Tbs_K = self.Grados_Kelvin(Tbs)
+        ln_hielo = (-5.6745359e3 / Tbs_K + 6.3925247e0 - 9.6778430e-3 * Tbs_K + 6.2215701e-7 * Tbs_K ** 2
+                    + 2.0747825e-9 * Tbs_K ** 3 - 9.4840240e-13 * Tbs_K ** 4 + 4.1635019e0 * np.log(Tbs_K))
+        ln_agua = (-5.8002206e3 / Tbs_K + 1.3914993e0 - 4.8640239e-2 * Tbs_K + 4.1764768e-5 * Tbs_K ** 2
+                   - 1.4452093e-8 * Tbs_K ** 3 + 6.5459673e0 * np.log(Tbs_K))
+        return np.exp(np.where(Tbs <= 0, ln_hielo, ln_agua))
+
     def calcular_pv(self, Hr, pvs2):
         return Hr * pvs2
 
@@ -121,6 +133,93 @@ class CalculadoraPropiedades:
         else:
             raise ValueError("Error en los valores ingresados. Verifica que Tbs >= Tbh y que las temperaturas estén en rangos razonables.")
 
+class InterpoladorTriangulado:
+    # Interpolación lineal sobre una triangulación de Delaunay construida una
+    # sola vez por conjunto de puntos (lo mismo que griddata(..., 'linear'),
+    # que vuelve a triangular en cada llamada). Los pesos baricéntricos de cada
+    # malla se guardan, así que interpolar otra variable sobre la misma malla
+    # es sólo una suma ponderada.
+    def __init__(self, puntos):
+        self.puntos = np.asarray(puntos, dtype=float)
+        self.triangulacion = Delaunay(self.puntos)
+        self.pesos_malla = {}
+
+    def pesos(self, grid_x, grid_y):
+        clave = (grid_x.shape, grid_x.min(), grid_x.max(), grid_y.min(), grid_y.max())
+        if clave not in self.pesos_malla:
+            xi = np.column_stack((grid_x.ravel(), grid_y.ravel()))
+            simplex = self.triangulacion.find_simplex(xi)
+            dentro = simplex >= 0
+            transformacion = self.triangulacion.transform[simplex[dentro]]
+            b = np.einsum('ijk,ik->ij', transformacion[:, :2], xi[dentro] - transformacion[:, 2])
+            pesos = np.column_stack((b, 1 - b.sum(axis=1)))
+            vertices = self.triangulacion.simplices[simplex[dentro]]
+            self.pesos_malla[clave] = (dentro, vertices, pesos)
+        return self.pesos_malla[clave]
+
+    def interpolar(self, valores, grid_x, grid_y):
+        # Valores en la malla (NaN fuera de la envolvente convexa de los puntos)
+        dentro, vertices, pesos = self.pesos(grid_x, grid_y)
+        valores = np.asarray(valores, dtype=float)
+        z = np.full(grid_x.size, np.nan)
+        z[dentro] = np.einsum('ij,ij->i', valores[vertices], pesos)
+        return z.reshape(grid_x.shape)
+
+class PiramideAgregados:
+    # Media, mínimo, máximo y conteo de cada columna numérica a 10 min, 1 h,
+    # 1 día y 1 semana (desde el lunes), sólo para los intervalos con datos.
+    # Sólo el primer nivel recorre los registros: los siguientes combinan los
+    # agregados del anterior, porque los intervalos están anidados.
+    NIVELES = OrderedDict([
+        ('10min', pd.Timedelta('10min')),
+        ('1h', pd.Timedelta('1h')),
+        ('1D', pd.Timedelta('1D')),
+        ('1W', pd.Timedelta('7D')),
+    ])
+    ORIGEN_SEMANAS = pd.Timestamp('1970-01-05').value  # lunes
+
+    def __init__(self, datos):
+        # datos: DataFrame con índice de fechas (se ignoran las filas sin fecha)
+        datos = datos[datos.index.notna()].sort_index(kind='stable')
+        self.nombre_indice = datos.index.name
+        self.columnas = [col for col in datos.columns
+                         if pd.api.types.is_numeric_dtype(datos[col]) and not pd.api.types.is_bool_dtype(datos[col])]
+        tiempos = pd.DatetimeIndex(datos.index).to_numpy(dtype='datetime64[ns]').view('int64')
+        valores = datos[self.columnas].to_numpy(dtype=float)
+        validos = ~np.isnan(valores)
+        suma = np.where(validos, valores, 0.0)
+        conteo = validos.astype(np.int64)
+        minimo = maximo = valores
+
+        self.niveles = OrderedDict()
+        for nombre, ancho in self.NIVELES.items():
+            origen = self.ORIGEN_SEMANAS if nombre == '1W' else 0
+            claves = (tiempos - origen) // ancho.value
+            inicios = np.flatnonzero(np.r_[True, claves[1:] != claves[:-1]]) if len(claves) else np.array([], int)
+            if len(inicios):
+                suma = np.add.reduceat(suma, inicios, axis=0)
+                conteo = np.add.reduceat(conteo, inicios, axis=0)
+                minimo = np.fmin.reduceat(minimo, inicios, axis=0)
+                maximo = np.fmax.reduceat(maximo, inicios, axis=0)
+            tiempos = claves[inicios] * ancho.value + origen
+            with np.errstate(invalid='ignore', divide='ignore'):
+                media = suma / conteo
+            self.niveles[nombre] = {'tiempo': tiempos, 'mean': media, 'min': minimo, 'max': maximo, 'count': conteo}
+
+    def tabla(self, nombre, estadistica='mean'):
+        # DataFrame con una estadística de todas las columnas, indexado por el inicio de cada intervalo
+        nivel = self.niveles[nombre]
+        indice = pd.DatetimeIndex(nivel['tiempo'].view('datetime64[ns]'), name=self.nombre_indice)
+        return pd.DataFrame(nivel[estadistica], index=indice, columns=self.columnas)
+
+    def elegir_nivel(self, max_puntos, niveles=None):
+        # Nivel más detallado con a lo sumo max_puntos intervalos
+        niveles = list(self.niveles) if niveles is None else niveles
+        for nombre in niveles:
+            if len(self.niveles[nombre]['tiempo']) <= max_puntos:
+                return nombre
+        return niveles[-1]
+
 class ManejoDatos:
     def cargar_archivo(self, ruta_archivo):
         try:
@@ -214,10 +313,10 @@ class ManejoDatos:
             # Eliminar filas con valores NaN en 'Temperatura', 'Humedad' y 'Altura'
             df_cleaned.dropna(subset=['Temperatura', 'Humedad', 'Altura'], inplace=True)
 
-            # Resampleo diario para el climograma
-            df_daily_avg = df_cleaned.resample('D').mean()
+            # Agregados por 10 min, hora, día y semana en una sola pasada (climograma y promedios horarios)
+            self.piramide = PiramideAgregados(df_cleaned)
 
-            df_hourly_avg = df_cleaned.resample('h').mean()
+            df_hourly_avg = self.piramide.tabla('1h').asfreq('h')
             df_interpolated = df_hourly_avg.interpolate(method='linear')
             df_interpolated_reset = df_interpolated.reset_index()
 
@@ -232,9 +331,6 @@ class ManejoDatos:
             resultados = df_interpolated_reset.apply(self.calcular_propiedades_fila, axis=1)
             df_final = pd.concat([df_interpolated_reset.reset_index(drop=True), resultados], axis=1)
 
-            # Guardar df_daily_avg para el climograma
-            self.df_daily_avg = df_daily_avg.reset_index()
-
             return df_final
 
         except Exception as e:
@@ -322,7 +418,11 @@ class InterfazGrafica:
         self.datos_excel = None
         self.datos_promedio = None
         self.root = None
-        self.df_daily_avg = None  # Para el climograma
+        self.piramide = None  # Agregados por 10 min, hora, día y semana de los datos cargados (climograma)
+        self.fondos_carta = FondoCartaPsicrometrica(calculadora, factor_presion=1)  # Fondos de la carta por presión y rango
+        self.version_datos = 0  # Aumenta con cada cambio de los datos graficables
+        self.interpolador = None  # Triangulación de la versión actual de los datos
+        self.version_interpolador = None
 
     def iniciar_interfaz(self):
         self.root = tk.Tk()
@@ -355,6 +455,12 @@ class InterfazGrafica:
         boton_psicrometrica = ttk.Button(frame_botones, text="Graficar Psicrométrica", command=self.graficar_psicrometrica)
         boton_psicrometrica.pack(side='left', padx=5)
 
+        # Variable a interpolar en el contorno de la carta
+        self.variable_contorno = tk.StringVar(value='φ (%)')
+        combo_contorno = ttk.Combobox(frame_botones, textvariable=self.variable_contorno, state='readonly', width=14,
+                                      values=['φ (%)', 'h (kJ/kg_AS)', 'Tbh (°C)', 'Hora del día'])
+        combo_contorno.pack(side='left', padx=5)
+
         boton_climograma = ttk.Button(frame_botones, text="Graficar Climograma", command=self.graficar_climograma)
         boton_climograma.pack(side='left', padx=5)
 
@@ -389,10 +495,11 @@ class InterfazGrafica:
         try:
             self.datos_excel = None  # Resetear variables
             self.datos_promedio = None
-            self.df_daily_avg = None
+            self.piramide = None
             self.ruta_excel = filedialog.askopenfilename(title="Seleccionar archivo Excel", filetypes=[("Archivos Excel", "*.xlsx *.xls")], parent=self.root)
             if self.ruta_excel:
                 self.datos_excel = self.manejo_datos.cargar_excel(self.ruta_excel)
+                self.version_datos += 1
                 if self.datos_excel is not None and not self.datos_excel.empty:
                     # Limpiar la tabla antes de cargar nuevos datos
                     for row in self.tabla.get_children():
@@ -408,8 +515,8 @@ class InterfazGrafica:
                                    row['μ [G_sat]'], row['Veh (m³/kg_AS)'], row['h (kJ/kg_AS)']]
                         self.tabla.insert("", "end", values=valores)
 
-                    # Guardar df_daily_avg para el climograma
-                    self.df_daily_avg = self.manejo_datos.df_daily_avg
+                    # Agregados para el climograma, calculados al cargar
+                    self.piramide = self.manejo_datos.piramide
                 else:
                     messagebox.showwarning("Advertencia", "El archivo no pudo ser cargado o está vacío.")
             else:
@@ -421,10 +528,11 @@ class InterfazGrafica:
         try:
             self.datos_excel = None  # Resetear variables
             self.datos_promedio = None
-            self.df_daily_avg = None
+            self.piramide = None
             ruta_archivo = filedialog.askopenfilename(title="Seleccionar archivo Excel", filetypes=[("Archivos Excel", "*.xlsx *.xls")], parent=self.root)
             if ruta_archivo:
                 self.datos_promedio = self.calcular_promedio_intervalo_10_minutos(ruta_archivo)
+                self.version_datos += 1
                 if self.datos_promedio is not None and not self.datos_promedio.empty:
                     # Calcular las propiedades psicrométricas
                     resultados = self.datos_promedio.apply(lambda row: self.calcular_resultados_fila_desde_Tbs_Tbh(row), axis=1)
@@ -434,12 +542,6 @@ class InterfazGrafica:
 
                     for idx, resultado in enumerate(resultados.values, start=1):
                         self.tabla.insert("", "end", values=[idx] + list(resultado))
-
-                    # Resampleo diario para el climograma
-                    self.df_daily_avg = self.datos_promedio.copy()
-                    self.df_daily_avg['Fecha'] = pd.to_datetime(self.df_daily_avg['Fecha'])
-                    self.df_daily_avg.set_index('Fecha', inplace=True)
-                    self.df_daily_avg = self.df_daily_avg.resample('D').mean().reset_index()
                 else:
                     messagebox.showwarning("Advertencia", "El archivo no pudo ser cargado o está vacío.")
             else:
@@ -480,38 +582,17 @@ class InterfazGrafica:
             if df.empty:
                 raise ValueError("Los datos de temperatura están vacíos o no son válidos.")
 
-            # Generar una lista para almacenar los resultados
-            promedios = []
-
-            # Crear el primer intervalo desde el primer registro redondeado al múltiplo de 10 minutos más cercano hacia abajo
-            inicio = (df.index.min().replace(second=0, microsecond=0) - pd.Timedelta(minutes=df.index.min().minute % 10)).replace(second=0)
-            fin = df.index.max()
-
-            while inicio < fin:
-                # Definir el final del intervalo como exactamente 10 minutos después
-                fin_intervalo = inicio + pd.Timedelta(minutes=9, seconds=59)
-
-                # Filtrar datos dentro de este intervalo
-                datos_intervalo = df.loc[inicio:fin_intervalo]
-
-                if not datos_intervalo.empty:
-                    # Calcular el promedio de Tbs y Tbh para el intervalo actual
-                    promedio_Tbs = datos_intervalo['Tbs'].mean()
-                    promedio_Tbh = datos_intervalo['Tbh'].mean()
-                    altura = datos_intervalo['Altura (m)'].mean()
-
-                    # Guardar la fecha y hora inicial
-                    fecha = inicio.date()
-                    hora = inicio.time()
-
-                    # Añadir el resultado al DataFrame
-                    promedios.append({'Fecha': fecha, 'Hora': hora, 'Altura (m)': altura, 'Tbs (°C)': promedio_Tbs, 'Tbh (°C)': promedio_Tbh})
-
-                # Avanzar al siguiente intervalo de 10 minutos
-                inicio = inicio + pd.Timedelta(minutes=10)
-
-            # Convertir los resultados en un DataFrame
-            df_promedio = pd.DataFrame(promedios)
+            # Promedios por intervalos de 10 minutos (y niveles de hora, día y semana
+            # para el climograma) agrupando todos los registros en una sola pasada
+            self.piramide = PiramideAgregados(df[['Tbs', 'Tbh', 'Altura (m)']].apply(pd.to_numeric, errors='coerce'))
+            medias = self.piramide.tabla('10min')
+            df_promedio = pd.DataFrame({
+                'Fecha': medias.index.date,
+                'Hora': medias.index.time,
+                'Altura (m)': medias['Altura (m)'].to_numpy(),
+                'Tbs (°C)': medias['Tbs'].to_numpy(),
+                'Tbh (°C)': medias['Tbh'].to_numpy(),
+            })
 
             if df_promedio.empty:
                 raise ValueError("No se pudieron calcular promedios en los intervalos.")
@@ -578,77 +659,77 @@ class InterfazGrafica:
 
     def graficar_psicrometrica(self):
         try:
-            Tbs = np.linspace(0, 60, 100)
-            Hr = np.linspace(0.1, 1.0, 10)
             altura = 0
-
-            Tbs_grid, Hr_grid = np.meshgrid(Tbs, Hr)
             presionAt = self.calculadora.calcular_presion(altura)
-            pvs2_grid = np.vectorize(self.calculadora.calcular_pvs)(Tbs_grid)
-            Pv_grid = Hr_grid * pvs2_grid
-            W_grid = 0.622 * (Pv_grid / (presionAt - Pv_grid))
-
-            plt.figure(figsize=(10, 8))
-
-            for i in range(len(Hr)):
-                plt.plot(Tbs, W_grid[i, :], label=f'Hr {Hr[i]*100:.0f}%')
 
             # Agregar datos cargados
+            variable = self.variable_contorno.get()
             if self.datos_excel is not None:
                 df = self.datos_excel.dropna(subset=['Temperatura', 'W (kg_vp/kg_AS)', 'φ (%)'])
                 Tbs_list = df['Temperatura'].astype(float).values
                 W_list = df['W (kg_vp/kg_AS)'].astype(float).values
-                phi_list = df['φ (%)'].astype(float).values
-
-                if len(Tbs_list) == 0 or len(W_list) == 0:
-                    messagebox.showwarning("Advertencia", "No hay datos válidos para graficar.")
-                    return
-
-                plt.scatter(Tbs_list, W_list, marker='o', color='blue', label='Datos Cargados')
-
-                # Crear grid para contour
-                if len(Tbs_list) > 3 and len(W_list) > 3:
-                    grid_x, grid_y = np.mgrid[min(Tbs_list):max(Tbs_list):100j, min(W_list):max(W_list):100j]
-                    points = np.column_stack((Tbs_list, W_list))
-                    values = phi_list
-                    grid_z = griddata(points, values, (grid_x, grid_y), method='linear')
-
-                    plt.contourf(grid_x, grid_y, grid_z, levels=15, cmap='viridis', alpha=0.5)
+                if variable == 'Hora del día':
+                    valores_contorno = (df['Fecha UTC'].dt.hour + df['Fecha UTC'].dt.minute / 60).values
+                else:
+                    valores_contorno = df[variable].astype(float).values
+                etiqueta, color = 'Datos Cargados', 'blue'
 
             elif self.datos_promedio is not None:
+                # Columnas de la tabla: Hora, Tbs, Tbh, φ, W y h
+                indices = {'Tbs': 4, 'W': 11, 'φ (%)': 6, 'h (kJ/kg_AS)': 14, 'Tbh (°C)': 5}
                 Tbs_list = []
                 W_list = []
-                Hr_list = []
+                valores_contorno = []
                 for item in self.tabla.get_children():
                     valores = self.tabla.item(item)['values']
                     try:
-                        Tbs_val = float(valores[4])
-                        W_val = float(valores[11])
-                        Hr_val = float(valores[6])
-                        Tbs_list.append(Tbs_val)
-                        W_list.append(W_val)
-                        Hr_list.append(Hr_val)
+                        Tbs_val = float(valores[indices['Tbs']])
+                        W_val = float(valores[indices['W']])
                     except:
                         continue
+                    # Los puntos no dependen de la variable elegida (misma triangulación)
+                    try:
+                        if variable == 'Hora del día':
+                            h_, m_, s_ = (int(x) for x in str(valores[2]).split(':'))
+                            valor = h_ + m_ / 60 + s_ / 3600
+                        else:
+                            valor = float(valores[indices[variable]])
+                    except:
+                        valor = np.nan
+                    Tbs_list.append(Tbs_val)
+                    W_list.append(W_val)
+                    valores_contorno.append(valor)
+                etiqueta, color = 'Datos Registrados', 'red'
+
+            else:
+                messagebox.showwarning("Advertencia", "No hay datos cargados para graficar.")
+                return
 
-                if len(Tbs_list) == 0 or len(W_list) == 0:
-                    messagebox.showwarning("Advertencia", "No hay datos válidos para graficar.")
-                    return
+            if len(Tbs_list) == 0 or len(W_list) == 0:
+                messagebox.showwarning("Advertencia", "No hay datos válidos para graficar.")
+                return
 
-                plt.scatter(Tbs_list, W_list, marker='o', color='red', label='Datos Registrados')
+            plt.figure(figsize=(10, 8))
+            ax = plt.gca()
 
-                # Crear grid para contour
-                if len(Tbs_list) > 3 and len(W_list) > 3:
-                    grid_x, grid_y = np.mgrid[min(Tbs_list):max(Tbs_list):100j, min(W_list):max(W_list):100j]
-                    points = np.column_stack((Tbs_list, W_list))
-                    values = Hr_list
-                    grid_z = griddata(points, values, (grid_x, grid_y), method='linear')
+            # El fondo (curvas fijas) sale del caché; sólo los datos se dibujan cada vez
+            T_rango, W_rango = self.fondos_carta.rango_ejes(Tbs_list, W_list)
+            self.fondos_carta.dibujar(ax, presionAt, T_rango, W_rango)
 
-                    plt.contourf(grid_x, grid_y, grid_z, levels=15, cmap='viridis', alpha=0.5)
+            plt.scatter(Tbs_list, W_list, marker='o', color=color, label=etiqueta, zorder=3)
 
-            else:
-                messagebox.showwarning("Advertencia", "No hay datos cargados para graficar.")
-                return
+            # Crear grid para contour
+            if len(Tbs_list) > 3 and len(W_list) > 3:
+                grid_x, grid_y = np.mgrid[min(Tbs_list):max(Tbs_list):100j, min(W_list):max(W_list):100j]
+                # La triangulación se construye una vez por versión de los datos
+                if (self.interpolador is None or self.version_interpolador != self.version_datos
+                        or len(self.interpolador.puntos) != len(Tbs_list)):
+                    self.interpolador = InterpoladorTriangulado(np.column_stack((Tbs_list, W_list)))
+                    self.version_interpolador = self.version_datos
+                grid_z = self.interpolador.interpolar(valores_contorno, grid_x, grid_y)
+
+                contorno = plt.contourf(grid_x, grid_y, grid_z, levels=15, cmap='viridis', alpha=0.5)
+                plt.colorbar(contorno, label=variable)
 
             plt.xlabel('Tbs (°C)')
             plt.ylabel('W (kg_vp/kg_AS)')
@@ -662,15 +743,21 @@ class InterfazGrafica:
 
     def graficar_climograma(self):
         try:
-            if self.df_daily_avg is not None and not self.df_daily_avg.empty:
-                datos = self.df_daily_avg
-                dias = np.arange(len(datos))
-
-                # Determinar si usar 'Temperatura' o 'Tbs (°C)'
+            if self.piramide is not None and len(self.piramide.niveles['1D']['tiempo']):
+                # Promedios diarios, o semanales si el periodo tiene demasiados días para las barras
+                tiempo = self.piramide.niveles['1D']['tiempo']
+                nivel = '1D' if (tiempo[-1] - tiempo[0]) // self.piramide.NIVELES['1D'].value < 120 else '1W'
+                ancho = self.piramide.NIVELES[nivel]
+                datos = self.piramide.tabla(nivel)
+                # Frecuencia regular: los intervalos sin datos quedan como huecos en su fecha real
+                datos = datos.reindex(pd.date_range(datos.index[0], datos.index[-1], freq=ancho))
+                dias = datos.index + ancho / 2
+
+                # Determinar si usar 'Temperatura' (estación) o 'Tbs' (datos registrados)
                 if 'Temperatura' in datos.columns:
                     temperatura = datos['Temperatura'].values
-                elif 'Tbs (°C)' in datos.columns:
-                    temperatura = datos['Tbs (°C)'].values
+                elif 'Tbs' in datos.columns:
+                    temperatura = datos['Tbs'].values
                 else:
                     temperatura = [0]*len(datos)
 
@@ -684,10 +771,11 @@ class InterfazGrafica:
 
                 fig, ax1 = plt.subplots()
 
-                ax1.set_xlabel('Día')
+                ax1.set_xlabel('Día' if nivel == '1D' else 'Semana')
                 if tiene_radiacion:
                     ax1.set_ylabel('Radiación Global Promedio (W/m²)', color='tab:blue')
-                    ax1.bar(dias, radiacion, color='blue', label='Radiación (W/m²)', alpha=0.7)
+                    ax1.bar(dias, radiacion, width=0.8 * ancho / pd.Timedelta('1D'), color='blue',
+                            label='Radiación (W/m²)', alpha=0.7)
                     ax1.tick_params(axis='y', labelcolor='tab:blue')
                 else:
                     ax1.set_ylabel('')
@@ -697,7 +785,7 @@ class InterfazGrafica:
                 ax2.plot(dias, temperatura, color='red', marker='o', linestyle='-', label='Temperatura (°C)', linewidth=2, markersize=6)
                 ax2.tick_params(axis='y', labelcolor='tab:red')
 
-                ax1.set_xticks(np.arange(0, len(dias), max(1, len(dias)//10)))
+                fig.autofmt_xdate()
 
                 fig.tight_layout()
                 plt.title("Climograma: Temperatura vs Radiación")
@@ -750,6 +838,7 @@ class InterfazGrafica:
             fecha_actual = datetime.now().strftime('%Y-%m-%d')
             hora_actual = datetime.now().strftime('%H:%M:%S')
             self.tabla.insert("", "end", values=[idx, fecha_actual, hora_actual, altura, Tbs, Tbh, Hr * 100, Tpr, pvs2/1000, Pv/1000, Ws, W, Gsaturacion, Veh, h])
+            self.version_datos += 1
     
         except Exception as e:
             messagebox.showerror("Error", f"Ocurrió un error al calcular: {e}")
@@ -784,6 +873,7 @@ class InterfazGrafica:
             fecha_actual = datetime.now().strftime('%Y-%m-%d')
             hora_actual = datetime.now().strftime('%H:%M:%S')
             self.tabla.insert("", "end", values=[idx, fecha_actual, hora_actual, altura, Tbs, Tbh, Hr * 100, Tpr, pvs2/1000, Pv/1000, Ws, W, Gsaturacion, Veh, h])
+            self.version_datos += 1
     
         except Exception as e:
             messagebox.showerror("Error", f"Ocurrió un error al calcular: {e}")
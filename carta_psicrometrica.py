@@ -0,0 +1,232 @@
+import math
+from collections import OrderedDict
+
+import numpy as np
+from matplotlib.collections import LineCollection
+from matplotlib.lines import Line2D
+
+
+class FondoCartaPsicrometrica:
+    """
+    Caché de fondos de la carta psicrométrica, compartido por las interfaces.
+
+    El fondo (saturación, HR 10-100 %, entalpía, bulbo húmedo y volumen
+    específico) sólo depende de la presión y del rango de los ejes, así que se
+    guarda por (presión cuantizada, rango de T, rango de W) con las curvas
+    calculadas y ya convertidas en polilíneas. Al graficar datos nuevos sólo se
+    agregan las colecciones de líneas (vectoriales, nítidas con cualquier zoom)
+    y se dibuja encima la capa de datos. Si el desplazamiento saca la vista del
+    rango del fondo, o el zoom la deja muy pequeña frente a él, el fondo se
+    cambia por el del rango visible.
+
+    Las calculadoras de los scripts difieren sólo en unidades: `factor_presion`
+    convierte su presión y su presión de vapor (calcular_pvs_arreglo) a Pa, y
+    `escala_W` es el factor de W en el gráfico (1000 para g/kg).
+    """
+
+    FAMILIAS = {
+        # familia: (color, estilo, ancho, nombre)
+        'saturacion': ('black', '-', 1.5, 'Saturación'),
+        'humedad_relativa': ('tab:blue', '-', 0.6, 'HR constante'),
+        'entalpia': ('red', '--', 0.5, 'Entalpía constante'),
+        'bulbo_humedo': ('green', '-.', 0.5, 'Tbh constante'),
+        'volumen_especifico': ('purple', ':', 0.6, 'Volumen específico constante'),
+    }
+    # familia: (formato de la etiqueta, extremo de la curva donde va)
+    ETIQUETAS = {
+        'humedad_relativa': ('HR {:.0f}%', -1),
+        'entalpia': ('{:.0f} kJ/kg', 0),
+        'bulbo_humedo': ('Tbh {:.0f}°C', 0),
+        'volumen_especifico': ('{:.2f} m³/kg', -1),
+    }
+    # Redondeo de los rangos de los ejes: 5 °C y 0.005 kg/kg
+    PASO_T = 5
+    PASO_W = 0.005
+    # Con la vista más estrecha que 1/ZOOM_DETALLE del fondo, las curvas se recalculan
+    ZOOM_DETALLE = 4
+
+    def __init__(self, calculadora, factor_presion=1000, escala_W=1, max_fondos=8,
+                 paso_presion=100, n_T=200):
+        """
+        Args:
+            calculadora (CalculadoraPropiedades): Calculadora del script
+            factor_presion (float): Factor de las presiones de la calculadora a
+                Pa (1000 si trabaja en kPa, 1 si en Pa)
+            escala_W (float): Factor de W en el gráfico (1000 para g/kg)
+            max_fondos (int): Número máximo de fondos guardados
+            paso_presion (float): Cuantización de la presión en Pa
+            n_T (int): Puntos de cada curva
+        """
+        self.calculadora = calculadora
+        self.factor_presion = factor_presion
+        self.escala_W = escala_W
+        self.max_fondos = max_fondos
+        self.paso_presion = paso_presion
+        self.n_T = n_T
+        self.entradas = OrderedDict()
+
+    def rango_ejes(self, T_data, W_data):
+        """
+        Rangos de los ejes redondeados para que datos parecidos compartan fondo.
+
+        Args:
+            T_data (array-like): Tbs de los datos (°C)
+            W_data (array-like): W de los datos en unidades del gráfico
+
+        Returns:
+            tuple: (T_rango, W_rango)
+        """
+        T_data = np.asarray(T_data, dtype=float)
+        W_data = np.asarray(W_data, dtype=float)
+        paso_W = self.PASO_W * self.escala_W
+        if not np.isfinite(T_data).any() or not np.isfinite(W_data).any():
+            return (0, 50), (0.0, round(6 * paso_W, 6))
+        T_rango = (self.PASO_T * math.floor((np.nanmin(T_data) - 5) / self.PASO_T),
+                   self.PASO_T * math.ceil((np.nanmax(T_data) + 5) / self.PASO_T))
+        W_rango = (0.0, round(paso_W * math.ceil(np.nanmax(W_data) * 1.2 / paso_W + 1e-9), 6))
+        return T_rango, W_rango
+
+    def rango_vista(self, x, y):
+        """Rangos redondeados que cubren unos límites de ejes (W desde 0)."""
+        T_rango = (self.PASO_T * math.floor(min(x) / self.PASO_T),
+                   self.PASO_T * math.ceil(max(x) / self.PASO_T))
+        paso_W = self.PASO_W * self.escala_W
+        W_rango = (0.0, round(paso_W * math.ceil(max(max(y), paso_W) / paso_W - 1e-9), 6))
+        return T_rango, W_rango
+
+    def clave(self, presionAt, T_rango, W_rango):
+        presion = round(presionAt * self.factor_presion / self.paso_presion) * self.paso_presion
+        return presion, tuple(T_rango), tuple(W_rango)
+
+    def obtener(self, presionAt, T_rango, W_rango):
+        """
+        Devuelve (y crea si hace falta) el fondo para una presión y rango de ejes.
+
+        Args:
+            presionAt (float): Presión atmosférica en unidades de la calculadora
+            T_rango (tuple): (Tbs mínima, Tbs máxima) en °C
+            W_rango (tuple): (W mínima, W máxima) en unidades del gráfico
+
+        Returns:
+            dict: 'curvas' (familia -> (valores, Tbs, W)), 'lineas' (familia ->
+                  polilíneas (n, 2)) y 'extension'
+        """
+        clave = self.clave(presionAt, T_rango, W_rango)
+        if clave in self.entradas:
+            self.entradas.move_to_end(clave)
+            return self.entradas[clave]
+        curvas = self.calcular_curvas(clave[0], T_rango, W_rango)
+        lineas = {}
+        for familia, (valores, T, W) in curvas.items():
+            lineas[familia] = [np.column_stack((T[np.isfinite(fila)], fila[np.isfinite(fila)])) for fila in W]
+        entrada = {
+            'curvas': curvas,
+            'lineas': lineas,
+            'extension': (T_rango[0], T_rango[1], W_rango[0], W_rango[1]),
+        }
+        self.entradas[clave] = entrada
+        while len(self.entradas) > self.max_fondos:
+            self.entradas.popitem(last=False)
+        return entrada
+
+    def calcular_curvas(self, presion_Pa, T_rango, W_rango):
+        """Calcula cada familia de curvas como arreglos (n_valores, n_T) en una sola pasada."""
+        calc = self.calculadora
+        W_lim = (W_rango[0] / self.escala_W, W_rango[1] / self.escala_W)
+        T = np.linspace(T_rango[0], T_rango[1], self.n_T)
+        fila_T = T[None, :]
+        pvs_T = calc.calcular_pvs_arreglo(fila_T) * self.factor_presion
+        W_sat = calc.razon_humedad(pvs_T, presion_Pa)
+
+        HR = np.arange(10, 100, 10)[:, None]
+        W_HR = calc.razon_humedad(HR / 100 * pvs_T, presion_Pa)
+
+        h_ext = (calc.entalpia(T_rango[0], W_lim[0]), calc.entalpia(T_rango[1], W_lim[1]))
+        h = np.arange(10 * math.floor(h_ext[0] / 10), h_ext[1] + 10, 10)[:, None]
+        W_h = (h - 1.006 * fila_T) / (2501 + 1.805 * fila_T)
+
+        Tbh = np.arange(5 * math.floor(T_rango[0] / 5), T_rango[1] + 5, 5)[:, None]
+        Ws_Tbh = calc.razon_humedad_saturada(calc.calcular_pvs_arreglo(Tbh) * self.factor_presion, presion_Pa)
+        W_Tbh = ((2501 - 2.381 * Tbh) * Ws_Tbh - 1.006 * (fila_T - Tbh)) / (2501 + 1.805 * fila_T - 4.186 * Tbh)
+        W_Tbh = np.where(fila_T >= Tbh, W_Tbh, np.nan)
+
+        v_ext = (calc.volumen_especifico(T_rango[0], presion_Pa, W_lim[0]),
+                 calc.volumen_especifico(T_rango[1], presion_Pa, W_lim[1]))
+        v = np.round(np.arange(0.02 * math.floor(v_ext[0] / 0.02), v_ext[1] + 0.02, 0.02), 3)[:, None]
+        a = v * presion_Pa / (calc.Ra * calc.Grados_Kelvin(fila_T))
+        W_v = (a - 1) / (1.6078 - a)
+
+        def recortar(W):
+            # Sólo la parte bajo la curva de saturación y dentro del rango de W
+            W = np.where((W <= W_sat * (1 + 1e-9)) & (W >= W_lim[0]) & (W <= W_lim[1]), W, np.nan)
+            return W * self.escala_W
+
+        return {
+            'saturacion': (np.array([100.0]), T, recortar(W_sat)),
+            'humedad_relativa': (HR[:, 0], T, recortar(W_HR)),
+            'entalpia': (h[:, 0], T, recortar(W_h)),
+            'bulbo_humedo': (Tbh[:, 0], T, recortar(W_Tbh)),
+            'volumen_especifico': (v[:, 0], T, recortar(W_v)),
+        }
+
+    def dibujar(self, ax, presionAt, T_rango, W_rango):
+        """
+        Coloca el fondo bajo los datos de `ax` y fija los ejes a su rango.
+
+        Las curvas se agregan como colecciones de líneas; si después los
+        límites de los ejes salen del rango del fondo, se cambian por las del
+        rango visible.
+
+        Returns:
+            dict: Entrada del caché usada
+        """
+        entrada = self._colocar(ax, presionAt, T_rango, W_rango)
+        ax.set_xlim(*T_rango)
+        ax.set_ylim(*W_rango)
+        for color, estilo, ancho, nombre in self.FAMILIAS.values():
+            ax.add_line(Line2D([], [], color=color, linestyle=estilo, linewidth=ancho, label=nombre))
+        ax.callbacks.connect('xlim_changed', self._al_cambiar_limites)
+        ax.callbacks.connect('ylim_changed', self._al_cambiar_limites)
+        return entrada
+
+    def _colocar(self, ax, presionAt, T_rango, W_rango):
+        # Reemplaza las curvas del fondo anterior (si lo hay) por las del rango pedido
+        anterior = getattr(ax, '_fondo_carta', None)
+        if anterior is not None:
+            for artista in anterior['artistas']:
+                artista.remove()
+        entrada = self.obtener(presionAt, T_rango, W_rango)
+        artistas = []
+        for familia, lineas in entrada['lineas'].items():
+            color, estilo, ancho, _ = self.FAMILIAS[familia]
+            artistas.append(ax.add_collection(LineCollection(lineas, colors=color, linestyles=estilo,
+                                                             linewidths=ancho, zorder=0),
+                                              autolim=False))
+            if familia in self.ETIQUETAS:
+                formato, extremo = self.ETIQUETAS[familia]
+                for valor, linea in zip(entrada['curvas'][familia][0], lineas):
+                    if len(linea):
+                        artistas.append(ax.text(linea[extremo, 0], linea[extremo, 1], formato.format(valor),
+                                                color=color, fontsize=7, clip_on=True, zorder=0,
+                                                ha='right' if extremo == -1 else 'left', va='bottom'))
+        ax._fondo_carta = {'presion': presionAt, 'extension': entrada['extension'], 'artistas': artistas}
+        return entrada
+
+    def _al_cambiar_limites(self, ax):
+        fondo = getattr(ax, '_fondo_carta', None)
+        if fondo is None:
+            return
+        (x0, x1), (y0, y1) = ax.get_xlim(), ax.get_ylim()
+        T0, T1, W0, W1 = fondo['extension']
+        cubierta = min(x0, x1) >= T0 and max(x0, x1) <= T1 and max(y0, y1) <= W1
+        if cubierta and (T1 - T0) <= self.ZOOM_DETALLE * abs(x1 - x0):
+            return
+        if cubierta:
+            # Zoom profundo: curvas calculadas sólo en el rango visible, con más detalle
+            T_rango, W_rango = self.rango_vista((x0, x1), (y0, y1))
+        else:
+            # Vista fuera del fondo: se toma el rango que la cubre junto con el anterior
+            T_rango, W_rango = self.rango_vista((x0, x1, T0, T1), (y0, y1, W1))
+        if (T_rango[0], T_rango[1], W_rango[0], W_rango[1]) == fondo['extension']:
+            return
+        self._colocar(ax, fondo['presion'], T_rango, W_rango)
@@ -3,34 +3,49 @@ Software por Diego Ramos AB24_77
 Versión 3.2.4
 '''
 
+import time
+_T_INICIO_IMPORTACIONES = time.perf_counter()
+
 import numpy as np
 import pandas as pd
 import matplotlib.pyplot as plt
-import seaborn as sns
-from scipy import stats
-from scipy.interpolate import griddata
 import matplotlib.dates as mdates
-from matplotlib.colors import LinearSegmentedColormap
+from matplotlib.colors import LinearSegmentedColormap, LogNorm
 from datetime import datetime, timedelta
 import warnings
 warnings.filterwarnings('ignore')
 import tkinter as tk
 from tkinter import ttk, filedialog, messagebox
 import math
-import openpyxl
-import xlrd
 import os
+import io
+import itertools
+import re
+import threading
+import queue
+from collections import OrderedDict, deque
+from carta_psicrometrica import FondoCartaPsicrometrica
+
+# seaborn, scipy.interpolate y los motores de Excel (openpyxl/xlrd, que pandas
+# carga por su cuenta) se importan sólo cuando se usan por primera vez.
+_T_FIN_IMPORTACIONES = time.perf_counter()
+
+# Contador global de versiones de datos: cada carga o recorte obtiene un
+# número nuevo para que los cachés puedan detectar datos obsoletos.
+_versiones_datos = itertools.count(1)
 
 ##############
 
 class ManejadorDatos:
     @staticmethod
-    def cargar_archivo(ruta):
+    def cargar_archivo(ruta, interactivo=True):
         """
         Carga datos desde diferentes formatos de archivo y procesa las columnas.
         
         Args:
             ruta (str): Ruta del archivo a cargar
+            interactivo (bool): Si es False, de un Excel con varias hojas se usa
+                la primera en lugar de preguntar
             
         Returns:
             pd.DataFrame: DataFrame con los datos procesados
@@ -42,7 +57,7 @@ class ManejadorDatos:
                 datos = pd.read_csv(ruta)
             elif extension in ['xlsx', 'xls']:
                 xl = pd.ExcelFile(ruta)
-                if len(xl.sheet_names) > 1:
+                if len(xl.sheet_names) > 1 and interactivo:
                     hoja = ManejadorDatos.seleccionar_hoja(xl.sheet_names)
                     if not hoja:
                         return None
@@ -257,6 +272,79 @@ class ManejadorDatos:
         except Exception as e:
             raise Exception(f"Error al guardar el archivo: {str(e)}")
 
+class SeguidorArchivo:
+    """
+    Lectura en vivo de las filas que el registrador agrega al final de un CSV.
+
+    Guarda hasta qué byte se leyó el archivo y en cada lectura procesa sólo lo
+    agregado desde entonces, con el mismo tratamiento que la carga
+    (ManejadorDatos.procesar_columnas: atípicos y promedios de 10 minutos). El
+    último intervalo de 10 minutos queda pendiente hasta que llega una lectura
+    posterior, para no entregar promedios incompletos; los intervalos que ya
+    estaban cargados se descartan.
+    """
+
+    PASO = '10min'
+
+    def __init__(self, ruta, desde=None):
+        """
+        Args:
+            ruta (str): Archivo CSV que el registrador va extendiendo
+            desde (datetime): Última Fecha_Hora ya cargada (None si ninguna)
+        """
+        self.ruta = ruta
+        self.columnas = list(pd.read_csv(ruta, nrows=0).columns)
+        self.posicion = os.path.getsize(ruta)
+        self.desde = None if desde is None else pd.Timestamp(desde)
+        self.pendientes = None
+
+    def _fechas(self, crudas):
+        """Fecha y hora de cada lectura cruda (como en procesar_columnas)."""
+        if 'Fecha' in crudas.columns and 'Hora' in crudas.columns:
+            return pd.to_datetime(crudas['Fecha'].astype(str) + ' ' + crudas['Hora'].astype(str))
+        return pd.to_datetime(crudas['Fecha_Hora'])
+
+    def leer(self):
+        """
+        Procesa las líneas completas agregadas desde la última lectura.
+
+        Returns:
+            pd.DataFrame: Promedios de 10 minutos nuevos y completos, o None si
+                          todavía no hay ninguno
+
+        Raises:
+            ValueError: Si el archivo se truncó o se reemplazó
+        """
+        tamano = os.path.getsize(self.ruta)
+        if tamano < self.posicion:
+            raise ValueError(f"El archivo {os.path.basename(self.ruta)} se truncó o se reemplazó")
+        if tamano == self.posicion:
+            return None
+        with open(self.ruta, 'rb') as f:
+            f.seek(self.posicion)
+            bloque = f.read(tamano - self.posicion)
+        # La última línea puede estar a medio escribir
+        fin = bloque.rfind(b'\n') + 1
+        if fin == 0:
+            return None
+        self.posicion += fin
+        nuevas = pd.read_csv(io.BytesIO(bloque[:fin]), names=self.columnas, header=None)
+        crudas = nuevas if self.pendientes is None else pd.concat([self.pendientes, nuevas],
+                                                                   ignore_index=True)
+        intervalos = self._fechas(crudas).dt.floor(self.PASO)
+        completas = (intervalos < intervalos.max()).to_numpy()
+        self.pendientes = crudas[~completas].reset_index(drop=True)
+        if not completas.any():
+            return None
+        filas = ManejadorDatos.procesar_columnas(crudas[completas].reset_index(drop=True))
+        if self.desde is not None:
+            filas = filas[filas['Fecha_Hora'] > self.desde]
+        if not len(filas):
+            return None
+        self.desde = filas['Fecha_Hora'].iloc[-1]
+        return filas.reset_index(drop=True)
+
+
 class CalculadoraPropiedades:
     def __init__(self):
         self.Ra = 287.055  # J/(kg·K)
@@ -299,6 +387,24 @@ class CalculadoraPropiedades:
 
         return math.exp(ln_pws) / 1000  # Convertir Pa a kPa
 
+    def calcular_pvs_arreglo(self, Tbs):
+        """
+        Versión vectorizada de calcular_pvs.
+        
+        Args:
+            Tbs (array-like): Temperaturas de bulbo seco (°C), de cualquier forma
+            
+        Returns:
+            np.ndarray: Presión de vapor de saturación (kPa)
+        """
+        Tbs = np.clip(np.asarray(Tbs, dtype=float), -100, 200)
+        Tbs_K = self.Grados_Kelvin(Tbs)
+        ln_hielo = (-5.6745359e3 / Tbs_K + 6.3925247e0 - 9.6778430e-3 * Tbs_K + 6.2215701e-7 * Tbs_K ** 2
+                    + 2.0747825e-9 * Tbs_K ** 3 - 9.4840240e-13 * Tbs_K ** 4 + 4.1635019e0 * np.log(Tbs_K))
+        ln_agua = (-5.8002206e3 / Tbs_K + 1.3914993e0 - 4.8640239e-2 * Tbs_K + 4.1764768e-5 * Tbs_K ** 2
+                   - 1.4452093e-8 * Tbs_K ** 3 + 6.5459673e0 * np.log(Tbs_K))
+        return np.exp(np.where(Tbs <= 0, ln_hielo, ln_agua)) / 1000  # Convertir Pa a kPa
+
     def calcular_pv(self, Hr, pvs2):
         return (Hr / 100) * pvs2
 
@@ -345,6 +451,7 @@ class CalculadoraPropiedades:
             "Tpr (°C)": Tpr,
             "Pvs (kPa)": pvs,
             "Pv (kPa)": Pv,
+            "DPV (kPa)": pvs - Pv,
             "Ws (kg_vp/kg_AS)": Ws,
             "W (kg_vp/kg_AS)": W,
             "μ [G_sat]": Gsaturacion,
@@ -352,234 +459,3044 @@ class CalculadoraPropiedades:
             "h (kJ/kg_AS)": h
         }
 
-class InterfazGraficaMejorada:
-    def __init__(self, calculadora):
-        self.calculadora = calculadora
-        self.datos = None
-        self.root = None
-        self.selected_row = None
-        self.analizador = None
-        self.current_panel = None
-        self.nav_buttons = {}
-
-    def iniciar_interfaz(self):
-        """Inicializa y configura la interfaz principal."""
-        self.root = tk.Tk()
-        self.root.title("Sistema de Análisis de Invernadero Software AB24_77 V3.27")
-        self.root.geometry("1400x800")
-        
-        # Configurar tema y estilo
-        self.setup_styles()
-        
-        # Frame principal
-        self.main_container = ttk.Frame(self.root)
-        self.main_container.pack(fill='both', expand=True)
-        
-        # Crear navbar
-        self.crear_navbar()
-        
-        # Crear área de trabajo principal
-        self.workspace = ttk.Frame(self.main_container, padding="10")
-        self.workspace.pack(fill='both', expand=True)
-        
-        # Crear paneles
-        self.crear_panel_datos()
-        self.crear_panel_analisis()
-        self.crear_panel_visualizacion()
-        
-        # Mostrar panel inicial
-        self.mostrar_panel('datos')
+    def calcular_propiedades_lote(self, Tbs, Hr, presionAt, T_hoja=None):
+        """
+        Versión vectorizada de calcular_propiedades_desde_Tbs_Hr.
         
-        # Configurar eventos
-        self.configurar_eventos()
+        Args:
+            Tbs (array-like): Temperaturas de bulbo seco (°C)
+            Hr (array-like): Humedades relativas (%)
+            presionAt (float): Presión atmosférica (kPa)
+            T_hoja (array-like): Temperaturas de hoja (°C) para el déficit de
+                presión de vapor de la hoja (opcional)
+            
+        Returns:
+            dict: Mismas claves que calcular_propiedades_desde_Tbs_Hr con arreglos
+                  (más "DPV hoja (kPa)" si se da T_hoja); las filas con humedad
+                  fuera de (0, 100] quedan en NaN
+        """
+        Tbs = np.asarray(Tbs, dtype=float)
+        Hr = np.asarray(Hr, dtype=float)
+        Hr = np.where((Hr > 0) & (Hr <= 100), Hr, np.nan)
         
-        self.root.mainloop()
+        pvs = self.calcular_pvs_arreglo(Tbs)
+        Pv = self.calcular_pv(Hr, pvs)
+        W = self.razon_humedad(Pv * 1000, presionAt * 1000)
+        Ws = self.razon_humedad_saturada(pvs * 1000, presionAt * 1000)
+        Gsaturacion = self.grado_saturacion(W, Ws)
+        Veh = self.volumen_especifico(Tbs, presionAt * 1000, W)
+        Pv_hPa = np.where(Pv * 10 <= 0, 0.01, Pv * 10)  # kPa a hPa
+        gamma = np.log(Pv_hPa / 6.112)
+        Tpr = (243.5 * gamma) / (17.67 - gamma)
+        h = self.entalpia(Tbs, W)
 
-    def setup_styles(self):
-        """Configura los estilos de la interfaz."""
-        style = ttk.Style(self.root)
-        style.theme_use('clam')
-        
-        # Colores
-        primary_color = '#2c3e50'
-        secondary_color = '#34495e'
-        accent_color = '#3498db'
-        
-        # Configuración general
-        style.configure('.',
-                       background='#f5f6fa',
-                       foreground='#333333',
-                       font=('Arial', 10))
-        
-        # Navbar
-        style.configure('Navbar.TFrame',
-                       background=primary_color)
-        style.configure('Navbar.TButton',
-                       background=primary_color,
-                       foreground='white',
-                       padding=10)
-        
-        # Botones
-        style.configure('Action.TButton',
-                       background=accent_color,
-                       foreground='white',
-                       padding=(10, 5))
-        
-        # Headers
-        style.configure('Header.TLabel',
-                       font=('Arial', 14, 'bold'),
-                       foreground=primary_color)
+        props = {
+            "Tbs (°C)": Tbs,
+            "φ (%)": Hr,
+            "Tpr (°C)": Tpr,
+            "Pvs (kPa)": pvs,
+            "Pv (kPa)": Pv,
+            "DPV (kPa)": pvs - Pv,
+            "Ws (kg_vp/kg_AS)": Ws,
+            "W (kg_vp/kg_AS)": W,
+            "μ [G_sat]": Gsaturacion,
+            "Veh (m³/kg_AS)": Veh,
+            "h (kJ/kg_AS)": h
+        }
+        if T_hoja is not None:
+            # Déficit entre la hoja (saturada a su temperatura) y el aire
+            props["DPV hoja (kPa)"] = self.calcular_pvs_arreglo(T_hoja) - Pv
+        return props
 
-    def crear_navbar(self):
-        """Crea la barra de navegación."""
-        navbar = ttk.Frame(self.main_container, style='Navbar.TFrame')
-        navbar.pack(fill='x', side='top')
+    def agregar_propiedades(self, datos, presionAt):
+        """
+        Agrega al DataFrame las propiedades psicrométricas del aire interno,
+        incluido el déficit de presión de vapor del aire y de la hoja.
         
-        # Botones de navegación
-        for text, panel_id in [
-            ("Datos", "datos"),
-            ("Análisis", "analisis"),
-            ("Visualización", "visualizacion")
-        ]:
-            btn = ttk.Button(navbar,
-                           text=text,
-                           command=lambda p=panel_id: self.mostrar_panel(p),
-                           style='Navbar.TButton')
-            btn.pack(side='left', padx=2)
-            self.nav_buttons[panel_id] = btn
+        Args:
+            datos (pd.DataFrame): Datos con temperatura y humedad internas (se modifica)
+            presionAt (float): Presión atmosférica (kPa)
+        """
+        props = self.calcular_propiedades_lote(datos['Temp_interna_invernadero'],
+                                               datos['Hum_interna_invernadero'],
+                                               presionAt,
+                                               datos['S3_temp_hoja'] if 'S3_temp_hoja' in datos.columns else None)
+        invalidas = np.isnan(props['φ (%)']) & datos['Hum_interna_invernadero'].notna().to_numpy()
+        if invalidas.any():
+            print(f"{invalidas.sum()} filas con humedad relativa fuera de (0, 100]%; "
+                  "sus propiedades quedan vacías")
+        for key, value in props.items():
+            if key in ['Tbs (°C)', 'φ (%)']: continue
+            datos[key] = value
 
-    def validar_altura(self, value):
-        """Valida que la entrada de altura sea un número no negativo."""
-        if value == "":
-            return True
-        try:
-            num = float(value)
-            return num >= 0
-        except ValueError:
-            return False
-        
-    def resaltar_error_altura(self):
-        """Resalta el campo de altura en rojo temporalmente."""
-        self.altura_entry.configure(style="Error.TEntry")
-        self.root.after(1000, lambda: self.altura_entry.configure(style="TEntry"))
+class InterpoladorPlanos:
+    """
+    Interpolación lineal de sensores fijos sobre planos de corte fijos.
 
-    def obtener_altura(self):
-        """Obtiene la altura ingresada o usa el valor por defecto."""
-        try:
-            return float(self.altura_entry.get() or 0)
-        except ValueError:
-            return 0
+    Como las posiciones de los sensores y de los planos no cambian, la
+    triangulación y los pesos baricéntricos de cada punto de los planos se
+    calculan una sola vez y se guardan como una matriz (n_puntos, n_sensores).
+    El campo para cualquier instante (o para muchos a la vez) es entonces un
+    producto de matrices; los puntos fuera de la envolvente de los sensores
+    quedan en NaN, igual que con griddata(..., method='linear'). Si falta la
+    lectura de un sensor, los puntos de sus símplices se interpolan con los
+    demás vértices (pesos renormalizados) en lugar de anular el plano.
+    """
 
-    def mostrar_menu_borrado(self):
-        """Muestra el menú de opciones de borrado."""
-        if not hasattr(self, 'datos') or self.datos is None:
-            messagebox.showwarning("Advertencia", "No hay datos para borrar")
-            return
-            
-        menu = tk.Menu(self.root, tearoff=0)
-        menu.add_command(label="Borrar Todo", command=self.borrar_todo)
-        menu.add_command(label="Borrar por Rango de Fechas", command=self.borrar_por_fechas)
-        
-        try:
-            menu.tk_popup(
-                self.root.winfo_pointerx(),
-                self.root.winfo_pointery()
-            )
-        finally:
-            menu.grab_release()
+    def __init__(self, coords, planos):
+        """
+        Args:
+            coords (np.ndarray): Posiciones de los sensores, forma (n_sensores, 3)
+            planos (dict): nombre -> (X, Y, Z) con las coordenadas de cada plano
+        """
+        from scipy.spatial import Delaunay
 
-    def borrar_todo(self):
-        """Borra todos los datos de la tabla."""
-        if messagebox.askyesno("Confirmar", "¿Está seguro de borrar todos los datos?"):
-            self.datos = None
-            self.analizador = None
-            
-            # Limpiar tabla
-            for item in self.tabla.get_children():
-                self.tabla.delete(item)
-            
-            # Actualizar estado
-            self.archivo_label.config(text="No hay archivo cargado")
-            self.registros_label.config(text="0 registros")
-            
-            # Deshabilitar botones de análisis y visualización
-            self.deshabilitar_botones_analisis()
+        self.coords = np.asarray(coords, dtype=float)
+        triangulacion = Delaunay(self.coords)
+        self.formas = {}
+        self.matrices = {}
+        for nombre, (X, Y, Z) in planos.items():
+            xi = np.column_stack((np.ravel(X), np.ravel(Y), np.ravel(Z)))
+            simplex = triangulacion.find_simplex(xi)
+            dentro = simplex >= 0
+            transformacion = triangulacion.transform[simplex[dentro]]
+            b = np.einsum('ijk,ik->ij', transformacion[:, :3], xi[dentro] - transformacion[:, 3])
+            pesos = np.column_stack((b, 1 - b.sum(axis=1)))
+            matriz = np.full((len(xi), len(self.coords)), np.nan)
+            matriz[dentro] = 0.0
+            filas = np.repeat(np.flatnonzero(dentro), 4)
+            np.add.at(matriz, (filas, triangulacion.simplices[simplex[dentro]].ravel()), pesos.ravel())
+            self.formas[nombre] = np.shape(X)
+            self.matrices[nombre] = matriz
 
-    def borrar_por_fechas(self):
-        """Abre una ventana para seleccionar el rango de fechas a borrar."""
-        if 'Fecha_Hora' not in self.datos.columns:
-            messagebox.showerror("Error", "Los datos no contienen información de fechas")
-            return
-            
-        ventana = tk.Toplevel(self.root)
-        ventana.title("Borrar por Rango de Fechas")
-        ventana.geometry("400x250") # "XxY"
-        
-        # Crear frame principal
-        frame = ttk.Frame(ventana, padding="10")
-        frame.pack(fill='both', expand=True)
-        
-        # Fechas mínima y máxima disponibles
-        fecha_min = self.datos['Fecha_Hora'].min()
-        fecha_max = self.datos['Fecha_Hora'].max()
-        
-        # Variables para las fechas
-        fecha_inicio = tk.StringVar(value=fecha_min.strftime('%Y-%m-%d %H:%M:%S'))
-        fecha_fin = tk.StringVar(value=fecha_max.strftime('%Y-%m-%d %H:%M:%S'))
-        
-        # Widgets para fecha inicial
-        ttk.Label(frame, text="Fecha Inicial:").pack(pady=5)
-        entry_inicio = ttk.Entry(frame, textvariable=fecha_inicio)
-        entry_inicio.pack(pady=5)
-        
-        # Widgets para fecha final
-        ttk.Label(frame, text="Fecha Final:").pack(pady=5)
-        entry_fin = ttk.Entry(frame, textvariable=fecha_fin)
-        entry_fin.pack(pady=5)
-        
-        def aplicar_borrado():
-            try:
-                inicio = pd.to_datetime(fecha_inicio.get())
-                fin = pd.to_datetime(fecha_fin.get())
-                
-                if inicio > fin:
-                    messagebox.showerror("Error", "La fecha inicial debe ser anterior a la fecha final")
-                    return
-                    
-                # Filtrar datos fuera del rango seleccionado
-                mascara = ~self.datos['Fecha_Hora'].between(inicio, fin)
-                self.datos = self.datos[mascara].reset_index(drop=True)
-                
-                # Actualizar tabla
-                self.actualizar_tabla()
-                
-                # Actualizar contador de registros
-                self.registros_label.config(text=f"{len(self.datos)} registros")
-                
-                # Cerrar ventana
-                ventana.destroy()
-                
-            except ValueError:
-                messagebox.showerror("Error", "Formato de fecha inválido.\nUse: YYYY-MM-DD HH:MM:SS")
-        
-        # Botones
-        frame_botones = ttk.Frame(frame)
-        frame_botones.pack(pady=20)
-        
-        ttk.Button(frame_botones, text="Aplicar", command=aplicar_borrado).pack(side='left', padx=5)
-        ttk.Button(frame_botones, text="Cancelar", command=ventana.destroy).pack(side='left', padx=5)
+    def campo(self, temps):
+        """
+        Calcula los planos para uno o varios instantes.
 
-    def deshabilitar_botones_analisis(self):
+        Args:
+            temps (np.ndarray): Temperaturas de los sensores, forma (n_sensores,)
+                o (n_sensores, n_instantes); NaN para los que no tienen lectura
+
+        Returns:
+            dict: nombre -> arreglo con la forma del plano (más un eje final de
+                  instantes si temps es 2-D)
         """
-        Deshabilita los botones de análisis y visualización cuando no hay datos.
-        Solo se deshabilitan si el DataFrame está vacío o es None.
+        temps = np.asarray(temps, dtype=float)
+        extra = temps.shape[1:]
+        validos = ~np.isnan(temps)
+        if validos.all():
+            return {nombre: (matriz @ temps).reshape(self.formas[nombre] + extra)
+                    for nombre, matriz in self.matrices.items()}
+        # Pesos de los sensores sin lectura a cero y el resto renormalizado; los
+        # puntos cuyos vértices con peso faltan todos quedan en NaN
+        ceros = np.where(validos, temps, 0.0)
+        planos = {}
+        for nombre, matriz in self.matrices.items():
+            peso = matriz @ validos.astype(float)
+            with np.errstate(invalid='ignore', divide='ignore'):
+                plano = np.where(peso > 1e-9, (matriz @ ceros) / peso, np.nan)
+            planos[nombre] = plano.reshape(self.formas[nombre] + extra)
+        return planos
+
+
+class AnimacionCampoTermico:
+    """
+    Time-lapse del campo térmico del invernadero y de su perfil vertical.
+
+    Los planos de corte de cada instante se precalculan una sola vez (ver
+    AnalisisInvernadero.cuadros_campo_termico); mostrar un cuadro sólo cambia
+    en sitio los colores de las superficies, los de los sensores, el perfil y
+    los textos, sin reconstruir los ejes. Los artistas que cambian se exponen
+    en `artistas` para redibujarlos con blitting.
+
+    Las superficies sólo llevan las celdas con valor: fuera de la envolvente
+    de los sensores el campo es NaN (transparente) en todos los cuadros, y
+    mplot3d reordena por profundidad cada polígono en cada dibujo.
+    """
+
+    def __init__(self, cuadros, fig):
         """
-        should_disable = not hasattr(self, 'datos') or self.datos is None or len(self.datos) == 0
-        
-        if hasattr(self, 'analisis_buttons'):
-            for btn in self.analisis_buttons.values():
-                if should_disable:
-                    btn.state(['disabled'])
+        Args:
+            cuadros (dict): Resultado de AnalisisInvernadero.cuadros_campo_termico
+                (arreglos de sólo lectura)
+            fig (Figure): Figura donde dibujar (se limpia)
+        """
+        from mpl_toolkits.mplot3d.art3d import Poly3DCollection
+
+        self.cuadros = cuadros
+        self.n_cuadros = len(self.cuadros['tiempos'])
+        if self.n_cuadros == 0:
+            raise ValueError("No hay registros completos de los sensores para animar")
+
+        fig.clear()
+        self.fig = fig
+        gs = fig.add_gridspec(1, 3)
+        self.ax = ax = fig.add_subplot(gs[0, :2], projection='3d')
+        ax_perfil = fig.add_subplot(gs[0, 2])
+
+        puntos = AnalisisInvernadero.POSICIONES_SENSORES
+        coords = np.array(list(puntos.values()))
+        x, y, z = AnalisisInvernadero.MALLA_3D
+        sensores = self.cuadros['sensores']
+
+        # Escala de color fija para todo el recorrido
+        self.cmap = plt.cm.RdYlBu_r
+        self.norm = plt.Normalize(np.nanmin(sensores) - 1, np.nanmax(sensores) + 1)
+
+        # Superficies de los planos de corte: una cara por celda de la malla,
+        # coloreada con el valor de su esquina inicial como en plot_surface
+        X, Y, Z = np.meshgrid(x, y, z)
+        mallas = {('z', z_plane): (X[:, :, k], Y[:, :, k], np.full_like(X[:, :, k], z_plane))
+                  for z_plane, k in ((zp, np.argmin(np.abs(z - zp))) for zp in AnalisisInvernadero.PLANOS_Z)}
+        k = np.argmin(np.abs(y - AnalisisInvernadero.PLANO_Y))
+        mallas[('y', AnalisisInvernadero.PLANO_Y)] = (
+            X[:, k, :], np.full_like(X[:, k, :], AnalisisInvernadero.PLANO_Y), Z[:, k, :])
+        self.superficies = {}
+        self.celdas = {}
+        for nombre, (Xp, Yp, Zp) in mallas.items():
+            validas = np.isfinite(self.cuadros['planos'][nombre][:-1, :-1]).any(axis=-1)
+            if not validas.any():
+                continue
+            esquinas = np.stack([Xp, Yp, Zp], axis=-1)
+            caras = np.stack([esquinas[:-1, :-1], esquinas[:-1, 1:],
+                              esquinas[1:, 1:], esquinas[1:, :-1]], axis=2)
+            superficie = Poly3DCollection(caras[validas], alpha=0.3, linewidth=0)
+            ax.add_collection3d(superficie)
+            self.superficies[nombre] = superficie
+            self.celdas[nombre] = validas
+
+        self.scatter = ax.scatter(coords[:, 0], coords[:, 1], coords[:, 2],
+                                  c=sensores[0], cmap=self.cmap, norm=self.norm,
+                                  s=200, edgecolor='black', linewidth=1)
+        self.etiquetas = [
+            ax.text(cx, cy, cz + 0.1, '', fontsize=8, horizontalalignment='center',
+                    bbox=dict(facecolor='white', alpha=0.7, edgecolor='none'))
+            for cx, cy, cz in coords
+        ]
+        self.nombres = list(puntos.keys())
+
+        cbar = fig.colorbar(self.scatter, ax=ax, pad=0.1)
+        cbar.set_label('Temperatura (°C)')
+        ax.set_xlabel('X (m)')
+        ax.set_ylabel('Y (m)')
+        ax.set_zlabel('Altura (m)')
+        ax.set_xlim([-1, 1])
+        ax.set_ylim([-1, 1])
+        ax.set_zlim([0, 3.5])
+        ax.view_init(elev=25, azim=45)
+
+        # Perfil vertical: sensores de la columna central ordenados por altura
+        self.perfil = [i for i, (cx, cy, _) in enumerate(coords) if cx == 0 and cy == 0]
+        self.perfil.sort(key=lambda i: coords[i, 2])
+        alturas = coords[self.perfil, 2]
+        self.linea_perfil, = ax_perfil.plot(sensores[0, self.perfil], alturas, 'o-', color='tab:red')
+        ax_perfil.set_xlim(self.norm.vmin, self.norm.vmax)
+        ax_perfil.set_ylim(0, 3.5)
+        ax_perfil.set_xlabel('Temperatura (°C)')
+        ax_perfil.set_ylabel('Altura (m)')
+        ax_perfil.set_title('Perfil Vertical')
+        ax_perfil.grid(True, alpha=0.3)
+
+        self.titulo = fig.text(0.5, 0.95, '', ha='center', fontsize=14)
+
+        self.artistas = list(self.superficies.values()) + [self.scatter, self.linea_perfil,
+                                                            self.titulo] + self.etiquetas
+        self.mostrar(0)
+
+    def _colores(self, plano):
+        """Colores RGBA de las caras de una superficie a partir de su plano de valores."""
+        return self.cmap(self.norm(plano))
+
+    def mostrar(self, i):
+        """
+        Pone en la figura el cuadro i.
+
+        Args:
+            i (int): Índice del cuadro
+
+        Returns:
+            list: Artistas modificados (para FuncAnimation con blit=True)
+        """
+        i = int(i) % self.n_cuadros
+        for nombre, superficie in self.superficies.items():
+            plano = self.cuadros['planos'][nombre][:-1, :-1, i]
+            superficie.set_facecolor(self._colores(plano[self.celdas[nombre]]))
+        temps = self.cuadros['sensores'][i]
+        self.scatter.set_array(temps)
+        if self.ax.M is not None:
+            # Las colecciones 3D ordenan sus colores al proyectar; antes del
+            # primer dibujo no hay proyección y lo hace el propio draw
+            for coleccion in list(self.superficies.values()) + [self.scatter]:
+                coleccion.do_3d_projection()
+        self.linea_perfil.set_xdata(temps[self.perfil])
+        for etiqueta, nombre, temp in zip(self.etiquetas, self.nombres, temps):
+            etiqueta.set_text(f'{nombre}\n{temp:.1f}°C')
+        tiempo = self.cuadros['tiempos'][i]
+        self.titulo.set_text(f'Distribución Térmica del Invernadero - {tiempo:%Y-%m-%d %H:%M}')
+        return self.artistas
+
+    @classmethod
+    def exportar(cls, cuadros, ruta, fps=10, figsize=(15, 8), dpi=100):
+        """
+        Guarda el time-lapse como MP4 (ffmpeg) o GIF (Pillow) sin abrir ventanas.
+
+        Sólo lee los cuadros ya calculados, así que puede ejecutarse en un hilo
+        aparte mientras el análisis cambia.
+
+        Args:
+            cuadros (dict): Resultado de AnalisisInvernadero.cuadros_campo_termico
+            ruta (str): Archivo de salida (.mp4 o .gif)
+            fps (int): Cuadros por segundo del video
+            figsize (tuple): Tamaño de la figura en pulgadas
+            dpi (int): Resolución de la figura
+        """
+        from matplotlib.figure import Figure
+        from matplotlib.backends.backend_agg import FigureCanvasAgg
+        from matplotlib import animation
+
+        if ruta.lower().endswith('.gif'):
+            escritor = animation.PillowWriter(fps=fps)
+        elif animation.FFMpegWriter.isAvailable():
+            escritor = animation.FFMpegWriter(fps=fps)
+        else:
+            raise RuntimeError("No se encontró ffmpeg; exporte el time-lapse como GIF")
+
+        fig = Figure(figsize=figsize, dpi=dpi)
+        FigureCanvasAgg(fig)
+        animacion = cls(cuadros, fig)
+        anim = animation.FuncAnimation(fig, animacion.mostrar, frames=animacion.n_cuadros,
+                                       blit=True, repeat=False)
+        anim.save(ruta, writer=escritor, dpi=dpi)
+
+
+class IndiceTemporal:
+    """
+    Índice ordenado sobre la columna 'Fecha_Hora' para operaciones por rango.
+
+    Guarda las marcas de tiempo como enteros (ns) en un arreglo ordenado, de
+    modo que localizar un rango de fechas es una búsqueda binaria O(log n) y
+    el resultado es un intervalo de posiciones [inicio, fin) sobre las filas.
+    """
+
+    def __init__(self, fechas):
+        """
+        Args:
+            fechas (pd.Series): Columna 'Fecha_Hora' ya ordenada ascendentemente
+        """
+        self.tiempos = pd.to_datetime(fechas).to_numpy(dtype='datetime64[ns]').view('int64')
+
+    def __len__(self):
+        return len(self.tiempos)
+
+    @staticmethod
+    def _a_entero(fecha):
+        return pd.Timestamp(fecha).to_datetime64().astype('datetime64[ns]').view('int64')
+
+    def rango(self, inicio, fin):
+        """
+        Localiza las filas con inicio <= Fecha_Hora <= fin.
+
+        Args:
+            inicio, fin: Límites del rango (inclusivos)
+
+        Returns:
+            tuple: Posiciones (i0, i1) tales que las filas i0..i1-1 están en el rango
+        """
+        i0 = int(np.searchsorted(self.tiempos, self._a_entero(inicio), side='left'))
+        i1 = int(np.searchsorted(self.tiempos, self._a_entero(fin), side='right'))
+        return i0, max(i0, i1)
+
+    def eliminar(self, i0, i1):
+        """Quita las posiciones [i0, i1) del índice."""
+        self.tiempos = np.concatenate((self.tiempos[:i0], self.tiempos[i1:]))
+
+    def conservar(self, i0, i1):
+        """Deja solamente las posiciones [i0, i1) en el índice."""
+        self.tiempos = self.tiempos[i0:i1].copy()
+
+    def anexar(self, fechas):
+        """Agrega al final fechas posteriores a las del índice."""
+        nuevas = pd.to_datetime(fechas).to_numpy(dtype='datetime64[ns]').view('int64')
+        self.tiempos = np.concatenate((self.tiempos, nuevas))
+
+class PiramideAgregados:
+    """
+    Agregados de todas las columnas numéricas a varias resoluciones temporales.
+
+    Niveles: datos crudos, 10 min, 1 h, 1 día y 1 semana (desde el lunes). Cada
+    nivel guarda, por intervalo con datos, la media, el mínimo, el máximo y el
+    número de valores de cada columna. Sólo el primer nivel recorre los datos;
+    los siguientes se obtienen combinando los del nivel anterior (sumas,
+    conteos, mínimos y máximos), porque los intervalos están anidados.
+    """
+
+    # Nombre del nivel -> ancho del intervalo (None para los datos crudos)
+    NIVELES = OrderedDict([
+        ('crudo', None),
+        ('10min', pd.Timedelta('10min')),
+        ('1h', pd.Timedelta('1h')),
+        ('1D', pd.Timedelta('1D')),
+        ('1W', pd.Timedelta('7D')),
+    ])
+    # Las semanas empiezan en lunes (1970-01-05)
+    ORIGEN_SEMANAS = pd.Timestamp('1970-01-05').value
+
+    def __init__(self, datos, columna_tiempo='Fecha_Hora'):
+        """
+        Args:
+            datos (pd.DataFrame): Datos con la columna de tiempo
+            columna_tiempo (str): Nombre de la columna de fechas
+        """
+        tiempos = pd.to_datetime(datos[columna_tiempo]).to_numpy(dtype='datetime64[ns]').view('int64')
+        self.columnas = [col for col in datos.columns
+                         if col != columna_tiempo and pd.api.types.is_numeric_dtype(datos[col])
+                         and not pd.api.types.is_bool_dtype(datos[col])]
+        valores = datos[self.columnas].to_numpy(dtype=float)
+        if len(tiempos) and not np.all(tiempos[1:] >= tiempos[:-1]):
+            orden = np.argsort(tiempos, kind='stable')
+            tiempos, valores = tiempos[orden], valores[orden]
+
+        self.niveles = OrderedDict()
+        validos = ~np.isnan(valores)
+        suma = np.where(validos, valores, 0.0)
+        conteo = validos.astype(np.int64)
+        self.niveles['crudo'] = {'tiempo': tiempos, 'mean': valores, 'min': valores,
+                                 'max': valores, 'count': conteo}
+
+        # Cascada: cada nivel agrupa los intervalos del anterior
+        minimo = maximo = valores
+        for nombre, ancho in list(self.NIVELES.items())[1:]:
+            origen = self.ORIGEN_SEMANAS if nombre == '1W' else 0
+            claves = (tiempos - origen) // ancho.value
+            inicios = np.flatnonzero(np.r_[True, claves[1:] != claves[:-1]]) if len(claves) else np.array([], int)
+            if len(inicios):
+                suma = np.add.reduceat(suma, inicios, axis=0)
+                conteo = np.add.reduceat(conteo, inicios, axis=0)
+                minimo = np.fmin.reduceat(minimo, inicios, axis=0)
+                maximo = np.fmax.reduceat(maximo, inicios, axis=0)
+            tiempos = claves[inicios] * ancho.value + origen
+            with np.errstate(invalid='ignore', divide='ignore'):
+                media = suma / conteo
+            self.niveles[nombre] = {'tiempo': tiempos, 'mean': media, 'min': minimo,
+                                    'max': maximo, 'count': conteo}
+
+    def nivel(self, nombre, columna):
+        """
+        Agregados de una columna en un nivel.
+
+        Args:
+            nombre (str): Nivel ('crudo', '10min', '1h', '1D' o '1W')
+            columna (str): Columna de los datos
+
+        Returns:
+            dict: 'tiempo' (datetime64, inicio de cada intervalo), 'mean', 'min',
+                  'max' y 'count' como arreglos 1-D
+        """
+        j = self.columnas.index(columna)
+        datos = self.niveles[nombre]
+        resultado = {clave: valores[:, j] for clave, valores in datos.items() if clave != 'tiempo'}
+        resultado['tiempo'] = datos['tiempo'].view('datetime64[ns]')
+        return resultado
+
+    def elegir_nivel(self, inicio, fin, max_puntos):
+        """
+        Nivel más detallado con a lo sumo max_puntos intervalos en [inicio, fin].
+
+        Args:
+            inicio, fin: Límites del rango visible (fechas)
+            max_puntos (int): Número máximo de puntos a dibujar
+
+        Returns:
+            str: Nombre del nivel
+        """
+        t0 = pd.Timestamp(inicio).value
+        t1 = pd.Timestamp(fin).value
+        for nombre, datos in self.niveles.items():
+            i0, i1 = np.searchsorted(datos['tiempo'], [t0, t1])
+            if i1 - i0 <= max_puntos:
+                return nombre
+        return nombre
+
+
+def recalcular_hermanos(ax, clase):
+    """
+    Recalcula las vistas de los ejes que comparten x con `ax`.
+
+    Los ejes gemelos (twinx) comparten x pero no reciben el callback
+    'xlim_changed', así que la vista que lo recibe avisa a las suyas.
+
+    Args:
+        ax (Axes): Ejes cuyo rango x cambió
+        clase (type): Clase de vista (VistaPiramide o ReductorLineas), con `de(ax)`
+    """
+    for hermano in ax.get_shared_x_axes().get_siblings(ax):
+        if hermano is not ax and clase.de(hermano) is not None:
+            clase.de(hermano).recalcular()
+
+
+class VistaPiramide:
+    """
+    Series de una PiramideAgregados dibujadas al nivel que corresponde al zoom.
+
+    Cada serie es una línea con la media y una banda con el mínimo y el máximo
+    del nivel elegido; al hacer zoom o desplazarse (callback 'xlim_changed')
+    se elige de nuevo el nivel, con un intervalo por cada pocos píxeles.
+    Como ReductorLineas, la vista se guarda en los propios ejes.
+    """
+
+    PIXELES_POR_PUNTO = 3
+
+    def __init__(self, ax, piramide):
+        self.ax = ax
+        self.piramide = piramide
+        self.series = []
+        self.nivel = None
+        self._estado = None
+        ax.callbacks.connect('xlim_changed', self._al_cambiar_limites)
+        ax.figure.canvas.mpl_connect('resize_event', self._al_redimensionar)
+
+    @classmethod
+    def de(cls, ax):
+        """Vista de unos ejes, o None si no tienen series de la pirámide."""
+        return getattr(ax, '_vista_piramide', None)
+
+    @classmethod
+    def graficar(cls, ax, piramide, columna, color, label=None):
+        """
+        Dibuja una columna de la pirámide (media y banda mínimo-máximo).
+
+        Args:
+            ax (Axes): Ejes donde dibujar
+            piramide (PiramideAgregados): Agregados de los datos
+            columna (str): Columna a dibujar
+            color: Color de la línea y de la banda
+            label (str): Etiqueta de la leyenda
+
+        Returns:
+            Line2D: Línea de la media
+        """
+        vista = cls.de(ax)
+        if vista is None:
+            vista = ax._vista_piramide = cls(ax, piramide)
+        linea, = ax.plot([], [], color=color, label=label, linewidth=1.2)
+        ax.xaxis_date()
+        serie = {'columna': columna, 'linea': linea, 'color': color, 'banda': None}
+        vista.series.append(serie)
+        completo = piramide.niveles['crudo']['tiempo']
+        if len(completo):
+            ax.set_xlim(mdates.date2num(completo[[0, -1]].view('datetime64[ns]')))
+        vista.recalcular(forzar=True)
+        return linea
+
+    def _al_cambiar_limites(self, ax):
+        self.recalcular()
+        recalcular_hermanos(ax, type(self))
+
+    def _al_redimensionar(self, event):
+        self.recalcular()
+
+    def recalcular(self, forzar=False):
+        """Elige el nivel para el rango visible y actualiza las series y el eje y."""
+        x0, x1 = self.ax.get_xlim()
+        estado = ((x0, x1), int(self.ax.bbox.width))
+        if estado == self._estado and not forzar:
+            return
+        self._estado = estado
+        inicio, fin = mdates.num2date(x0).replace(tzinfo=None), mdates.num2date(x1).replace(tzinfo=None)
+        max_puntos = max(int(self.ax.bbox.width / self.PIXELES_POR_PUNTO), 10)
+        nivel = self.piramide.elegir_nivel(inicio, fin, max_puntos)
+        self.nivel = nivel
+        t0, t1 = np.datetime64(inicio, 'ns'), np.datetime64(fin, 'ns')
+        y_min, y_max = np.inf, -np.inf
+        for serie in self.series:
+            datos = self.piramide.nivel(nivel, serie['columna'])
+            # Sólo el rango visible, más un vecino a cada lado para que la
+            # línea y la banda lleguen hasta los bordes de los ejes
+            i0 = np.searchsorted(datos['tiempo'], t0, side='left')
+            i1 = np.searchsorted(datos['tiempo'], t1, side='right')
+            if i1 > i0:
+                y_min = min(y_min, np.nanmin(datos['min'][i0:i1]))
+                y_max = max(y_max, np.nanmax(datos['max'][i0:i1]))
+            datos = {clave: valores[max(i0 - 1, 0):i1 + 1] for clave, valores in datos.items()}
+            serie['linea'].set_data(datos['tiempo'], datos['mean'])
+            serie['linea'].set_marker('o' if len(datos['tiempo']) <= 60 else '')
+            serie['linea'].set_markersize(3)
+            if serie['banda'] is not None:
+                serie['banda'].remove()
+                serie['banda'] = None
+            if nivel != 'crudo':
+                serie['banda'] = self.ax.fill_between(datos['tiempo'], datos['min'], datos['max'],
+                                                      color=serie['color'], alpha=0.15, linewidth=0)
+        # relim no considera las bandas: el eje y se ajusta al mínimo y máximo visibles
+        if np.isfinite(y_min) and np.isfinite(y_max):
+            margen = 0.05 * (y_max - y_min) or 0.5
+            self.ax.set_ylim(y_min - margen, y_max + margen)
+        self.ax.figure.canvas.draw_idle()
+
+
+class PosicionSolar:
+    """
+    Geometría solar (salida, puesta y elevación del sol) para la estación.
+
+    Usa las fórmulas de la NOAA (declinación y ecuación del tiempo por serie
+    de Fourier del año fraccional) y -0.833° de elevación para la salida y la
+    puesta (refracción y radio del disco). Lo que sólo depende de la fecha se
+    memoriza por día del calendario, así que millones de filas cuestan una
+    evaluación por día; por fila sólo queda el ángulo horario y la elevación.
+    Las fechas se suponen en hora local estándar con desplazamiento fijo (el
+    centro de México no usa horario de verano desde 2022).
+    """
+
+    ELEVACION_HORIZONTE = -0.833
+
+    def __init__(self, latitud=19.50555556, longitud=-98.88194444, utc=-6):
+        """
+        Args:
+            latitud (float): Latitud en grados (norte positiva); por defecto la
+                estación CONAGUA 15125 Texcoco
+            longitud (float): Longitud en grados (este positiva)
+            utc (float): Desplazamiento de la hora local respecto a UTC (horas)
+        """
+        self.latitud = latitud
+        self.longitud = longitud
+        self.utc = utc
+        # Día (días desde 1970-01-01) -> (declinación, ecuación del tiempo,
+        # salida y puesta en minutos locales)
+        self._dias = {}
+
+    def dias(self, dias):
+        """
+        Efemérides de cada día, calculadas sólo para los días no memorizados.
+
+        Args:
+            dias (np.ndarray): Días desde 1970-01-01 (int64)
+
+        Returns:
+            np.ndarray: Forma (len(dias), 4) con declinación (rad), ecuación
+                        del tiempo (min), salida y puesta (min locales)
+        """
+        nuevos = np.array([d for d in np.unique(dias) if d not in self._dias], dtype=np.int64)
+        if len(nuevos):
+            fechas = pd.DatetimeIndex(nuevos.astype('datetime64[D]'))
+            g = 2 * np.pi / np.where(fechas.is_leap_year, 366, 365) * (fechas.dayofyear - 1)
+            ecuacion = 229.18 * (0.000075 + 0.001868 * np.cos(g) - 0.032077 * np.sin(g)
+                                 - 0.014615 * np.cos(2 * g) - 0.040849 * np.sin(2 * g))
+            declinacion = (0.006918 - 0.399912 * np.cos(g) + 0.070257 * np.sin(g)
+                           - 0.006758 * np.cos(2 * g) + 0.000907 * np.sin(2 * g)
+                           - 0.002697 * np.cos(3 * g) + 0.00148 * np.sin(3 * g))
+            latitud = np.radians(self.latitud)
+            # Ángulo horario de la salida (recortado para el día o la noche polar)
+            cos_h0 = ((np.sin(np.radians(self.ELEVACION_HORIZONTE)) - np.sin(latitud) * np.sin(declinacion))
+                      / (np.cos(latitud) * np.cos(declinacion)))
+            h0 = np.degrees(np.arccos(np.clip(cos_h0, -1, 1)))
+            mediodia = 720 - 4 * self.longitud - ecuacion + 60 * self.utc
+            self._dias.update(zip(nuevos.tolist(), zip(declinacion, ecuacion,
+                                                       mediodia - 4 * h0, mediodia + 4 * h0)))
+        return np.array([self._dias[d] for d in np.asarray(dias).tolist()], dtype=float).reshape(-1, 4)
+
+    def calcular(self, tiempos):
+        """
+        Salida y puesta del sol, elevación solar y día/noche por fila.
+
+        Args:
+            tiempos (array-like): Fechas en hora local
+
+        Returns:
+            dict: 'Elevacion_solar' (°), 'Salida_sol' y 'Puesta_sol' (hora
+                  local decimal) y 'Es_Dia' (entre la salida y la puesta)
+        """
+        ns = pd.to_datetime(pd.Series(tiempos)).to_numpy(dtype='datetime64[ns]').view('int64')
+        dia_ns = pd.Timedelta('1D').value
+        dia = ns // dia_ns
+        # Una fila por día distinto; en datos ordenados basta con los cambios de día
+        if np.all(dia[1:] >= dia[:-1]):
+            cambio = np.r_[True, dia[1:] != dia[:-1]] if len(dia) else np.zeros(0, dtype=bool)
+            unicos, inverso = dia[cambio], np.cumsum(cambio) - 1
+        else:
+            unicos, inverso = np.unique(dia, return_inverse=True)
+        declinacion, ecuacion, salida, puesta = self.dias(unicos)[inverso].T
+
+        minutos = (ns - dia * dia_ns) / 6e10
+        angulo = np.radians((minutos + ecuacion + 4 * self.longitud - 60 * self.utc) / 4 - 180)
+        latitud = np.radians(self.latitud)
+        seno = (np.sin(latitud) * np.sin(declinacion)
+                + np.cos(latitud) * np.cos(declinacion) * np.cos(angulo))
+        return {
+            'Elevacion_solar': np.degrees(np.arcsin(np.clip(seno, -1, 1))),
+            'Salida_sol': salida / 60,
+            'Puesta_sol': puesta / 60,
+            'Es_Dia': (minutos >= salida) & (minutos < puesta)
+        }
+
+
+class CuboAgregados:
+    """
+    Agregados de varias columnas por día × hora del día × período (día/noche).
+
+    Cada celda guarda el número de valores, la suma, la suma de cuadrados, el
+    mínimo y el máximo de cada columna, de modo que medias, desviaciones y
+    extremos por hora, por día o por período se obtienen sumando celdas sin
+    volver a recorrer los datos. Para los cuantiles se guarda además un
+    histograma fino (BINS_CUANTILES intervalos entre el mínimo y el máximo de
+    cada columna) por hora del día y período.
+    """
+
+    PERIODOS = ('Día', 'Noche')
+    BINS_CUANTILES = 1024
+
+    def __init__(self, datos, columnas, columna_tiempo='Fecha_Hora',
+                 columna_hora='Hora', columna_dia='Es_Dia'):
+        """
+        Args:
+            datos (pd.DataFrame): Datos con las columnas de tiempo, hora y período
+            columnas (list): Columnas numéricas a agregar
+            columna_tiempo (str): Nombre de la columna de fechas
+            columna_hora (str): Nombre de la columna con la hora del día (0-23)
+            columna_dia (str): Nombre de la columna booleana que marca el día
+        """
+        self.columnas = [col for col in columnas if col in datos.columns]
+        valores = datos[self.columnas].to_numpy(dtype=float)
+        n_cols = len(self.columnas)
+
+        # Días del calendario contiguos desde el primero con datos
+        dias = (pd.to_datetime(datos[columna_tiempo]).to_numpy(dtype='datetime64[ns]')
+                .astype('datetime64[D]').astype(np.int64))
+        self.dia_inicial = int(dias.min()) if len(dias) else 0
+        n_dias = int(dias.max()) - self.dia_inicial + 1 if len(dias) else 0
+        self.dias = np.arange(self.dia_inicial, self.dia_inicial + n_dias).astype('datetime64[D]')
+        horas = datos[columna_hora].to_numpy(dtype=np.int64)
+        noche = (~datos[columna_dia].to_numpy(dtype=bool)).astype(np.int64)
+        celdas = ((dias - self.dia_inicial) * 24 + horas) * 2 + noche
+
+        # Se suma con un desplazamiento por columna para que la varianza no
+        # pierda precisión al restar sumas grandes
+        validos = ~np.isnan(valores)
+        con_datos = validos.any(axis=0)
+        self.desplazamiento = np.zeros(n_cols)
+        if len(valores):
+            primero = validos.argmax(axis=0)
+            self.desplazamiento[con_datos] = valores[primero, np.arange(n_cols)][con_datos]
+        centrados = np.where(validos, valores - self.desplazamiento, 0.0)
+
+        forma = (n_dias * 24 * 2, n_cols)
+        self.count = np.zeros(forma, dtype=np.int64)
+        self.sum = np.zeros(forma)
+        self.sumsq = np.zeros(forma)
+        self.min = np.full(forma, np.nan)
+        self.max = np.full(forma, np.nan)
+        if len(celdas):
+            if not np.all(celdas[1:] >= celdas[:-1]):
+                orden = np.argsort(celdas, kind='stable')
+                celdas, valores = celdas[orden], valores[orden]
+                validos, centrados = validos[orden], centrados[orden]
+            inicios = np.flatnonzero(np.r_[True, celdas[1:] != celdas[:-1]])
+            destino = celdas[inicios]
+            self.count[destino] = np.add.reduceat(validos.astype(np.int64), inicios, axis=0)
+            self.sum[destino] = np.add.reduceat(centrados, inicios, axis=0)
+            self.sumsq[destino] = np.add.reduceat(centrados * centrados, inicios, axis=0)
+            self.min[destino] = np.fmin.reduceat(valores, inicios, axis=0)
+            self.max[destino] = np.fmax.reduceat(valores, inicios, axis=0)
+        forma = (n_dias, 24, 2, n_cols)
+        for nombre in ('count', 'sum', 'sumsq', 'min', 'max'):
+            setattr(self, nombre, getattr(self, nombre).reshape(forma))
+
+        # Histogramas para los cuantiles: (columna, hora, período, intervalo)
+        bins = self.BINS_CUANTILES
+        with warnings.catch_warnings():
+            warnings.simplefilter('ignore', RuntimeWarning)
+            minimo = np.nanmin(valores, axis=0) if len(valores) else np.full(n_cols, np.nan)
+            maximo = np.nanmax(valores, axis=0) if len(valores) else np.full(n_cols, np.nan)
+        minimo = np.where(np.isnan(minimo), 0.0, minimo)
+        maximo = np.where(np.isnan(maximo), minimo, maximo)
+        ancho = np.where(maximo > minimo, maximo - minimo, 1.0)
+        self.bordes = minimo[:, None] + np.linspace(0, 1, bins + 1)[None, :] * ancho[:, None]
+        fila, columna = np.nonzero(validos)
+        v = valores[fila, columna]
+        intervalo = np.minimum(((v - minimo[columna]) / ancho[columna] * bins).astype(np.int64), bins - 1)
+        # Corrección por redondeo en los bordes (como np.histogram)
+        intervalo -= v < self.bordes[columna, intervalo]
+        intervalo += (v >= self.bordes[columna, intervalo + 1]) & (intervalo < bins - 1)
+        hora_periodo = (celdas[fila] % 48)
+        self.histogramas = np.bincount(
+            (columna * 48 + hora_periodo) * bins + intervalo,
+            minlength=n_cols * 48 * bins).reshape(n_cols, 24, 2, bins)
+
+    def _seleccion(self, periodo):
+        """Índices del eje de período para 'Día', 'Noche' o ambos (None)."""
+        if periodo is None:
+            return slice(None)
+        return slice(self.PERIODOS.index(periodo), self.PERIODOS.index(periodo) + 1)
+
+    def agregar(self, columna, por=None, periodo=None):
+        """
+        Estadísticos de una columna, en total o agrupados.
+
+        Args:
+            columna (str): Columna agregada
+            por (str): None (un solo grupo), 'hora', 'dia' o 'periodo'
+            periodo (str): 'Día' o 'Noche' para limitarse a ese período
+
+        Returns:
+            dict: 'indice' (horas, días o períodos; None si por es None) y
+                  'count', 'mean', 'std' (muestral), 'min' y 'max'
+        """
+        j = self.columnas.index(columna)
+        p = self._seleccion(periodo)
+        celdas = {nombre: getattr(self, nombre)[:, :, p, j]
+                  for nombre in ('count', 'sum', 'sumsq', 'min', 'max')}
+        ejes = {None: (0, 1, 2), 'dia': (1, 2), 'hora': (0, 2), 'periodo': (0, 1)}[por]
+        indice = {None: None, 'dia': self.dias, 'hora': np.arange(24),
+                  'periodo': np.array(self.PERIODOS)[p]}[por]
+
+        with warnings.catch_warnings():
+            warnings.simplefilter('ignore', RuntimeWarning)
+            n = celdas['count'].sum(axis=ejes)
+            s = celdas['sum'].sum(axis=ejes)
+            ss = celdas['sumsq'].sum(axis=ejes)
+            media = s / n
+            varianza = np.maximum(ss - s * media, 0.0) / (n - 1)
+            resultado = {
+                'indice': indice,
+                'count': n,
+                'mean': media + self.desplazamiento[j],
+                'std': np.where(n > 1, np.sqrt(varianza), np.nan),
+                'min': np.nanmin(celdas['min'], axis=ejes) if celdas['min'].size else np.full(np.shape(n), np.nan),
+                'max': np.nanmax(celdas['max'], axis=ejes) if celdas['max'].size else np.full(np.shape(n), np.nan),
+            }
+        return resultado
+
+    def histograma(self, columna, bins=32, periodo=None):
+        """
+        Histograma de una columna reagrupando los intervalos finos.
+
+        Args:
+            columna (str): Columna
+            bins (int): Número de intervalos; debe dividir a BINS_CUANTILES
+            periodo (str): 'Día' o 'Noche' para limitarse a ese período
+
+        Returns:
+            tuple: (conteos, bordes)
+        """
+        j = self.columnas.index(columna)
+        conteos = self.histogramas[j, :, self._seleccion(periodo)].sum(axis=(0, 1))
+        paso = self.BINS_CUANTILES // bins
+        return conteos.reshape(bins, paso).sum(axis=1), self.bordes[j, ::paso]
+
+    def cuantiles(self, columna, q, periodo=None, horas=None):
+        """
+        Cuantiles aproximados de una columna a partir de los histogramas.
+
+        El error es a lo sumo el ancho de un intervalo fino (1/BINS_CUANTILES
+        del rango de la columna).
+
+        Args:
+            columna (str): Columna
+            q (float o array): Cuantiles entre 0 y 1
+            periodo (str): 'Día' o 'Noche' para limitarse a ese período
+            horas (array): Horas del día a considerar (None para todas)
+
+        Returns:
+            np.ndarray: Valores de los cuantiles (NaN si no hay datos)
+        """
+        j = self.columnas.index(columna)
+        histograma = self.histogramas[j][:, self._seleccion(periodo)]
+        if horas is not None:
+            histograma = histograma[np.asarray(horas)]
+        acumulado = np.cumsum(histograma.sum(axis=(0, 1)))
+        q = np.asarray(q, dtype=float)
+        if not len(acumulado) or acumulado[-1] == 0:
+            return np.full(q.shape, np.nan)
+        # Interpolación lineal dentro del intervalo que contiene cada cuantil
+        return np.interp(q * acumulado[-1], np.r_[0, acumulado], self.bordes[j])
+
+
+class EstadisticasMoviles:
+    """
+    Motor incremental de estadísticas móviles por canal.
+
+    Para cada canal guarda, muestra a muestra, la media, la varianza (muestral),
+    el mínimo y el máximo de las últimas `ventana` muestras y una media móvil
+    exponencial (EWMA). Como rolling de pandas, las estadísticas de ventana son
+    NaN mientras la ventana no tenga `ventana` valores válidos; en las muestras
+    NaN la EWMA conserva su valor.
+
+    agregar() actualiza todo en O(1) por muestra (sumas corridas y colas
+    monótonas para los extremos); extender() hace lo mismo para un bloque de
+    muestras de forma vectorizada. Las series resultantes se guardan y se leen
+    con serie() sin volver a recorrer los datos.
+    """
+
+    ESTADISTICAS = ('media', 'varianza', 'ewma', 'min', 'max')
+
+    def __init__(self):
+        self.canales = OrderedDict()
+        self.n = 0
+        self._tiempos = np.empty(0, dtype='datetime64[ns]')
+
+    def agregar_canal(self, nombre, ventana=24, alfa=None):
+        """
+        Registra un canal (antes de agregar muestras).
+
+        Args:
+            nombre (str): Nombre del canal (columna de los datos)
+            ventana (int): Número de muestras de la ventana móvil
+            alfa (float): Factor de la EWMA; None usa 2 / (ventana + 1)
+        """
+        if self.n:
+            raise ValueError("Los canales se registran antes de agregar muestras")
+        self.canales[nombre] = {
+            'ventana': ventana,
+            'alfa': 2 / (ventana + 1) if alfa is None else alfa,
+            'buffer': deque(maxlen=ventana),
+            'minimos': deque(), 'maximos': deque(),   # (índice, valor) monótonas
+            'suma': 0.0, 'sumsq': 0.0, 'validos': 0,
+            'desplazamiento': None, 'ewma': np.nan,
+            'series': {e: np.empty(0) for e in self.ESTADISTICAS},
+        }
+
+    def _reservar(self, k):
+        """Amplía (duplicando) el espacio de las series para k muestras más."""
+        necesario = self.n + k
+        if necesario <= len(self._tiempos):
+            return
+        capacidad = max(necesario, 2 * len(self._tiempos), 1024)
+        nuevo = np.empty(capacidad, dtype='datetime64[ns]')
+        nuevo[:self.n] = self._tiempos[:self.n]
+        self._tiempos = nuevo
+        for canal in self.canales.values():
+            for nombre, serie in canal['series'].items():
+                nueva = np.full(capacidad, np.nan)
+                nueva[:self.n] = serie[:self.n]
+                canal['series'][nombre] = nueva
+
+    @property
+    def tiempos(self):
+        """Instantes de las muestras agregadas."""
+        return self._tiempos[:self.n]
+
+    def serie(self, canal, estadistica):
+        """
+        Serie de una estadística de un canal (una fila por muestra).
+
+        Args:
+            canal (str): Nombre del canal
+            estadistica (str): 'media', 'varianza', 'ewma', 'min' o 'max'
+
+        Returns:
+            np.ndarray: Vista de la serie (no copiar si no es necesario)
+        """
+        return self.canales[canal]['series'][estadistica][:self.n]
+
+    def agregar(self, tiempo, valores):
+        """
+        Agrega una muestra y actualiza las estadísticas en O(1).
+
+        Args:
+            tiempo: Instante de la muestra
+            valores (dict): Valor de cada canal (los que falten cuentan como NaN)
+        """
+        self._reservar(1)
+        i = self.n
+        self._tiempos[i] = np.datetime64(pd.Timestamp(tiempo), 'ns')
+        for nombre, canal in self.canales.items():
+            x = float(valores.get(nombre, np.nan))
+            w = canal['ventana']
+            buffer = canal['buffer']
+            if canal['desplazamiento'] is None and not np.isnan(x):
+                canal['desplazamiento'] = x
+            d = canal['desplazamiento'] or 0.0
+
+            # Sale la muestra más antigua de la ventana
+            if len(buffer) == w:
+                saliente = buffer[0]
+                if not np.isnan(saliente):
+                    canal['suma'] -= saliente - d
+                    canal['sumsq'] -= (saliente - d) ** 2
+                    canal['validos'] -= 1
+            buffer.append(x)
+            for cola in (canal['minimos'], canal['maximos']):
+                if cola and cola[0][0] <= i - w:
+                    cola.popleft()
+            if not np.isnan(x):
+                canal['suma'] += x - d
+                canal['sumsq'] += (x - d) ** 2
+                canal['validos'] += 1
+                while canal['minimos'] and canal['minimos'][-1][1] >= x:
+                    canal['minimos'].pop()
+                canal['minimos'].append((i, x))
+                while canal['maximos'] and canal['maximos'][-1][1] <= x:
+                    canal['maximos'].pop()
+                canal['maximos'].append((i, x))
+                canal['ewma'] = x if np.isnan(canal['ewma']) else (
+                    canal['alfa'] * x + (1 - canal['alfa']) * canal['ewma'])
+
+            series = canal['series']
+            series['ewma'][i] = canal['ewma']
+            if canal['validos'] == w:
+                media = canal['suma'] / w
+                series['media'][i] = d + media
+                series['varianza'][i] = (max(canal['sumsq'] - canal['suma'] * media, 0.0) / (w - 1)
+                                         if w > 1 else np.nan)
+                series['min'][i] = canal['minimos'][0][1]
+                series['max'][i] = canal['maximos'][0][1]
+            else:
+                for e in ('media', 'varianza', 'min', 'max'):
+                    series[e][i] = np.nan
+        self.n += 1
+
+    def extender(self, tiempos, datos):
+        """
+        Agrega un bloque de muestras (mismo resultado que agregar() una a una).
+
+        Args:
+            tiempos (array): Instantes de las muestras
+            datos (pd.DataFrame o dict): Valores de cada canal
+        """
+        from scipy.ndimage import maximum_filter1d, minimum_filter1d
+        tiempos = pd.to_datetime(np.asarray(tiempos)).to_numpy(dtype='datetime64[ns]')
+        k = len(tiempos)
+        if not k:
+            return
+        self._reservar(k)
+        i0 = self.n
+        self._tiempos[i0:i0 + k] = tiempos
+        for nombre, canal in self.canales.items():
+            x = (np.asarray(datos[nombre], dtype=float) if nombre in datos
+                 else np.full(k, np.nan))
+            w = canal['ventana']
+            buffer = canal['buffer']
+            validos_x = ~np.isnan(x)
+            if canal['desplazamiento'] is None and validos_x.any():
+                canal['desplazamiento'] = x[validos_x.argmax()]
+            d = canal['desplazamiento'] or 0.0
+
+            # Se antepone la ventana anterior para que las primeras muestras
+            # del bloque tengan su ventana completa
+            previo = np.array(buffer, dtype=float)[max(len(buffer) - (w - 1), 0):]
+            z = np.r_[previo, x]
+            m = len(previo)
+            validos = ~np.isnan(z)
+            centrados = np.where(validos, z - d, 0.0)
+            S = np.r_[0.0, np.cumsum(centrados)]
+            Q = np.r_[0.0, np.cumsum(centrados * centrados)]
+            C = np.r_[0, np.cumsum(validos)]
+            fin = np.arange(m, m + k) + 1
+            inicio = np.maximum(fin - w, 0)
+            suma = S[fin] - S[inicio]
+            completa = (C[fin] - C[inicio]) == w
+            series = canal['series']
+            with np.errstate(invalid='ignore', divide='ignore'):
+                media = suma / w
+                series['media'][i0:i0 + k] = np.where(completa, d + media, np.nan)
+                varianza = np.maximum(Q[fin] - Q[inicio] - suma * media, 0.0) / (w - 1)
+                series['varianza'][i0:i0 + k] = np.where(completa & (w > 1), varianza, np.nan)
+            # Ventana hacia atrás: el filtro centrado se desplaza (w - 1) // 2
+            origen = (w - 1) // 2
+            minimo = minimum_filter1d(np.where(validos, z, np.inf), w, origin=origen, mode='nearest')
+            maximo = maximum_filter1d(np.where(validos, z, -np.inf), w, origin=origen, mode='nearest')
+            series['min'][i0:i0 + k] = np.where(completa, minimo[m:], np.nan)
+            series['max'][i0:i0 + k] = np.where(completa, maximo[m:], np.nan)
+
+            # EWMA con la recurrencia lineal, repitiendo el último valor válido
+            series['ewma'][i0:i0 + k] = self._ewma(x, validos_x, canal['alfa'], canal['ewma'])
+            if validos_x.any():
+                canal['ewma'] = series['ewma'][i0 + k - 1]
+
+            # Estado para seguir con agregar(): ventana, sumas y colas monótonas
+            buffer.extend(x[-w:])
+            ventana = np.array(buffer, dtype=float)
+            indices = np.arange(i0 + k - len(ventana), i0 + k)
+            en_ventana = ~np.isnan(ventana)
+            canal['suma'] = float(np.sum(ventana[en_ventana] - d))
+            canal['sumsq'] = float(np.sum((ventana[en_ventana] - d) ** 2))
+            canal['validos'] = int(en_ventana.sum())
+            canal['minimos'].clear()
+            canal['maximos'].clear()
+            for j, v in zip(indices[en_ventana], ventana[en_ventana]):
+                while canal['minimos'] and canal['minimos'][-1][1] >= v:
+                    canal['minimos'].pop()
+                canal['minimos'].append((j, v))
+                while canal['maximos'] and canal['maximos'][-1][1] <= v:
+                    canal['maximos'].pop()
+                canal['maximos'].append((j, v))
+        self.n += k
+
+    @staticmethod
+    def _ewma(x, validos, alfa, previo):
+        """EWMA de un bloque partiendo del valor previo (NaN si no hay)."""
+        from scipy.signal import lfilter
+        valores = x[validos]
+        if not len(valores):
+            return np.full(len(x), previo)
+        inicial = valores[0] if np.isnan(previo) else previo
+        y, _ = lfilter([alfa], [1, alfa - 1], valores, zi=[(1 - alfa) * inicial])
+        # En las muestras NaN la EWMA conserva el último valor
+        rango = np.cumsum(validos) - 1
+        return np.where(rango >= 0, y[np.maximum(rango, 0)], previo)
+
+
+class PronosticadorClima:
+    """
+    Pronósticos horarios (1 a 24 h) de variables internas del invernadero.
+
+    Se trabaja sobre la serie horaria (nivel '1h' de la pirámide de agregados,
+    con los huecos interpolados) y se ajustan dos modelos por variable:
+
+    - 'estacional': suavizado exponencial de Holt-Winters aditivo con ciclo
+      diario (24 h). Los factores alfa, beta y gamma se eligen de una rejilla
+      ejecutando la recursión para todas las combinaciones a la vez.
+    - 'regresion': regresión directa por mínimos cuadrados del valor dentro de
+      h horas sobre las condiciones exteriores, el valor interior actual y
+      armónicos de la hora del día. Todos los horizontes se resuelven con un
+      solo lstsq (una columna de objetivos por horizonte).
+
+    Los intervalos son de ~95 % (Z_INTERVALO desviaciones de los errores).
+    """
+
+    MODELOS = ('estacional', 'regresion')
+    PERIODO = 24
+    HORIZONTE_MAX = 24
+    Z_INTERVALO = 1.96
+    REJILLA_ALFA = (0.05, 0.1, 0.2, 0.3, 0.5, 0.7, 0.9)
+    REJILLA_BETA = (0.0, 0.001, 0.01, 0.05)
+    REJILLA_GAMMA = (0.05, 0.1, 0.2, 0.3, 0.5)
+
+    def __init__(self, piramide, variables, exteriores=()):
+        """
+        Args:
+            piramide (PiramideAgregados): Agregados de los datos
+            variables (list): Columnas a pronosticar
+            exteriores (list): Columnas exteriores usadas por la regresión
+        """
+        columnas = [col for col in list(variables) + list(exteriores) if col in piramide.columnas]
+        hora = pd.Timedelta('1h').value
+        tiempos = [piramide.nivel('1h', col)['tiempo'].view('int64') for col in columnas]
+        if columnas and len(tiempos[0]):
+            t0 = min(t[0] for t in tiempos)
+            t1 = max(t[-1] for t in tiempos)
+            self.tiempos = np.arange(t0, t1 + hora, hora)
+        else:
+            self.tiempos = np.array([], dtype=np.int64)
+
+        # Serie horaria regular: los huecos se rellenan interpolando
+        self.series = {}
+        for col in columnas:
+            nivel = piramide.nivel('1h', col)
+            validos = nivel['count'] > 0
+            if validos.any():
+                self.series[col] = np.interp(self.tiempos, nivel['tiempo'].view('int64')[validos],
+                                             nivel['mean'][validos])
+        self.exteriores = [col for col in exteriores if col in self.series]
+        self.horas = (self.tiempos // hora) % 24
+
+        self.modelos = {}
+        for variable in variables:
+            if variable in self.series:
+                self.modelos[(variable, 'estacional')] = self._ajustar_estacional(self.series[variable])
+                self.modelos[(variable, 'regresion')] = self._ajustar_regresion(self.series[variable])
+
+    @classmethod
+    def _recursion_estacional(cls, y, horas, alfa, beta, gamma, errores=False):
+        """
+        Recursión de Holt-Winters aditivo en forma de corrección de errores,
+        vectorizada sobre combinaciones de factores (arreglos de igual tamaño).
+        """
+        m = cls.PERIODO
+        primero, segundo = y[:m].mean(), y[m:2 * m].mean()
+        nivel = np.full(len(alfa), primero)
+        tendencia = np.full(len(alfa), (segundo - primero) / m)
+        estacion = np.zeros((len(alfa), m))
+        estacion[:, horas[:m]] = y[:m] - primero
+        sse = np.zeros(len(alfa))
+        residuos = np.empty((len(y), len(alfa))) if errores else None
+        for t in range(len(y)):
+            h = horas[t]
+            e = y[t] - (nivel + tendencia + estacion[:, h])
+            # El primer ciclo sólo sirve para arrancar los estados
+            if t >= m:
+                sse += e * e
+            if errores:
+                residuos[t] = e
+            nivel = nivel + tendencia + alfa * e
+            tendencia = tendencia + beta * e
+            estacion[:, h] += gamma * e
+        return nivel, tendencia, estacion, sse, residuos
+
+    def _ajustar_estacional(self, y):
+        """Elige los factores de la rejilla con menor error a un paso y guarda el estado final."""
+        m = self.PERIODO
+        if len(y) < 3 * m:
+            return None
+        alfa, beta, gamma = (g.ravel() for g in np.meshgrid(
+            self.REJILLA_ALFA, self.REJILLA_BETA, self.REJILLA_GAMMA, indexing='ij'))
+        # Región de estabilidad habitual: beta <= alfa, gamma <= 1 - alfa
+        validos = (beta <= alfa) & (gamma <= 1 - alfa)
+        alfa, beta, gamma = alfa[validos], beta[validos], gamma[validos]
+        *_, sse, _ = self._recursion_estacional(y, self.horas, alfa, beta, gamma)
+        k = np.argmin(sse)
+        nivel, tendencia, estacion, sse, _ = self._recursion_estacional(
+            y, self.horas, alfa[k:k + 1], beta[k:k + 1], gamma[k:k + 1])
+        return {'alfa': alfa[k], 'beta': beta[k], 'gamma': gamma[k],
+                'nivel': nivel[0], 'tendencia': tendencia[0], 'estacion': estacion[0],
+                'sigma': np.sqrt(sse[0] / (len(y) - m))}
+
+    def _regresores(self, y, indices):
+        """Matriz de regresores (constante, exteriores, valor actual y armónicos) en los índices dados."""
+        angulo = 2 * np.pi * self.horas[indices] / 24
+        columnas = [np.ones(len(indices))]
+        columnas += [self.series[col][indices] for col in self.exteriores]
+        columnas += [y[indices], np.sin(angulo), np.cos(angulo), np.sin(2 * angulo), np.cos(2 * angulo)]
+        return np.column_stack(columnas)
+
+    def _ajustar_regresion(self, y):
+        """Una regresión por horizonte, todas con un solo lstsq."""
+        H = self.HORIZONTE_MAX
+        n = len(y) - H
+        X = self._regresores(y, np.arange(max(n, 0)))
+        if n <= 2 * X.shape[1]:
+            return None
+        objetivos = np.lib.stride_tricks.sliding_window_view(y[1:], H)[:n]
+        coeficientes, *_ = np.linalg.lstsq(X, objetivos, rcond=None)
+        residuos = objetivos - X @ coeficientes
+        sigma = np.sqrt((residuos ** 2).sum(axis=0) / (n - X.shape[1]))
+        return {'coeficientes': coeficientes, 'sigma': sigma}
+
+    def pronosticar(self, variable, modelo='estacional', horizonte=24):
+        """
+        Pronóstico horario a partir de la última hora con datos.
+
+        Args:
+            variable (str): Columna pronosticada
+            modelo (str): 'estacional' o 'regresion'
+            horizonte (int): Número de horas (1 a HORIZONTE_MAX)
+
+        Returns:
+            pd.DataFrame: Índice de fechas y columnas 'prediccion', 'inferior'
+                          y 'superior'
+
+        Raises:
+            ValueError: Si no hay suficientes datos para el modelo
+        """
+        if not 1 <= horizonte <= self.HORIZONTE_MAX:
+            raise ValueError(f"El horizonte debe estar entre 1 y {self.HORIZONTE_MAX} horas")
+        ajuste = self.modelos.get((variable, modelo))
+        if ajuste is None:
+            raise ValueError(f"Datos insuficientes para el modelo {modelo} de {variable}")
+        h = np.arange(1, horizonte + 1)
+        if modelo == 'estacional':
+            horas = (self.horas[-1] + h) % self.PERIODO
+            prediccion = ajuste['nivel'] + h * ajuste['tendencia'] + ajuste['estacion'][horas]
+            # Varianza de ETS(A,A,A): sigma² (1 + suma de (alfa + j beta)² para j < h)
+            c = (ajuste['alfa'] + np.arange(1, horizonte) * ajuste['beta']) ** 2
+            sigma = ajuste['sigma'] * np.sqrt(1 + np.r_[0, np.cumsum(c)])
+        else:
+            y = self.series[variable]
+            x = self._regresores(y, np.array([len(y) - 1]))[0]
+            prediccion = x @ ajuste['coeficientes'][:, :horizonte]
+            sigma = ajuste['sigma'][:horizonte]
+        indice = pd.to_datetime(self.tiempos[-1] + h * pd.Timedelta('1h').value)
+        return pd.DataFrame({
+            'prediccion': prediccion,
+            'inferior': prediccion - self.Z_INTERVALO * sigma,
+            'superior': prediccion + self.Z_INTERVALO * sigma,
+        }, index=indice)
+
+
+class DetectorCondensacion:
+    """
+    Eventos de riesgo de condensación sobre las superficies de hoja y fruto.
+
+    El margen de cada superficie es su temperatura menos el punto de rocío del
+    aire interno; se calcula para todas las filas de una vez. Los intervalos en
+    que el margen baja del umbral se obtienen codificando por tramos (RLE) la
+    máscara booleana, así que todo el proceso es lineal en el número de filas.
+    Un margen <= 0 °C indica condensación sobre la superficie.
+    """
+
+    # Columna de la superficie -> nombre
+    SUPERFICIES = {'S3_temp_hoja': 'Hoja', 'S4_temp_fruto': 'Fruto'}
+
+    def __init__(self, umbral=2.0, duracion_minima='0s'):
+        """
+        Args:
+            umbral (float): Margen (°C) por debajo del cual hay riesgo
+            duracion_minima (str o Timedelta): Eventos más cortos se descartan
+        """
+        self.umbral = umbral
+        self.duracion_minima = pd.Timedelta(duracion_minima)
+
+    def margenes(self, datos, punto_rocio):
+        """
+        Márgenes superficie - punto de rocío de cada fila.
+
+        Args:
+            datos (pd.DataFrame): Datos con las columnas de SUPERFICIES
+            punto_rocio (array): Punto de rocío del aire interno (°C) por fila
+
+        Returns:
+            dict: Columna de la superficie -> arreglo de márgenes (°C)
+        """
+        punto_rocio = np.asarray(punto_rocio, dtype=float)
+        return {col: datos[col].to_numpy(dtype=float) - punto_rocio
+                for col in self.SUPERFICIES if col in datos.columns}
+
+    def tramos(self, margen):
+        """
+        Tramos consecutivos con margen bajo el umbral (los NaN no cuentan).
+
+        Returns:
+            tuple: (inicios, fines) como posiciones; el fin es exclusivo
+        """
+        bajo = np.r_[False, np.asarray(margen) < self.umbral, False]
+        cambios = np.flatnonzero(bajo[1:] != bajo[:-1])
+        return cambios[::2], cambios[1::2]
+
+    def eventos(self, tiempos, margenes):
+        """
+        Eventos de riesgo de todas las superficies.
+
+        Args:
+            tiempos (array): Fechas de las filas (ordenadas)
+            margenes (dict): Resultado de margenes()
+
+        Returns:
+            pd.DataFrame: Una fila por evento con Superficie, Inicio, Fin,
+                Duracion, Margen_minimo y Condensacion (margen mínimo <= 0);
+                el fin es la primera lectura ya fuera de riesgo (o la última)
+        """
+        tiempos = pd.to_datetime(np.asarray(tiempos)).to_numpy(dtype='datetime64[ns]')
+        partes = []
+        for col, margen in margenes.items():
+            inicios, fines = self.tramos(margen)
+            if not len(inicios):
+                continue
+            # Mínimo de cada tramo: fuera de los tramos el margen no cuenta
+            enmascarado = np.where(margen < self.umbral, margen, np.inf)
+            minimos = np.minimum.reduceat(enmascarado, inicios)
+            inicio = tiempos[inicios]
+            fin = tiempos[np.minimum(fines, len(tiempos) - 1)]
+            partes.append(pd.DataFrame({
+                'Superficie': self.SUPERFICIES[col],
+                'Inicio': inicio,
+                'Fin': fin,
+                'Duracion': fin - inicio,
+                'Margen_minimo': minimos,
+            }))
+        if not partes:
+            eventos = pd.DataFrame({'Superficie': pd.Series(dtype=object),
+                                    'Inicio': pd.Series(dtype='datetime64[ns]'),
+                                    'Fin': pd.Series(dtype='datetime64[ns]'),
+                                    'Duracion': pd.Series(dtype='timedelta64[ns]'),
+                                    'Margen_minimo': pd.Series(dtype=float)})
+        else:
+            eventos = pd.concat(partes, ignore_index=True)
+        eventos = eventos[eventos['Duracion'] >= self.duracion_minima].reset_index(drop=True)
+        eventos['Condensacion'] = eventos['Margen_minimo'] <= 0
+        return eventos
+
+
+class ReglaAlarma:
+    """
+    Regla de alarma sobre un canal, evaluada muestra a muestra en O(1).
+
+    Tipos:
+    - 'mayor' / 'menor': el valor está por encima / por debajo del umbral.
+    - 'tasa': el cambio del canal en los últimos `ventana` minutos, en valor
+      absoluto por minuto, supera el umbral.
+
+    La alarma se abre cuando la condición se mantiene `sostenido` minutos sin
+    interrupción y se cierra cuando el valor vuelve más allá del umbral menos
+    la histéresis (p. ej. 'mayor' 30 con histéresis 1 cierra por debajo de 29).
+    Los NaN no cambian el estado.
+    """
+
+    TIPOS = ('mayor', 'menor', 'tasa')
+
+    def __init__(self, nombre, columna, tipo, umbral, histeresis=0.0, sostenido=0.0, ventana=10.0):
+        """
+        Args:
+            nombre (str): Nombre de la alarma
+            columna (str): Canal evaluado
+            tipo (str): 'mayor', 'menor' o 'tasa'
+            umbral (float): Umbral (unidades del canal, o por minuto en 'tasa')
+            histeresis (float): Margen para cerrar la alarma
+            sostenido (float): Minutos que debe mantenerse la condición para abrirla
+            ventana (float): Minutos sobre los que se mide la tasa de cambio
+        """
+        if tipo not in self.TIPOS:
+            raise ValueError(f"Tipo de regla desconocido: {tipo}")
+        self.nombre = nombre
+        self.columna = columna
+        self.tipo = tipo
+        self.umbral = float(umbral)
+        self.histeresis = float(histeresis)
+        self.sostenido = pd.Timedelta(minutes=sostenido).value
+        self.ventana = pd.Timedelta(minutes=ventana).value
+        self.reiniciar()
+
+    @classmethod
+    def desde_dict(cls, d):
+        """Crea la regla a partir de un dict (p. ej. leído de JSON)."""
+        return cls(**d)
+
+    def reiniciar(self):
+        """Vuelve al estado inicial (alarma cerrada, sin historial)."""
+        self.activa = False
+        self.desde = None        # Inicio de la condición aún no confirmada
+        self.apertura = None
+        self.extremo = None
+        self._historial = deque()
+
+    def _medida(self, tiempo, valor):
+        """Valor que se compara con el umbral (el propio valor o su tasa)."""
+        if self.tipo != 'tasa':
+            return valor
+        historial = self._historial
+        historial.append((tiempo, valor))
+        while len(historial) > 2 and historial[1][0] <= tiempo - self.ventana:
+            historial.popleft()
+        t0, v0 = historial[0]
+        if tiempo == t0:
+            return 0.0
+        return abs(valor - v0) / ((tiempo - t0) / 6e10)
+
+    def evaluar(self, tiempo, valor):
+        """
+        Evalúa una muestra.
+
+        Args:
+            tiempo (int): Instante en ns
+            valor (float): Valor del canal
+
+        Returns:
+            str: 'apertura', 'cierre' o None
+        """
+        if valor != valor:  # NaN
+            return None
+        medida = self._medida(tiempo, valor)
+        signo = -1 if self.tipo == 'menor' else 1
+        if self.activa:
+            if signo * medida > signo * self.extremo:
+                self.extremo = medida
+            if signo * (medida - self.umbral) < -self.histeresis:
+                self.activa = False
+                return 'cierre'
+            return None
+        if signo * (medida - self.umbral) > 0:
+            if self.desde is None:
+                self.desde = tiempo
+            if tiempo - self.desde >= self.sostenido:
+                self.activa = True
+                self.apertura = self.desde
+                self.extremo = medida
+                self.desde = None
+                return 'apertura'
+        else:
+            self.desde = None
+        return None
+
+
+class MotorAlarmas:
+    """
+    Evalúa reglas de alarma sobre lecturas en vivo o reproducidas.
+
+    Cada muestra cuesta O(1) por regla. Las aperturas y cierres se guardan en
+    `eventos`, se escriben en el archivo de registro (si se indica) y se pasan
+    a `al_evento`, que la interfaz usa para la barra de estado.
+    """
+
+    REGLAS_PREDETERMINADAS = [
+        {'nombre': 'Calor', 'columna': 'Temp_interna_invernadero', 'tipo': 'mayor',
+         'umbral': 30, 'histeresis': 1, 'sostenido': 10},
+        {'nombre': 'Frío', 'columna': 'Temp_interna_invernadero', 'tipo': 'menor',
+         'umbral': 10, 'histeresis': 1, 'sostenido': 10},
+        {'nombre': 'Humedad alta', 'columna': 'Hum_interna_invernadero', 'tipo': 'mayor',
+         'umbral': 90, 'histeresis': 3, 'sostenido': 30},
+        {'nombre': 'Cambio brusco de temperatura', 'columna': 'Temp_interna_invernadero',
+         'tipo': 'tasa', 'umbral': 0.3, 'histeresis': 0.1, 'ventana': 10},
+    ]
+    # Archivo de reglas que se usa si existe (lista JSON de dicts como los
+    # anteriores), junto a este script y no en el directorio de trabajo
+    RUTA_REGLAS = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'reglas_alarmas.json')
+
+    def __init__(self, reglas=None, registro=None, al_evento=None):
+        """
+        Args:
+            reglas (list): ReglaAlarma o dicts; None usa cargar_reglas()
+            registro (str): Archivo de texto donde se anexan los eventos
+            al_evento (callable): Función llamada con cada evento (dict)
+        """
+        if reglas is None:
+            reglas = self.cargar_reglas()
+        self.reglas = [r if isinstance(r, ReglaAlarma) else ReglaAlarma.desde_dict(r) for r in reglas]
+        self.al_evento = al_evento
+        self.eventos = []
+        self._registro = open(registro, 'a', encoding='utf-8') if registro else None
+
+    @classmethod
+    def cargar_reglas(cls, ruta=None):
+        """
+        Lee las reglas de un archivo JSON; sin archivo, las predeterminadas.
+
+        Args:
+            ruta (str): Archivo JSON (None para RUTA_REGLAS si existe)
+
+        Returns:
+            list: Dicts de reglas
+        """
+        import json
+        ruta = ruta or cls.RUTA_REGLAS
+        if not os.path.exists(ruta):
+            if ruta != cls.RUTA_REGLAS:
+                raise FileNotFoundError(f"No existe el archivo de reglas: {ruta}")
+            return [dict(r) for r in cls.REGLAS_PREDETERMINADAS]
+        with open(ruta, encoding='utf-8') as f:
+            return json.load(f)
+
+    @property
+    def activas(self):
+        """Nombres de las alarmas abiertas."""
+        return [regla.nombre for regla in self.reglas if regla.activa]
+
+    def procesar(self, tiempo, valores):
+        """
+        Evalúa todas las reglas con una muestra.
+
+        Args:
+            tiempo: Instante de la muestra
+            valores (dict o pd.Series): Valor de cada canal
+
+        Returns:
+            list: Eventos emitidos por esta muestra
+        """
+        t = pd.Timestamp(tiempo).value
+        emitidos = []
+        for regla in self.reglas:
+            valor = valores.get(regla.columna, np.nan)
+            cambio = regla.evaluar(t, float(valor))
+            if cambio:
+                emitidos.append(self._emitir(regla, cambio, t, valor))
+        return emitidos
+
+    def procesar_bloque(self, datos, velocidad=None, detener=None):
+        """
+        Evalúa las filas de un DataFrame en orden, opcionalmente a ritmo real.
+
+        Args:
+            datos (pd.DataFrame): Lecturas con Fecha_Hora
+            velocidad (float): Veces el tiempo real (None para no esperar)
+            detener (threading.Event): Interrumpe el proceso si se activa
+
+        Returns:
+            list: Eventos emitidos
+        """
+        tiempos = pd.to_datetime(datos['Fecha_Hora']).to_numpy(dtype='datetime64[ns]').view('int64')
+        canales = {regla.columna: (datos[regla.columna].to_numpy(dtype=float)
+                                   if regla.columna in datos.columns else np.full(len(datos), np.nan))
+                   for regla in self.reglas}
+        emitidos = []
+        inicio_real = time.perf_counter()
+        for i, t in enumerate(tiempos):
+            if detener is not None and detener.is_set():
+                break
+            if velocidad:
+                # Espera hasta el instante que le toca a la muestra en la reproducción
+                espera = (t - tiempos[0]) / 1e9 / velocidad - (time.perf_counter() - inicio_real)
+                if espera > 0:
+                    time.sleep(espera)
+            for regla in self.reglas:
+                valor = canales[regla.columna][i]
+                cambio = regla.evaluar(t, valor)
+                if cambio:
+                    emitidos.append(self._emitir(regla, cambio, t, valor))
+        return emitidos
+
+    def reproducir(self, ruta, altura=None, velocidad=3600, detener=None):
+        """
+        Reproduce un archivo histórico para ajustar las reglas.
+
+        Args:
+            ruta (str): Archivo de datos (CSV o Excel)
+            altura (float): Altura en msnm para las propiedades (DPV, Tpr...); None las omite
+            velocidad (float): Veces el tiempo real (None para lo más rápido posible)
+            detener (threading.Event): Interrumpe la reproducción si se activa
+
+        Returns:
+            list: Eventos emitidos
+        """
+        datos = ManejadorDatos.cargar_archivo(ruta, interactivo=False)
+        datos['Fecha_Hora'] = pd.to_datetime(datos['Fecha_Hora'])
+        if not datos['Fecha_Hora'].is_monotonic_increasing:
+            datos = datos.sort_values('Fecha_Hora', kind='stable').reset_index(drop=True)
+        if altura is not None:
+            calculadora = CalculadoraPropiedades()
+            calculadora.agregar_propiedades(datos, calculadora.calcular_presion(altura))
+        for regla in self.reglas:
+            regla.reiniciar()
+        return self.procesar_bloque(datos, velocidad, detener)
+
+    def _emitir(self, regla, cambio, t, valor):
+        evento = {
+            'Fecha_Hora': pd.Timestamp(t),
+            'Regla': regla.nombre,
+            'Evento': cambio,
+            'Valor': float(valor),
+            'Extremo': regla.extremo,
+            'Duracion': pd.Timedelta(t - regla.apertura) if cambio == 'cierre' else pd.Timedelta(0),
+        }
+        if cambio == 'apertura' and regla.tipo == 'tasa':
+            mensaje = f"ALARMA {regla.nombre}: {regla.columna} cambia {regla.extremo:.2f}/min"
+        elif cambio == 'apertura':
+            mensaje = f"ALARMA {regla.nombre}: {regla.columna} = {valor:.2f}"
+        else:
+            mensaje = f"Fin de alarma {regla.nombre} (duración {evento['Duracion']}, extremo {regla.extremo:.2f})"
+        evento['Mensaje'] = mensaje
+        self.eventos.append(evento)
+        if self._registro:
+            self._registro.write(f"{evento['Fecha_Hora']}\t{cambio}\t{regla.nombre}\t{mensaje}\n")
+            self._registro.flush()
+        if self.al_evento:
+            self.al_evento(evento)
+        return evento
+
+    def cerrar(self):
+        """Cierra el archivo de registro."""
+        if self._registro:
+            self._registro.close()
+            self._registro = None
+
+
+class PoliticaBase:
+    """
+    Política sin acciones: sólo la ventilación base, sin calefacción.
+
+    Es la operación supuesta al reconstruir las cargas en SimuladorControl,
+    así que simularla reproduce lo registrado; sirve de referencia y de base
+    para las demás políticas.
+    """
+
+    PARAMETROS = {}
+
+    def iniciar(self, n):
+        """Estado inicial para n juegos de parámetros."""
+
+    def decidir(self, T, dpv, p):
+        """
+        Acciones de control para el estado actual de cada juego de parámetros.
+
+        Args:
+            T (np.ndarray): Temperatura interior (°C)
+            dpv (np.ndarray): Déficit de presión de vapor interior (kPa)
+            p (dict): Parámetros (arreglos del mismo tamaño)
+
+        Returns:
+            tuple: (fracción de ventilación 0-1, fracción de calefacción 0-1)
+        """
+        return np.zeros_like(T), np.zeros_like(T)
+
+
+class PoliticaConsigna(PoliticaBase):
+    """
+    Control por consigna de temperatura con banda muerta.
+
+    La calefacción se enciende por debajo de consigna_calor - banda/2 y se
+    apaga por encima de consigna_calor + banda/2 (histéresis); la ventilación
+    abre de forma proporcional entre consigna_ventilacion y
+    consigna_ventilacion + banda.
+    """
+
+    PARAMETROS = {'consigna_calor': 14.0, 'consigna_ventilacion': 26.0, 'banda': 2.0}
+
+    def iniciar(self, n):
+        """Estado inicial para n juegos de parámetros."""
+        self.calefaccion = np.zeros(n, dtype=bool)
+
+    def decidir(self, T, dpv, p):
+        """
+        Acciones de control para el estado actual de cada juego de parámetros.
+
+        Args:
+            T (np.ndarray): Temperatura interior (°C)
+            dpv (np.ndarray): Déficit de presión de vapor interior (kPa)
+            p (dict): Parámetros (arreglos del mismo tamaño)
+
+        Returns:
+            tuple: (fracción de ventilación 0-1, fracción de calefacción 0-1)
+        """
+        self.calefaccion = np.where(T < p['consigna_calor'] - p['banda'] / 2, True,
+                                    np.where(T > p['consigna_calor'] + p['banda'] / 2, False,
+                                             self.calefaccion))
+        ventilacion = np.clip((T - p['consigna_ventilacion']) / p['banda'], 0, 1)
+        return ventilacion, self.calefaccion.astype(float)
+
+
+class PoliticaDPV(PoliticaConsigna):
+    """
+    Control orientado al déficit de presión de vapor.
+
+    Con el aire demasiado húmedo (DPV bajo la banda) se ventila en proporción
+    al defecto y se calienta si la temperatura lo permite, lo que sube el DPV;
+    con el aire seco la ventilación sólo abre para evitar el exceso de calor.
+    La calefacción mínima sigue la consigna con histéresis de PoliticaConsigna.
+    """
+
+    PARAMETROS = {'dpv_objetivo': 0.8, 'banda_dpv': 0.4, 'consigna_calor': 12.0,
+                  'consigna_ventilacion': 28.0, 'banda': 2.0}
+
+    def decidir(self, T, dpv, p):
+        ventilacion, calefaccion = super().decidir(T, dpv, p)
+        defecto = np.clip((p['dpv_objetivo'] - p['banda_dpv'] / 2 - dpv) / p['banda_dpv'], 0, 1)
+        templado = T < p['consigna_ventilacion'] - p['banda']
+        ventilacion = np.maximum(ventilacion, defecto)
+        calefaccion = np.where((defecto > 0) & templado, 1.0, calefaccion)
+        return ventilacion, calefaccion
+
+
+class SimuladorControl:
+    """
+    Simulación de estrategias de ventilación y calefacción sobre datos registrados.
+
+    El aire interior se modela con un balance de entalpía y de razón de humedad:
+
+        M dh/dt = Q + Qcal + m (h_ext - h) + UA (T_ext - T)
+        M dW/dt = E + m (W_ext - W)
+
+    con M la masa de aire seco del invernadero y m el caudal de ventilación.
+    Las cargas Q (sol, cultivo...) y E (transpiración) se reconstruyen de los
+    propios datos suponiendo la ventilación base, así que con PoliticaBase
+    (sin ventilación ni calefacción añadidas) la simulación reproduce lo
+    registrado. Se integra
+    con Euler implícito (estable con pasos de 10 min) y el bucle temporal
+    avanza a la vez todos los juegos de parámetros, guardados como arreglos.
+    """
+
+    def __init__(self, tiempos, T_int, Hr_int, T_ext, Hr_ext, presionAt=101.325, calculadora=None,
+                 area=1000.0, altura_media=4.0, U=6.0, renovaciones_base=1.0,
+                 renovaciones_max=30.0, calefaccion_max=150.0):
+        """
+        Args:
+            tiempos (array): Fechas de una rejilla regular
+            T_int, Hr_int (array): Temperatura (°C) y humedad (%) interiores registradas
+            T_ext, Hr_ext (array): Temperatura (°C) y humedad (%) exteriores
+            presionAt (float): Presión atmosférica (kPa)
+            calculadora (CalculadoraPropiedades): Propiedades del aire húmedo
+            area (float): Superficie del invernadero (m²)
+            altura_media (float): Altura media (m)
+            U (float): Coeficiente global de la cubierta (W/m²K), sobre 1.3 veces el área
+            renovaciones_base (float): Renovaciones por hora con todo cerrado
+            renovaciones_max (float): Renovaciones por hora con la ventilación abierta
+            calefaccion_max (float): Potencia de calefacción (kW)
+        """
+        self.calc = calculadora or CalculadoraPropiedades()
+        self.presion = presionAt
+        self.tiempos = pd.to_datetime(np.asarray(tiempos))
+        self.dt = np.diff(self.tiempos.to_numpy(dtype='datetime64[ns]').view('int64')) / 1e9
+
+        def aire(T, Hr):
+            T = np.asarray(T, dtype=float)
+            Pv = self.calc.calcular_pv(np.clip(np.asarray(Hr, dtype=float), 0, 100),
+                                       self.calc.calcular_pvs_arreglo(T))
+            W = self.calc.razon_humedad(Pv * 1000, presionAt * 1000)
+            return T, W, self.calc.entalpia(T, W)
+
+        self.T_int, self.W_int, self.h_int = aire(T_int, Hr_int)
+        self.T_ext, self.W_ext, self.h_ext = aire(T_ext, Hr_ext)
+        volumen = area * altura_media
+        self.M = volumen / np.nanmean(self.calc.volumen_especifico(self.T_int, presionAt * 1000, self.W_int))
+        self.UA = U * 1.3 * area / 1000                       # kW/K
+        self.m_base = renovaciones_base * self.M / 3600       # kg/s
+        self.m_max = renovaciones_max * self.M / 3600
+        self.calefaccion_max = calefaccion_max
+        # Tabla de presión de saturación para el bucle (interpolación lineal,
+        # error < 1e-4 kPa con pasos de 0.01 °C)
+        self._tabla_T = np.arange(-40.0, 80.0, 0.01)
+        self._tabla_pvs = self.calc.calcular_pvs_arreglo(self._tabla_T)
+
+        # Cargas reconstruidas: con m_base y sin calefacción, el paso implícito
+        # lleva exactamente de cada registro al siguiente
+        h0, h1 = self.h_int[:-1], self.h_int[1:]
+        W0, W1 = self.W_int[:-1], self.W_int[1:]
+        cp = 1.006 + 1.805 * W0
+        k = self.M / self.dt
+        self.Q = (k * (h1 * (1 + self.m_base / k + self.UA / (k * cp)) - h0)
+                  - self.m_base * self.h_ext[:-1] - self.UA * (self.T_ext[:-1] + 2501 * W0 / cp))
+        self.E = k * (W1 * (1 + self.m_base / k) - W0) - self.m_base * self.W_ext[:-1]
+
+    @classmethod
+    def desde_piramide(cls, piramide, presionAt=101.325, calculadora=None, nivel='10min', **kwargs):
+        """
+        Simulador sobre un nivel de la pirámide de agregados (huecos interpolados).
+
+        Args:
+            piramide (PiramideAgregados): Agregados de los datos
+            presionAt (float): Presión atmosférica (kPa)
+            calculadora (CalculadoraPropiedades): Propiedades del aire húmedo
+            nivel (str): Nivel de la pirámide usado como paso de simulación
+            **kwargs: Parámetros físicos de __init__
+
+        Returns:
+            SimuladorControl: Simulador listo
+
+        Raises:
+            ValueError: Si algún canal no tiene ningún valor válido
+        """
+        columnas = ['Temp_interna_invernadero', 'Hum_interna_invernadero',
+                    'Temp_externa_invernadero', 'Hum_externa_invernadero']
+        niveles = [piramide.nivel(nivel, col) for col in columnas]
+        vacios = [col for col, n in zip(columnas, niveles) if not (n['count'] > 0).any()]
+        if vacios:
+            raise ValueError(f"Sin valores válidos para simular: {', '.join(vacios)}")
+        paso = PiramideAgregados.NIVELES[nivel].value
+        inicio = min(n['tiempo'].view('int64')[0] for n in niveles)
+        fin = max(n['tiempo'].view('int64')[-1] for n in niveles)
+        tiempos = np.arange(inicio, fin + paso, paso)
+        series = []
+        for n in niveles:
+            validos = n['count'] > 0
+            series.append(np.interp(tiempos, n['tiempo'].view('int64')[validos], n['mean'][validos]))
+        return cls(tiempos.view('datetime64[ns]'), *series, presionAt=presionAt,
+                   calculadora=calculadora, **kwargs)
+
+    @staticmethod
+    def rejilla(**valores):
+        """
+        Producto cartesiano de valores de parámetros.
+
+        Returns:
+            dict: Nombre -> arreglo 1-D (un elemento por combinación)
+        """
+        mallas = np.meshgrid(*[np.atleast_1d(np.asarray(v, dtype=float)) for v in valores.values()],
+                             indexing='ij')
+        return {nombre: malla.ravel() for nombre, malla in zip(valores, mallas)}
+
+    def _temperatura(self, h, W):
+        """Temperatura a partir de la entalpía y la razón de humedad (inversa de entalpia)."""
+        return (h - 2501 * W) / (1.006 + 1.805 * W)
+
+    def simular(self, politica, parametros=None, banda_temperatura=(15.0, 28.0), banda_dpv=(0.5, 1.2),
+                trayectorias=False):
+        """
+        Simula una política para uno o muchos juegos de parámetros a la vez.
+
+        Args:
+            politica: Instancia de PoliticaBase, PoliticaConsigna, PoliticaDPV
+                u otra con PARAMETROS, iniciar(n) y decidir(T, dpv, p)
+            parametros (dict): Valores por parámetro (escalares o arreglos de
+                igual tamaño, p. ej. de rejilla()); los que falten toman
+                politica.PARAMETROS
+            banda_temperatura (tuple): Banda de confort para las horas fuera de rango
+            banda_dpv (tuple): Banda de DPV del cultivo (kPa)
+            trayectorias (bool): Si es True se devuelven también T y DPV por paso
+
+        Returns:
+            pd.DataFrame: Una fila por juego de parámetros con los parámetros y
+                'Energia_calefaccion_kWh', 'Horas_ventilacion' (equivalentes a
+                apertura total), 'Horas_fuera_T', 'Horas_fuera_DPV', 'T_media'
+                y 'DPV_medio'. Con trayectorias=True, una tupla (tabla, dict con
+                'T' y 'DPV' de forma (pasos, juegos))
+        """
+        p = dict(politica.PARAMETROS)
+        p.update(parametros or {})
+        n = max((np.size(v) for v in p.values()), default=1)
+        p = {nombre: np.broadcast_to(np.asarray(v, dtype=float), (n,)) for nombre, v in p.items()}
+        politica.iniciar(n)
+
+        h = np.full(n, self.h_int[0])
+        W = np.full(n, self.W_int[0])
+        energia = np.zeros(n)
+        ventilacion_h = np.zeros(n)
+        fuera_T = np.zeros(n)
+        fuera_dpv = np.zeros(n)
+        suma_T = np.zeros(n)
+        suma_dpv = np.zeros(n)
+        pasos = len(self.dt)
+        if trayectorias:
+            T_hist = np.empty((pasos + 1, n))
+            dpv_hist = np.empty((pasos + 1, n))
+
+        for t in range(pasos + 1):
+            # El vapor por encima de la saturación se condensa
+            T = self._temperatura(h, W)
+            pvs = np.interp(T, self._tabla_T, self._tabla_pvs)
+            W = np.minimum(W, self.calc.razon_humedad_saturada(pvs * 1000, self.presion * 1000))
+            T = self._temperatura(h, W)
+            dpv = pvs - W * self.presion / (0.622 + W)
+            if trayectorias:
+                T_hist[t], dpv_hist[t] = T, dpv
+            if t == pasos:
+                break
+            dt = self.dt[t]
+            horas = dt / 3600
+            suma_T += T * horas
+            suma_dpv += dpv * horas
+            fuera_T += ((T < banda_temperatura[0]) | (T > banda_temperatura[1])) * horas
+            fuera_dpv += ((dpv < banda_dpv[0]) | (dpv > banda_dpv[1])) * horas
+
+            ventilacion, calefaccion = politica.decidir(T, dpv, p)
+            m = self.m_base + ventilacion * (self.m_max - self.m_base)
+            Qcal = calefaccion * self.calefaccion_max
+            energia += Qcal * horas
+            ventilacion_h += ventilacion * horas
+
+            # Paso implícito de entalpía y humedad
+            k = self.M / dt
+            cp = 1.006 + 1.805 * W
+            h = ((k * h + self.Q[t] + Qcal + m * self.h_ext[t] + self.UA * (self.T_ext[t] + 2501 * W / cp))
+                 / (k + m + self.UA / cp))
+            W = (k * W + self.E[t] + m * self.W_ext[t]) / (k + m)
+
+        total = max(self.dt.sum() / 3600, 1e-9)
+        tabla = pd.DataFrame({nombre: np.array(v) for nombre, v in p.items()})
+        tabla['Energia_calefaccion_kWh'] = energia
+        tabla['Horas_ventilacion'] = ventilacion_h
+        tabla['Horas_fuera_T'] = fuera_T
+        tabla['Horas_fuera_DPV'] = fuera_dpv
+        tabla['T_media'] = suma_T / total
+        tabla['DPV_medio'] = suma_dpv / total
+        if trayectorias:
+            return tabla, {'T': T_hist, 'DPV': dpv_hist}
+        return tabla
+
+
+class GestorFiguras:
+    """
+    Administra las ventanas de gráficos embebidos de la interfaz.
+
+    Mantiene un solo lienzo por vista de análisis: abrir de nuevo una vista
+    con los mismos datos sólo trae su ventana al frente, y con datos nuevos
+    la figura se actualiza en sitio (o se redibuja sobre el mismo lienzo).
+    El fondo estático de cada figura se guarda tras cada dibujo completo para
+    poder redibujar sólo los artistas animados (blitting). Como máximo se
+    conservan `max_figuras` ventanas; al superarse se cierra la menos usada.
+    """
+
+    def __init__(self, root, max_figuras=6):
+        """
+        Args:
+            root (tk.Tk): Ventana principal
+            max_figuras (int): Número máximo de ventanas de gráficos abiertas
+        """
+        self.root = root
+        self.max_figuras = max_figuras
+        self.entradas = OrderedDict()
+
+    def mostrar(self, clave, titulo, construir, version, actualizar=None,
+                figsize=(15, 10), geometria="1000x700"):
+        """
+        Muestra (creando o reutilizando) la ventana de una vista de análisis.
+
+        Args:
+            clave (str): Identificador único de la vista
+            titulo (str): Título de la ventana
+            construir (callable): construir(fig) dibuja la vista en la figura
+            version (int): Versión de los datos que se grafican
+            actualizar (callable): actualizar(fig) opcional para actualizar en sitio
+            figsize (tuple): Tamaño de la figura en pulgadas
+            geometria (str): Tamaño inicial de la ventana
+
+        Returns:
+            dict: Entrada de la vista (ventana, fig, canvas, ...)
+        """
+        entrada = self.entradas.get(clave)
+
+        if entrada is not None:
+            self.entradas.move_to_end(clave)
+            entrada['construir'] = construir
+            entrada['actualizar'] = actualizar
+            self._actualizar_entrada(entrada, version)
+            entrada['ventana'].deiconify()
+            entrada['ventana'].lift()
+            return entrada
+
+        from matplotlib.figure import Figure
+        from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg, NavigationToolbar2Tk
+
+        ventana = tk.Toplevel(self.root)
+        ventana.title(titulo)
+        ventana.geometry(geometria)
+
+        fig = Figure(figsize=figsize)
+        construir(fig)
+
+        canvas = FigureCanvasTkAgg(fig, master=ventana)
+        toolbar = NavigationToolbar2Tk(canvas, ventana)
+        toolbar.update()
+        canvas.get_tk_widget().pack(fill='both', expand=True)
+
+        entrada = {
+            'ventana': ventana,
+            'fig': fig,
+            'canvas': canvas,
+            'version': version,
+            'construir': construir,
+            'actualizar': actualizar,
+            'animados': [],
+            'fondo': None
+        }
+
+        def guardar_fondo(event):
+            # Tras cada dibujo completo se guarda el fondo sin los artistas animados
+            entrada['fondo'] = canvas.copy_from_bbox(fig.bbox)
+            for artista in entrada['animados']:
+                fig.draw_artist(artista)
+
+        canvas.mpl_connect('draw_event', guardar_fondo)
+        ventana.protocol("WM_DELETE_WINDOW", lambda: self.cerrar(clave))
+        canvas.draw()
+
+        self.entradas[clave] = entrada
+        while len(self.entradas) > self.max_figuras:
+            self.cerrar(next(iter(self.entradas)))
+
+        return entrada
+
+    def _actualizar_entrada(self, entrada, version):
+        """Lleva una vista a la versión de datos indicada, en sitio si es posible."""
+        if entrada['version'] == version:
+            return
+        if entrada['actualizar'] is not None:
+            entrada['actualizar'](entrada['fig'])
+        else:
+            entrada['animados'] = []
+            entrada['construir'](entrada['fig'])
+        entrada['version'] = version
+        entrada['canvas'].draw_idle()
+
+    def redibujar(self, clave):
+        """Vuelve a construir una vista abierta aunque su versión de datos no haya cambiado."""
+        entrada = self.entradas.get(clave)
+        if entrada is None:
+            return
+        entrada['animados'] = []
+        entrada['construir'](entrada['fig'])
+        entrada['canvas'].draw_idle()
+
+    def refrescar(self, version):
+        """Actualiza todas las vistas abiertas a la versión de datos indicada."""
+        for entrada in self.entradas.values():
+            self._actualizar_entrada(entrada, version)
+
+    def registrar_animados(self, clave, artistas):
+        """Marca artistas que se redibujan sobre el fondo guardado con blit()."""
+        entrada = self.entradas[clave]
+        for artista in artistas:
+            artista.set_animated(True)
+        entrada['animados'] = list(artistas)
+        entrada['canvas'].draw_idle()
+
+    def blit(self, clave):
+        """Redibuja sólo los artistas animados sobre el fondo estático guardado."""
+        entrada = self.entradas.get(clave)
+        if entrada is None or entrada['fondo'] is None:
+            return
+        canvas, fig = entrada['canvas'], entrada['fig']
+        canvas.restore_region(entrada['fondo'])
+        for artista in entrada['animados']:
+            fig.draw_artist(artista)
+        canvas.blit(fig.bbox)
+
+    def cerrar(self, clave):
+        """Cierra la ventana de una vista y libera su figura."""
+        entrada = self.entradas.pop(clave, None)
+        if entrada is None:
+            return
+        entrada['fig'].clear()
+        entrada['ventana'].destroy()
+
+    def cerrar_todas(self):
+        """Cierra todas las ventanas de gráficos."""
+        for clave in list(self.entradas):
+            self.cerrar(clave)
+
+class ReductorLineas:
+    """
+    Reducción del nivel de detalle de series temporales largas.
+
+    Cada línea guarda la serie completa y dibuja sólo el primer punto, el
+    mínimo, el máximo y el último de cada columna de píxeles del rango
+    visible (M4), lo que conserva la forma
+    exacta del trazo con unos pocos miles de puntos. El presupuesto de
+    puntos sale del ancho de los ejes en píxeles y se recalcula al hacer
+    zoom o desplazarse (callback 'xlim_changed') y al redimensionar.
+
+    El reductor se guarda en los propios ejes, así que desaparece con ellos
+    (por ejemplo al limpiar una figura reutilizada).
+    """
+
+    def __init__(self, ax):
+        self.ax = ax
+        self.series = {}
+        self._estado = None
+        # Métodos ligados: matplotlib guarda referencias débiles y los
+        # desconecta solos cuando el reductor se libera
+        ax.callbacks.connect('xlim_changed', self._al_cambiar_limites)
+        ax.figure.canvas.mpl_connect('resize_event', self._al_redimensionar)
+
+    @classmethod
+    def de(cls, ax):
+        """Reductor de unos ejes, o None si no tienen líneas reducidas."""
+        return getattr(ax, '_reductor_lineas', None)
+
+    @classmethod
+    def para(cls, ax):
+        """Reductor asociado a unos ejes (se crea la primera vez)."""
+        if cls.de(ax) is None:
+            ax._reductor_lineas = cls(ax)
+        return ax._reductor_lineas
+
+    @classmethod
+    def graficar(cls, ax, x, y, *args, **kwargs):
+        """
+        Equivalente a ax.plot(x, y, ...) para series temporales largas.
+
+        Args:
+            ax (Axes): Ejes donde dibujar
+            x (array-like): Fechas en orden creciente
+            y (array-like): Valores de la serie
+            *args, **kwargs: Argumentos de formato de ax.plot
+
+        Returns:
+            Line2D: Línea creada
+        """
+        reductor = cls.para(ax)
+        x_num, y = reductor._preparar(x, y)
+        idx = reductor._indices(x_num, y, None)
+        linea, = ax.plot(x_num[idx], y[idx], *args, **kwargs)
+        ax.xaxis_date()
+        reductor.series[linea] = (x_num, y)
+        return linea
+
+    @classmethod
+    def actualizar(cls, linea, x, y):
+        """Sustituye la serie completa de una línea; devuelve False si no está registrada."""
+        reductor = cls.de(linea.axes) if linea.axes is not None else None
+        if reductor is None or linea not in reductor.series:
+            return False
+        x_num, y = reductor._preparar(x, y)
+        reductor.series[linea] = (x_num, y)
+        linea.set_data(x_num, y)  # datos completos para que relim vea todo el rango
+        reductor._estado = None
+        return True
+
+    @staticmethod
+    def _preparar(x, y):
+        x_num = mdates.date2num(np.asarray(pd.to_datetime(x)))
+        return np.asarray(x_num, dtype=float), np.asarray(y, dtype=float)
+
+    def _al_cambiar_limites(self, ax):
+        self.recalcular()
+        recalcular_hermanos(ax, type(self))
+
+    def _al_redimensionar(self, event):
+        self.recalcular()
+
+    def recalcular(self):
+        """Vuelve a reducir todas las líneas para el rango y tamaño actuales."""
+        limites = tuple(self.ax.get_xlim())
+        estado = (limites, int(self.ax.bbox.width))
+        if estado == self._estado:
+            return
+        self._estado = estado
+        for linea, (x_num, y) in self.series.items():
+            idx = self._indices(x_num, y, limites)
+            linea.set_data(x_num[idx], y[idx])
+        self.ax.figure.canvas.draw_idle()
+
+    def _indices(self, x, y, limites):
+        """Índices a dibujar: primero, mínimo, máximo y último de cada columna de píxeles visible."""
+        n = len(x)
+        if limites is None:
+            i0, i1 = 0, n
+            x0, x1 = (x[0], x[-1]) if n else (0, 1)
+        else:
+            x0, x1 = limites
+            # Un punto extra a cada lado para que la línea llegue a los bordes
+            i0 = max(int(np.searchsorted(x, x0, side='left')) - 1, 0)
+            i1 = min(int(np.searchsorted(x, x1, side='right')) + 1, n)
+        pixeles = max(int(self.ax.bbox.width), 100)
+        if i1 - i0 <= 4 * pixeles or x1 <= x0:
+            return np.arange(i0, i1)
+
+        xs, ys = x[i0:i1], y[i0:i1]
+        bordes = np.searchsorted(xs, np.linspace(x0, x1, pixeles + 1)[1:-1])
+        inicios = np.unique(np.concatenate(([0], bordes)))
+        inicios = inicios[inicios < len(xs)]
+        cuentas = np.diff(np.append(inicios, len(xs)))
+        cubeta = np.repeat(np.arange(len(inicios)), cuentas)
+
+        minimos = np.fmin.reduceat(ys, inicios)
+        maximos = np.fmax.reduceat(ys, inicios)
+        # Primera posición de cada cubeta donde se alcanza su mínimo / máximo
+        elegidos = []
+        for extremos in (minimos, maximos):
+            pos = np.flatnonzero(ys == np.repeat(extremos, cuentas))
+            _, primero = np.unique(cubeta[pos], return_index=True)
+            elegidos.append(pos[primero])
+        # Primer y último punto de cada cubeta, para enlazar bien con las vecinas;
+        # en cubetas sin datos válidos el primero es NaN y deja ver el hueco
+        elegidos.append(inicios)
+        elegidos.append(inicios + cuentas - 1)
+        return i0 + np.unique(np.concatenate(elegidos).astype(int))
+
+
+class TablaVirtual:
+    """
+    Tabla de datos que sólo crea filas para la parte visible.
+
+    El Treeview tiene tantos elementos como filas caben en pantalla y al
+    desplazarse se reescriben sus valores desde las columnas del DataFrame,
+    por lo que el costo de mostrar, ordenar o filtrar no depende del número
+    de registros. La vista es un arreglo de posiciones de fila: ordenar usa
+    una permutación argsort guardada por columna y filtrar una máscara
+    booleana evaluada sobre las columnas completas.
+
+    La selección también vive en el modelo (una máscara sobre las filas de
+    datos), así que admite rangos de cualquier tamaño con Shift y Ctrl y se
+    conserva al desplazarse, ordenar o filtrar.
+    """
+
+    # Nombres cortos aceptados en la barra de filtro
+    ALIAS = {
+        'Tbs': 'Temp_interna_invernadero',
+        'T': 'Temp_interna_invernadero',
+        'φ': 'Hum_interna_invernadero',
+        'Hr': 'Hum_interna_invernadero',
+        'HR': 'Hum_interna_invernadero',
+        'Text': 'Temp_externa_invernadero',
+        'Hext': 'Hum_externa_invernadero',
+        'S1': 'S1_temp_sustrato',
+        'S2': 'S2_temp_tallo',
+        'S3': 'S3_temp_hoja',
+        'S4': 'S4_temp_fruto',
+        'S5': 'S5_temp_1m_altura',
+        'S6': 'S6_temp_2m_altura',
+        'S7': 'S7_temp_3_altura',
+        'Pvs': 'Pvs (kPa)',
+        'Pv': 'Pv (kPa)',
+        'W': 'W (kg_vp/kg_AS)',
+        'h': 'h (kJ/kg_AS)',
+        'Tpr': 'Tpr (°C)',
+        'DPV': 'DPV (kPa)',
+        'DPVh': 'DPV hoja (kPa)',
+        'Fecha': 'Fecha_Hora'
+    }
+
+    OPERADORES = {
+        '>=': np.greater_equal,
+        '<=': np.less_equal,
+        '==': np.equal,
+        '!=': np.not_equal,
+        '>': np.greater,
+        '<': np.less,
+        '=': np.equal
+    }
+
+    def __init__(self, parent, columnas, alto_fila=25):
+        """
+        Args:
+            parent (tk.Widget): Contenedor de la tabla
+            columnas (tuple): Columnas a mostrar (nombres del DataFrame)
+            alto_fila (int): Alto de fila del estilo Treeview en píxeles
+        """
+        self.columnas = columnas
+        self.alto_fila = alto_fila
+        self.datos = None
+        self.vista = np.arange(0)
+        self.inicio = 0
+        self.iids = []
+        self.columna_orden = None
+        self.descendente = False
+        self.mascara = None
+        self.expresion = None  # Expresión del filtro activo (None sin filtro o con filtro de rango)
+        self.al_cambiar_vista = None
+        self.al_seleccionar = None
+        self.seleccion = np.zeros(0, dtype=bool)
+        self.cursor = None
+        self.ancla = None
+        self._arreglos = {}
+        self._ordenes = {}
+
+        self.tabla = ttk.Treeview(
+            parent,
+            columns=columnas,
+            show='headings',
+            style="Treeview",
+            selectmode='none'
+        )
+        for col in columnas:
+            self.tabla.heading(col, text=col, command=lambda c=col: self.ordenar(c))
+
+        self.vsb = ttk.Scrollbar(parent, orient="vertical", command=self._desplazar)
+        self.hsb = ttk.Scrollbar(parent, orient="horizontal", command=self.tabla.xview)
+        self.tabla.configure(xscrollcommand=self.hsb.set)
+
+        self.tabla.tag_configure('fila_par', background='white')
+        self.tabla.tag_configure('fila_impar', background='#F5F5F5')
+
+        self.tabla.bind('<Configure>', self._redimensionar)
+        self.tabla.bind('<MouseWheel>', self._rueda)
+        self.tabla.bind('<Button-4>', lambda e: self._mover(-3))
+        self.tabla.bind('<Button-5>', lambda e: self._mover(3))
+        self.tabla.bind('<Button-1>', lambda e: self._clic(e, extender=False, alternar=False))
+        self.tabla.bind('<Shift-Button-1>', lambda e: self._clic(e, extender=True, alternar=False))
+        self.tabla.bind('<Control-Button-1>', lambda e: self._clic(e, extender=False, alternar=True))
+        self.tabla.bind('<Up>', lambda e: self._mover_seleccion(-1))
+        self.tabla.bind('<Down>', lambda e: self._mover_seleccion(1))
+        self.tabla.bind('<Shift-Up>', lambda e: self._mover_seleccion(-1, extender=True))
+        self.tabla.bind('<Shift-Down>', lambda e: self._mover_seleccion(1, extender=True))
+        self.tabla.bind('<Control-a>', lambda e: self.seleccionar_todo())
+        self.tabla.bind('<Prior>', lambda e: self._mover(-len(self.iids)))
+        self.tabla.bind('<Next>', lambda e: self._mover(len(self.iids)))
+        self.tabla.bind('<Home>', lambda e: self._ir_a(0))
+        self.tabla.bind('<End>', lambda e: self._ir_a(len(self.vista)))
+
+    def pack(self):
+        """Coloca la tabla y sus barras de desplazamiento."""
+        self.vsb.pack(side='right', fill='y')
+        self.hsb.pack(side='bottom', fill='x')
+        self.tabla.pack(fill='both', expand=True)
+
+    # --- Datos --------------------------------------------------------------
+
+    def establecer_datos(self, datos):
+        """
+        Asigna un DataFrame nuevo; descarta los órdenes guardados y reaplica el filtro.
+
+        Args:
+            datos (pd.DataFrame): Datos a mostrar, o None para vaciar la tabla
+        """
+        self.datos = datos
+        self._arreglos = {}
+        self._ordenes = {}
+        self.mascara = None
+        self.expresion = None
+        self.inicio = 0
+        self.seleccion = np.zeros(0 if datos is None else len(datos), dtype=bool)
+        self.cursor = self.ancla = None
+        self._recalcular_vista()
+
+    def eliminar_filas(self, datos, i0, i1, conservar=False):
+        """
+        Ajusta la tabla tras borrar (o conservar solamente) las filas [i0, i1).
+
+        Los órdenes y la máscara guardados se recortan en lugar de recalcularse:
+        quitar posiciones de una permutación ordenada la mantiene ordenada.
+
+        Args:
+            datos (pd.DataFrame): Datos ya recortados
+            i0, i1 (int): Rango de posiciones afectado
+            conservar (bool): True si se conservó el rango en lugar de borrarlo
+        """
+        def recortar_permutacion(perm):
+            if conservar:
+                perm = perm[(perm >= i0) & (perm < i1)]
+                return perm - i0
+            perm = perm[(perm < i0) | (perm >= i1)]
+            return np.where(perm >= i1, perm - (i1 - i0), perm)
+
+        def recortar_arreglo(arr):
+            if conservar:
+                return arr[i0:i1]
+            return np.concatenate((arr[:i0], arr[i1:]))
+
+        self._ordenes = {col: recortar_permutacion(p) for col, p in self._ordenes.items()}
+        self._arreglos = {col: recortar_arreglo(a) for col, a in self._arreglos.items()}
+        if self.mascara is not None:
+            self.mascara = recortar_arreglo(self.mascara)
+        self.seleccion = recortar_arreglo(self.seleccion)
+        self.cursor = self.ancla = None
+        self.datos = datos
+        self._recalcular_vista()
+
+    def anexar(self, datos, n_nuevas):
+        """
+        Ajusta la tabla tras agregar `n_nuevas` filas al final de los datos.
+
+        Los arreglos guardados se extienden sólo con las filas nuevas y cada
+        orden guardado las intercala con np.searchsorted + np.insert en lugar
+        de volver a ordenarse; el filtro activo se evalúa sólo sobre ellas (un
+        filtro de rango de fechas no las incluye). La posición de
+        desplazamiento y la selección se conservan.
+
+        Args:
+            datos (pd.DataFrame): Datos con las filas nuevas al final
+            n_nuevas (int): Número de filas agregadas
+        """
+        n0 = len(datos) - n_nuevas
+        self.datos = datos
+        nuevas = np.arange(n0, len(datos))
+        for col, arr in self._arreglos.items():
+            self._arreglos[col] = np.concatenate((arr, self._convertir(datos[col].iloc[n0:])))
+        for col, perm in self._ordenes.items():
+            arr = self._arreglos[col]
+            # Las filas nuevas van tras las existentes con el mismo valor (orden estable)
+            orden_nuevas = nuevas[np.argsort(arr[n0:], kind='stable')]
+            posiciones = np.searchsorted(arr[perm], arr[orden_nuevas], side='right')
+            self._ordenes[col] = np.insert(perm, posiciones, orden_nuevas)
+        if self.mascara is not None:
+            if self.expresion:
+                extra = self._evaluar_filtro(self.expresion, filas=slice(n0, None))
+            else:
+                extra = np.zeros(n_nuevas, dtype=bool)
+            self.mascara = np.concatenate((self.mascara, extra))
+        self.seleccion = np.concatenate((self.seleccion, np.zeros(n_nuevas, dtype=bool)))
+        cursor, ancla = self.cursor, self.ancla
+        self._recalcular_vista()
+        # Sin orden las filas nuevas quedan al final: las posiciones en la vista siguen valiendo
+        if self.columna_orden not in self.datos.columns:
+            self.cursor, self.ancla = cursor, ancla
+
+    @staticmethod
+    def _convertir(serie):
+        """Serie como arreglo NumPy: fechas como enteros ns y lo demás como float."""
+        if pd.api.types.is_datetime64_any_dtype(serie):
+            return serie.to_numpy(dtype='datetime64[ns]').view('int64')
+        return pd.to_numeric(serie, errors='coerce').to_numpy(dtype=float)
+
+    def _arreglo(self, col):
+        """Columna como arreglo NumPy (Fecha_Hora como enteros ns), guardada en caché."""
+        if col not in self._arreglos:
+            self._arreglos[col] = self._convertir(self.datos[col])
+        return self._arreglos[col]
+
+    def _orden(self, col):
+        """Permutación argsort (estable, NaN al final) de una columna, guardada en caché."""
+        if col not in self._ordenes:
+            self._ordenes[col] = np.argsort(self._arreglo(col), kind='stable')
+        return self._ordenes[col]
+
+    # --- Orden y filtro -----------------------------------------------------
+
+    def ordenar(self, col):
+        """Ordena por una columna; un segundo clic invierte el sentido."""
+        if self.datos is None:
+            return
+        if self.columna_orden == col:
+            self.descendente = not self.descendente
+        else:
+            self.columna_orden = col
+            self.descendente = False
+        for c in self.columnas:
+            flecha = ''
+            if c == self.columna_orden:
+                flecha = ' ▼' if self.descendente else ' ▲'
+            self.tabla.heading(c, text=c + flecha)
+        self.inicio = 0
+        self._recalcular_vista()
+
+    def filtrar(self, expresion):
+        """
+        Filtra la tabla con una expresión como 'Tbs > 30 and φ > 80'.
+
+        Se admiten comparaciones (>, >=, <, <=, ==, !=) entre una columna
+        (o su alias) y un número o fecha, unidas con 'and'/'or' ('y'/'o').
+
+        Args:
+            expresion (str): Expresión de filtro; vacía para quitar el filtro
+
+        Raises:
+            ValueError: Si la expresión no es válida
+        """
+        if self.datos is None:
+            return
+        expresion = expresion.strip()
+        self.mascara = self._evaluar_filtro(expresion) if expresion else None
+        self.expresion = expresion or None
+        self.inicio = 0
+        self._recalcular_vista()
+
+    def filtrar_rango(self, i0, i1):
+        """Muestra sólo las filas [i0, i1) (por ejemplo, un rango de fechas)."""
+        self.mascara = np.zeros(len(self.datos), dtype=bool)
+        self.mascara[i0:i1] = True
+        self.expresion = None
+        self.inicio = 0
+        self._recalcular_vista()
+
+    def _evaluar_filtro(self, expresion, filas=slice(None)):
+        mascara_o = None
+        for parte_o in re.split(r'\s+(?:or|o)\s+', expresion):
+            mascara_y = None
+            for condicion in re.split(r'\s+(?:and|y)\s+', parte_o):
+                m = self._evaluar_condicion(condicion.strip(), filas)
+                mascara_y = m if mascara_y is None else (mascara_y & m)
+            mascara_o = mascara_y if mascara_o is None else (mascara_o | mascara_y)
+        return mascara_o
+
+    def _evaluar_condicion(self, condicion, filas=slice(None)):
+        coincidencia = re.fullmatch(r'(.+?)\s*(>=|<=|==|!=|>|<|=)\s*(.+)', condicion)
+        if not coincidencia:
+            raise ValueError(f"Condición no válida: '{condicion}'")
+        campo, operador, valor = (g.strip() for g in coincidencia.groups())
+        col = self.ALIAS.get(campo, campo)
+        if col not in self.datos.columns:
+            raise ValueError(f"Columna desconocida: '{campo}'")
+        arr = self._arreglo(col)[filas]
+        if pd.api.types.is_datetime64_any_dtype(self.datos[col]):
+            referencia = IndiceTemporal._a_entero(valor.strip('\'"'))
+        else:
+            try:
+                referencia = float(valor)
+            except ValueError:
+                raise ValueError(f"Valor no numérico: '{valor}'")
+        return self.OPERADORES[operador](arr, referencia)
+
+    def _recalcular_vista(self):
+        """Combina la permutación de orden y la máscara de filtro en la vista actual."""
+        if self.datos is None:
+            self.vista = np.arange(0)
+        else:
+            n = len(self.datos)
+            if self.columna_orden in self.datos.columns:
+                perm = self._orden(self.columna_orden)
+                if self.descendente:
+                    # Invertir sólo los valores válidos para dejar los NaN al final
+                    validos = int(np.count_nonzero(~np.isnan(self._arreglo(self.columna_orden)))) \
+                        if self._arreglo(self.columna_orden).dtype.kind == 'f' else n
+                    perm = np.concatenate((perm[:validos][::-1], perm[validos:]))
+                self.vista = perm if self.mascara is None else perm[self.mascara[perm]]
+            else:
+                self.vista = np.arange(n) if self.mascara is None else np.flatnonzero(self.mascara)
+        # El cursor y el ancla son posiciones en la vista: pierden sentido al cambiarla
+        self.cursor = self.ancla = None
+        self.refrescar()
+        if self.al_cambiar_vista is not None:
+            self.al_cambiar_vista()
+
+    # --- Dibujo y desplazamiento --------------------------------------------
+
+    def _formatear(self, col, fila):
+        valor = self.datos[col].iat[fila]
+        if isinstance(valor, pd.Timestamp):
+            return valor.strftime('%Y-%m-%d %H:%M:%S')
+        if pd.isna(valor):
+            return ''
+        return valor
+
+    def valores_fila(self, fila):
+        """Valores mostrados de una fila (posición en self.datos)."""
+        return [self._formatear(col, fila) if col in self.datos.columns else ''
+                for col in self.columnas]
+
+    def fila_de_item(self, iid):
+        """Posición en self.datos de la fila mostrada en un elemento del Treeview."""
+        if iid not in self.iids:
+            return None
+        pos = self.inicio + self.iids.index(iid)
+        return int(self.vista[pos]) if pos < len(self.vista) else None
+
+    def refrescar(self):
+        """Reescribe los valores de las filas visibles."""
+        total = len(self.vista)
+        self.inicio = max(0, min(self.inicio, total - len(self.iids)))
+        for k, iid in enumerate(self.iids):
+            pos = self.inicio + k
+            if pos < total:
+                self.tabla.item(iid, values=self.valores_fila(int(self.vista[pos])),
+                                tags=('fila_par' if pos % 2 == 0 else 'fila_impar',))
+            else:
+                self.tabla.item(iid, values=(), tags=())
+        visibles = [iid for k, iid in enumerate(self.iids)
+                    if self.inicio + k < total and self.seleccion[self.vista[self.inicio + k]]]
+        self.tabla.selection_set(visibles)
+        if total > 0 and self.iids:
+            self.vsb.set(self.inicio / total, min(1.0, (self.inicio + len(self.iids)) / total))
+        else:
+            self.vsb.set(0, 1)
+
+    def _redimensionar(self, event):
+        # Una fila del alto corresponde al encabezado
+        n = max(1, event.height // self.alto_fila - 1)
+        if n == len(self.iids):
+            return
+        while len(self.iids) < n:
+            self.iids.append(self.tabla.insert("", "end", values=()))
+        if len(self.iids) > n:
+            self.tabla.delete(*self.iids[n:])
+            del self.iids[n:]
+        self.refrescar()
+
+    def _ir_a(self, inicio):
+        self.inicio = int(inicio)
+        self.refrescar()
+        return "break"
+
+    def _mover(self, filas):
+        return self._ir_a(self.inicio + filas)
+
+    def _rueda(self, event):
+        return self._mover(-3 if event.delta > 0 else 3)
+
+    def _desplazar(self, *args):
+        total = len(self.vista)
+        if args[0] == 'moveto':
+            self._ir_a(float(args[1]) * total)
+        elif args[0] == 'scroll':
+            paso = int(args[1]) * (len(self.iids) if args[2] == 'pages' else 1)
+            self._mover(paso)
+
+    # --- Selección -----------------------------------------------------------
+
+    def _clic(self, event, extender, alternar):
+        iid = self.tabla.identify_row(event.y)
+        if self.tabla.identify_region(event.x, event.y) != 'cell' or iid not in self.iids:
+            return None
+        pos = self.inicio + self.iids.index(iid)
+        if pos < len(self.vista):
+            self.tabla.focus_set()
+            self.seleccionar(pos, extender=extender, alternar=alternar)
+        return "break"
+
+    def seleccionar(self, pos, extender=False, alternar=False):
+        """
+        Selecciona la fila en la posición `pos` de la vista.
+
+        Args:
+            pos (int): Posición en la vista actual
+            extender (bool): Seleccionar el rango desde el ancla (Shift)
+            alternar (bool): Añadir o quitar la fila de la selección (Ctrl)
+        """
+        if extender and self.ancla is not None:
+            a, b = sorted((self.ancla, pos))
+            self.seleccion[:] = False
+            self.seleccion[self.vista[a:b + 1]] = True
+        elif alternar:
+            fila = self.vista[pos]
+            self.seleccion[fila] = not self.seleccion[fila]
+            self.ancla = pos
+        else:
+            self.seleccion[:] = False
+            self.seleccion[self.vista[pos]] = True
+            self.ancla = pos
+        self.cursor = pos
+        if not self.inicio <= pos < self.inicio + len(self.iids):
+            self.inicio = pos if pos < self.inicio else pos - len(self.iids) + 1
+        self.refrescar()
+        if self.al_seleccionar is not None:
+            self.al_seleccionar()
+
+    def seleccionar_todo(self):
+        """Selecciona todas las filas de la vista actual."""
+        if len(self.vista):
+            self.seleccion[self.vista] = True
+            self.ancla, self.cursor = 0, len(self.vista) - 1
+            self.refrescar()
+            if self.al_seleccionar is not None:
+                self.al_seleccionar()
+        return "break"
+
+    def filas_seleccionadas(self):
+        """Posiciones en self.datos de las filas seleccionadas, en el orden de la vista."""
+        if self.datos is None or not len(self.vista):
+            return np.arange(0)
+        return self.vista[self.seleccion[self.vista]]
+
+    def fila_cursor(self):
+        """Posición en self.datos de la última fila seleccionada, o None."""
+        if self.cursor is None or self.cursor >= len(self.vista):
+            return None
+        return int(self.vista[self.cursor])
+
+    def _mover_seleccion(self, paso, extender=False):
+        if not len(self.vista):
+            return "break"
+        if self.cursor is None:
+            pos = self.inicio
+        else:
+            pos = min(max(self.cursor + paso, 0), len(self.vista) - 1)
+        self.seleccionar(pos, extender=extender)
+        return "break"
+
+    def texto_tsv(self, filas):
+        """
+        Serializa filas como texto separado por tabuladores en un solo bloque.
+
+        Cada columna se convierte a texto de forma vectorizada (formateando
+        sólo sus valores distintos) y las filas se unen en un único str, sin
+        leer el Treeview. Es más rápido que DataFrame.to_csv, que formatea
+        cada valor; 100 000 filas tardan menos de medio segundo.
+
+        Args:
+            filas (np.ndarray): Posiciones en self.datos, en el orden deseado
+
+        Returns:
+            str: Encabezados y filas en formato TSV
+        """
+        columnas = [self._columna_texto(col, filas) for col in self.columnas]
+        lineas = ['\t'.join(self.columnas)]
+        lineas.extend(map('\t'.join, zip(*columnas)))
+        return '\n'.join(lineas) + '\n'
+
+    def _columna_texto(self, col, filas):
+        """Textos de una columna para las filas dadas (vacío para NaN/NaT)."""
+        if col not in self.datos.columns:
+            return [''] * len(filas)
+        serie = self.datos[col]
+        if pd.api.types.is_datetime64_any_dtype(serie):
+            valores = serie.to_numpy(dtype='datetime64[ns]')[filas].astype('datetime64[s]')
+            distintos, inverso = np.unique(valores, return_inverse=True)
+            textos = [t.replace('T', ' ') if t != 'NaT' else ''
+                      for t in np.datetime_as_string(distintos).tolist()]
+        elif serie.dtype.kind in 'biuf':
+            distintos, inverso = np.unique(serie.to_numpy()[filas], return_inverse=True)
+            textos = ['' if v != v else str(v) for v in distintos.tolist()]
+        else:
+            return ['' if pd.isna(v) else str(v) for v in serie.iloc[filas].tolist()]
+        return np.array(textos, dtype=object)[inverso].tolist()
+
+    def ir_a_fila(self, fila):
+        """Desplaza la vista hasta mostrar la fila indicada (posición en self.datos)."""
+        pos = np.flatnonzero(self.vista == fila)
+        if len(pos):
+            self._ir_a(pos[0])
+
+class InterfazGraficaMejorada:
+    def __init__(self, calculadora, depurar=False):
+        """
+        Args:
+            calculadora (CalculadoraPropiedades): Propiedades del aire húmedo
+            depurar (bool): Si es True se imprime el informe de tiempos de arranque
+        """
+        self.calculadora = calculadora
+        self.depurar = depurar
+        self.datos = None
+        self.root = None
+        self.selected_row = None
+        self.analizador = None
+        self.current_panel = None
+        self.nav_buttons = {}
+        self.indice_temporal = None
+        self.tabla_virtual = None
+        self.gestor_figuras = None
+        self.paneles = {}
+        self.fondos_carta = FondoCartaPsicrometrica(calculadora, factor_presion=1000, escala_W=1000)
+        # Efemérides solares memorizadas por día, compartidas entre cargas
+        self.sol = PosicionSolar()
+        self.tiempos_arranque = {'importaciones': _T_FIN_IMPORTACIONES - _T_INICIO_IMPORTACIONES}
+        self._reproduccion_alarmas = None
+        self._simulacion_en_curso = False
+        # Seguimiento en vivo del archivo cargado (SeguidorArchivo y su motor de alarmas)
+        self._seguimiento = None
+        self.ruta_datos = None
+        self.presion_datos = None
+
+    def iniciar_interfaz(self):
+        """Inicializa y configura la interfaz principal."""
+        t0 = time.perf_counter()
+        self.root = tk.Tk()
+        self.root.title("Sistema de Análisis de Invernadero Software AB24_77 V3.27")
+        self.root.geometry("1400x800")
+        
+        # Configurar tema y estilo
+        self.setup_styles()
+        
+        # Ventanas de gráficos reutilizables
+        self.gestor_figuras = GestorFiguras(self.root)
+        
+        # Frame principal
+        self.main_container = ttk.Frame(self.root)
+        self.main_container.pack(fill='both', expand=True)
+        
+        # Crear navbar
+        self.crear_navbar()
+        
+        # Crear área de trabajo principal
+        self.workspace = ttk.Frame(self.main_container, padding="10")
+        self.workspace.pack(fill='both', expand=True)
+        
+        # Los paneles se crean la primera vez que se navega a ellos
+        self.mostrar_panel('datos')
+        
+        # Configurar eventos
+        self.configurar_eventos()
+        
+        self.tiempos_arranque['widgets'] = time.perf_counter() - t0
+        self.root.after_idle(self.registrar_primera_ventana)
+        
+        self.root.mainloop()
+
+    def registrar_primera_ventana(self):
+        """Registra el tiempo hasta que la ventana principal queda dibujada."""
+        self.tiempos_arranque['primera_ventana'] = time.perf_counter() - _T_INICIO_IMPORTACIONES
+        self.actualizar_estado(f"Listo en {self.tiempos_arranque['primera_ventana'] * 1000:.0f} ms")
+        if self.depurar:
+            print(self.informe_arranque())
+
+    def informe_arranque(self):
+        """
+        Genera el informe de tiempos de arranque.
+        
+        Returns:
+            str: Desglose de importaciones, creación de widgets, paneles
+                 diferidos y primera carga de datos
+        """
+        etiquetas = [
+            ('importaciones', 'Importaciones'),
+            ('widgets', 'Creación de widgets'),
+            ('primera_ventana', 'Tiempo hasta la primera ventana'),
+            ('panel_analisis', 'Panel de análisis (diferido)'),
+            ('panel_visualizacion', 'Panel de visualización (diferido)'),
+            ('primera_carga', 'Primera carga de datos'),
+        ]
+        lineas = ["Tiempos de arranque:"]
+        for clave, texto in etiquetas:
+            if clave in self.tiempos_arranque:
+                lineas.append(f"  {texto}: {self.tiempos_arranque[clave] * 1000:.0f} ms")
+        return "\n".join(lineas)
+
+    def setup_styles(self):
+        """Configura los estilos de la interfaz."""
+        style = ttk.Style(self.root)
+        style.theme_use('clam')
+        
+        # Colores
+        primary_color = '#2c3e50'
+        secondary_color = '#34495e'
+        accent_color = '#3498db'
+        
+        # Configuración general
+        style.configure('.',
+                       background='#f5f6fa',
+                       foreground='#333333',
+                       font=('Arial', 10))
+        
+        # Navbar
+        style.configure('Navbar.TFrame',
+                       background=primary_color)
+        style.configure('Navbar.TButton',
+                       background=primary_color,
+                       foreground='white',
+                       padding=10)
+        
+        # Botones
+        style.configure('Action.TButton',
+                       background=accent_color,
+                       foreground='white',
+                       padding=(10, 5))
+        
+        # Headers
+        style.configure('Header.TLabel',
+                       font=('Arial', 14, 'bold'),
+                       foreground=primary_color)
+
+    def crear_navbar(self):
+        """Crea la barra de navegación."""
+        navbar = ttk.Frame(self.main_container, style='Navbar.TFrame')
+        navbar.pack(fill='x', side='top')
+        
+        # Botones de navegación
+        for text, panel_id in [
+            ("Datos", "datos"),
+            ("Análisis", "analisis"),
+            ("Visualización", "visualizacion")
+        ]:
+            btn = ttk.Button(navbar,
+                           text=text,
+                           command=lambda p=panel_id: self.mostrar_panel(p),
+                           style='Navbar.TButton')
+            btn.pack(side='left', padx=2)
+            self.nav_buttons[panel_id] = btn
+
+    def validar_altura(self, value):
+        """Valida que la entrada de altura sea un número no negativo."""
+        if value == "":
+            return True
+        try:
+            num = float(value)
+            return num >= 0
+        except ValueError:
+            return False
+        
+    def resaltar_error_altura(self):
+        """Resalta el campo de altura en rojo temporalmente."""
+        self.altura_entry.configure(style="Error.TEntry")
+        self.root.after(1000, lambda: self.altura_entry.configure(style="TEntry"))
+
+    def obtener_altura(self):
+        """Obtiene la altura ingresada o usa el valor por defecto."""
+        try:
+            return float(self.altura_entry.get() or 0)
+        except ValueError:
+            return 0
+
+    def mostrar_menu_borrado(self):
+        """Muestra el menú de opciones de borrado."""
+        if not hasattr(self, 'datos') or self.datos is None:
+            messagebox.showwarning("Advertencia", "No hay datos para borrar")
+            return
+            
+        menu = tk.Menu(self.root, tearoff=0)
+        menu.add_command(label="Borrar Todo", command=self.borrar_todo)
+        menu.add_command(label="Borrar por Rango de Fechas",
+                         command=lambda: self.seleccionar_rango_fechas('borrar'))
+        menu.add_command(label="Conservar Rango de Fechas",
+                         command=lambda: self.seleccionar_rango_fechas('conservar'))
+        menu.add_command(label="Ver Rango de Fechas",
+                         command=lambda: self.seleccionar_rango_fechas('ver'))
+        
+        try:
+            menu.tk_popup(
+                self.root.winfo_pointerx(),
+                self.root.winfo_pointery()
+            )
+        finally:
+            menu.grab_release()
+
+    def borrar_todo(self):
+        """Borra todos los datos de la tabla."""
+        if messagebox.askyesno("Confirmar", "¿Está seguro de borrar todos los datos?"):
+            self.detener_seguimiento()
+            self.datos = None
+            self.analizador = None
+            self.indice_temporal = None
+            
+            # Limpiar tabla
+            self.tabla_virtual.establecer_datos(None)
+            self.gestor_figuras.cerrar_todas()
+            
+            # Actualizar estado
+            self.archivo_label.config(text="No hay archivo cargado")
+            self.registros_label.config(text="0 registros")
+            
+            # Deshabilitar botones de análisis y visualización
+            self.deshabilitar_botones_analisis()
+
+    def borrar_por_fechas(self):
+        """Abre una ventana para seleccionar el rango de fechas a borrar."""
+        self.seleccionar_rango_fechas('borrar')
+
+    def seleccionar_rango_fechas(self, accion):
+        """
+        Abre una ventana para seleccionar un rango de fechas y aplicar una acción.
+        
+        Args:
+            accion (str): 'borrar', 'conservar' o 'ver'
+        """
+        if 'Fecha_Hora' not in self.datos.columns or self.indice_temporal is None:
+            messagebox.showerror("Error", "Los datos no contienen información de fechas")
+            return
+        
+        titulos = {
+            'borrar': "Borrar por Rango de Fechas",
+            'conservar': "Conservar Rango de Fechas",
+            'ver': "Ver Rango de Fechas"
+        }
+            
+        ventana = tk.Toplevel(self.root)
+        ventana.title(titulos[accion])
+        ventana.geometry("400x250") # "XxY"
+        
+        # Crear frame principal
+        frame = ttk.Frame(ventana, padding="10")
+        frame.pack(fill='both', expand=True)
+        
+        # Fechas mínima y máxima disponibles (extremos del índice ordenado)
+        fecha_min = pd.Timestamp(self.indice_temporal.tiempos[0])
+        fecha_max = pd.Timestamp(self.indice_temporal.tiempos[-1])
+        
+        # Variables para las fechas
+        fecha_inicio = tk.StringVar(value=fecha_min.strftime('%Y-%m-%d %H:%M:%S'))
+        fecha_fin = tk.StringVar(value=fecha_max.strftime('%Y-%m-%d %H:%M:%S'))
+        
+        # Widgets para fecha inicial
+        ttk.Label(frame, text="Fecha Inicial:").pack(pady=5)
+        entry_inicio = ttk.Entry(frame, textvariable=fecha_inicio)
+        entry_inicio.pack(pady=5)
+        
+        # Widgets para fecha final
+        ttk.Label(frame, text="Fecha Final:").pack(pady=5)
+        entry_fin = ttk.Entry(frame, textvariable=fecha_fin)
+        entry_fin.pack(pady=5)
+        
+        def aplicar():
+            try:
+                inicio = pd.to_datetime(fecha_inicio.get())
+                fin = pd.to_datetime(fecha_fin.get())
+                
+                if inicio > fin:
+                    messagebox.showerror("Error", "La fecha inicial debe ser anterior a la fecha final")
+                    return
+                
+                # Búsqueda binaria sobre el índice ordenado
+                i0, i1 = self.indice_temporal.rango(inicio, fin)
+                
+                if accion == 'ver':
+                    self.ver_rango_filas(i0, i1)
+                else:
+                    self.recortar_datos(i0, i1, conservar=(accion == 'conservar'))
+                
+                # Cerrar ventana
+                ventana.destroy()
+                
+            except ValueError:
+                messagebox.showerror("Error", "Formato de fecha inválido.\nUse: YYYY-MM-DD HH:MM:SS")
+        
+        # Botones
+        frame_botones = ttk.Frame(frame)
+        frame_botones.pack(pady=20)
+        
+        ttk.Button(frame_botones, text="Aplicar", command=aplicar).pack(side='left', padx=5)
+        ttk.Button(frame_botones, text="Cancelar", command=ventana.destroy).pack(side='left', padx=5)
+
+    def recortar_datos(self, i0, i1, conservar=False):
+        """
+        Borra (o conserva solamente) las filas [i0, i1) sin reconstruir la tabla.
+        
+        La tabla sólo recorta sus órdenes y máscara guardados y redibuja las filas
+        visibles; los datos derivados del analizador se recortan en lugar de
+        recalcularse.
+        
+        Args:
+            i0 (int): Primera posición del rango
+            i1 (int): Posición siguiente a la última del rango
+            conservar (bool): Si es True se conserva el rango y se borra el resto
+        """
+        n = len(self.datos)
+        if conservar:
+            if i0 == 0 and i1 == n:
+                return
+            self.datos = self.datos.iloc[i0:i1].reset_index(drop=True)
+            self.indice_temporal.conservar(i0, i1)
+        else:
+            if i0 == i1:
+                return
+            self.datos = pd.concat(
+                [self.datos.iloc[:i0], self.datos.iloc[i1:]], ignore_index=True
+            )
+            self.indice_temporal.eliminar(i0, i1)
+        
+        self.tabla_virtual.eliminar_filas(self.datos, i0, i1, conservar=conservar)
+        self.selected_row = None
+        
+        if self.analizador is not None:
+            self.analizador.recortar(i0, i1, conservar=conservar)
+            self.refrescar_figuras()
+        
+        self.deshabilitar_botones_analisis()
+        self.actualizar_estado(f"{n - len(self.datos)} registros eliminados")
+
+    def ver_rango_filas(self, i0, i1):
+        """Filtra la tabla para mostrar sólo las filas [i0, i1)."""
+        if i0 == i1:
+            messagebox.showinfo("Información", "No hay registros en el rango seleccionado")
+            return
+        inicio = pd.Timestamp(self.indice_temporal.tiempos[i0])
+        fin = pd.Timestamp(self.indice_temporal.tiempos[i1 - 1])
+        self.filtro_var.set(f"Fecha >= '{inicio}' and Fecha <= '{fin}'")
+        self.tabla_virtual.filtrar_rango(i0, i1)
+        self.actualizar_estado(f"{i1 - i0} registros en el rango")
+
+    def deshabilitar_botones_analisis(self):
+        """
+        Deshabilita los botones de análisis y visualización cuando no hay datos.
+        Solo se deshabilitan si el DataFrame está vacío o es None.
+        """
+        should_disable = not hasattr(self, 'datos') or self.datos is None or len(self.datos) == 0
+        
+        if hasattr(self, 'analisis_buttons'):
+            for btn in self.analisis_buttons.values():
+                if should_disable:
+                    btn.state(['disabled'])
                 else:
                     btn.state(['!disabled'])
                 
@@ -652,7 +3569,8 @@ class InterfazGraficaMejorada:
         self.estado_label = ttk.Label(info_frame, text="Listo")
         self.estado_label.pack(side='right', padx=5)
         
-        # Crear tabla
+        # Crear barra de filtro y tabla
+        self.crear_barra_filtro(self.panel_datos)
         self.crear_tabla(self.panel_datos)
         
         # Barra de estado inferior
@@ -950,7 +3868,8 @@ class InterfazGraficaMejorada:
             "Temp_interna_invernadero", "Hum_interna_invernadero",
             "Temp_externa_invernadero", "Hum_externa_invernadero",
             "Pvs (kPa)", "Pv (kPa)", 
-            "W (kg_vp/kg_AS)", "h (kJ/kg_AS)", "Tpr (°C)"
+            "W (kg_vp/kg_AS)", "h (kJ/kg_AS)", "Tpr (°C)",
+            "DPV (kPa)", "DPV hoja (kPa)"
         )
         
         style = ttk.Style()
@@ -966,53 +3885,60 @@ class InterfazGraficaMejorada:
                   background=[("selected", "#0078D7")],
                   foreground=[("selected", "white")])
         
-        self.tabla = ttk.Treeview(
-            table_frame,
-            columns=columnas,
-            show='headings',
-            style="Treeview"
-        )
+        # Tabla virtual: sólo existen elementos para las filas visibles
+        self.tabla_virtual = TablaVirtual(table_frame, columnas)
+        self.tabla_virtual.al_cambiar_vista = self.actualizar_contador_registros
+        self.tabla_virtual.al_seleccionar = self.on_select
+        self.tabla = self.tabla_virtual.tabla
         
         # Configurar columnas
         for col in columnas:
-            self.tabla.heading(col, text=col)
             if col == "Fecha_Hora":
                 self.tabla.column(col, width=150)
             else:
                 self.tabla.column(col, width=100)
         
-        # Scrollbars
-        vsb = ttk.Scrollbar(table_frame, orient="vertical", command=self.tabla.yview)
-        hsb = ttk.Scrollbar(table_frame, orient="horizontal", command=self.tabla.xview)
-        self.tabla.configure(yscrollcommand=vsb.set, xscrollcommand=hsb.set)
-        
         # Layout
-        vsb.pack(side='right', fill='y')
-        hsb.pack(side='bottom', fill='x')
-        self.tabla.pack(fill='both', expand=True)
-        
-        # Bind para colorear filas después de insertar/actualizar datos
-        def actualizar_colores_filas(event=None):
-            items = self.tabla.get_children("")
-            for i, item in enumerate(items):
-                # Color alternado para filas
-                if i % 2 == 0:
-                    self.tabla.tag_configure(f'row_{i}', background='white')
-                    self.tabla.item(item, tags=(f'row_{i}',))
-                else:
-                    self.tabla.tag_configure(f'row_{i}', background='#F5F5F5')
-                    self.tabla.item(item, tags=(f'row_{i}',))
-                
-                # Separación cada 10 filas
-                if (i + 1) % 10 == 0 and i < len(items) - 1:
-                    self.tabla.tag_configure(f'separator_{i}', background='#E0E0E0')
-                    self.tabla.item(items[i+1], tags=(f'separator_{i}',))
-        
-        self.tabla.bind('<<TreeviewOpen>>', actualizar_colores_filas)
-        self.tabla.bind('<<TreeviewClose>>', actualizar_colores_filas)
-        
-        # Guardar la función para usarla después de cargar datos
-        self.actualizar_colores_filas = actualizar_colores_filas
+        self.tabla_virtual.pack()
+
+    def crear_barra_filtro(self, parent):
+        """Crea la barra de filtro de la tabla (p. ej. 'Tbs > 30 and φ > 80')."""
+        filtro_frame = ttk.Frame(parent)
+        filtro_frame.pack(fill='x', padx=5)
+        
+        ttk.Label(filtro_frame, text="Filtro:").pack(side='left', padx=2)
+        self.filtro_var = tk.StringVar()
+        filtro_entry = ttk.Entry(filtro_frame, textvariable=self.filtro_var, width=60)
+        filtro_entry.pack(side='left', padx=2, fill='x', expand=True)
+        filtro_entry.bind('<Return>', lambda e: self.aplicar_filtro())
+        
+        ttk.Button(filtro_frame, text="Filtrar", command=self.aplicar_filtro).pack(side='left', padx=2)
+        ttk.Button(filtro_frame, text="Quitar Filtro", command=self.quitar_filtro).pack(side='left', padx=2)
+
+    def aplicar_filtro(self):
+        """Aplica la expresión de la barra de filtro a la tabla."""
+        if self.datos is None:
+            return
+        try:
+            self.tabla_virtual.filtrar(self.filtro_var.get())
+        except ValueError as e:
+            messagebox.showerror("Error", f"Filtro no válido: {str(e)}")
+
+    def quitar_filtro(self):
+        """Quita el filtro y muestra todos los registros."""
+        self.filtro_var.set('')
+        self.aplicar_filtro()
+
+    def actualizar_contador_registros(self):
+        """Muestra el número de registros visibles y totales."""
+        if not hasattr(self, 'registros_label'):
+            return
+        total = 0 if self.datos is None else len(self.datos)
+        visibles = len(self.tabla_virtual.vista)
+        if visibles == total:
+            self.registros_label.config(text=f"{total} registros")
+        else:
+            self.registros_label.config(text=f"{visibles} de {total} registros")
     
     def crear_panel_analisis(self):
         """Crea el panel de análisis."""
@@ -1035,7 +3961,12 @@ class InterfazGraficaMejorada:
             ("Condiciones Internas vs Externas", self.analizar_condiciones_interno_externo),
             ("Análisis de Estrés Térmico", self.analizar_estres_termico),
             ("Análisis de Correlaciones", self.analizar_correlaciones),
-            ("Análisis de Series Temporales", self.analizar_series_temporales)
+            ("Análisis de Series Temporales", self.analizar_series_temporales),
+            ("Climograma", self.analizar_climograma),
+            ("Riesgo de Condensación", self.analizar_riesgo_condensacion),
+            ("Déficit de Presión de Vapor", self.analizar_dpv),
+            ("Simulación de Control", self.analizar_simulacion_control),
+            ("Cargas de Ventilación", self.analizar_cargas_ventilacion)
         ]:
             btn = ttk.Button(button_frame,
                            text=texto,
@@ -1045,6 +3976,29 @@ class InterfazGraficaMejorada:
             self.analisis_buttons[texto] = btn
             btn.state(['disabled'])
 
+        # Renovaciones de aire por hora de las cargas de ventilación
+        cargas_frame = ttk.Frame(self.panel_analisis)
+        cargas_frame.pack(pady=5)
+        ttk.Label(cargas_frame, text="Renovaciones por hora:").pack(side='left')
+        self.renovaciones_ventilacion = tk.DoubleVar(value=AnalisisInvernadero.RENOVACIONES_HORA)
+        ttk.Spinbox(cargas_frame, from_=0.1, to=120, increment=0.5, width=8,
+                    textvariable=self.renovaciones_ventilacion).pack(side='left', padx=5)
+
+        # Seguimiento en vivo del archivo cargado
+        self.boton_seguimiento = ttk.Button(self.panel_analisis, text="Seguir Archivo en Vivo",
+                                            command=self.seguir_archivo, style='Action.TButton')
+        self.boton_seguimiento.pack(pady=5)
+
+        # Reproducción de archivos históricos por el motor de alarmas
+        alarmas_frame = ttk.Frame(self.panel_analisis)
+        alarmas_frame.pack(pady=5)
+        ttk.Button(alarmas_frame, text="Reproducir Alarmas", command=self.reproducir_alarmas,
+                   style='Action.TButton').pack(pady=5)
+        ttk.Label(alarmas_frame, text="Velocidad (veces tiempo real):").pack(side='left')
+        self.velocidad_alarmas = tk.IntVar(value=3600)
+        ttk.Spinbox(alarmas_frame, from_=1, to=1000000, increment=600, width=8,
+                    textvariable=self.velocidad_alarmas).pack(side='left', padx=5)
+
     def crear_panel_visualizacion(self):
         """Crea el panel de visualización."""
         self.panel_visualizacion = ttk.Frame(self.workspace)
@@ -1066,7 +4020,9 @@ class InterfazGraficaMejorada:
             ("Análisis Psicrométrico", self.visualizar_analisis_psicrometrico),
             ("Carta Psicrométrica", self.visualizar_carta_psicrometrica),
             ("Distribución Espacial de Temperaturas", self.visualizar_distribucion_espacial),
-            ("Tendencias y Pronósticos", self.visualizar_tendencias_pronosticos)
+            ("Tendencias y Pronósticos", self.visualizar_tendencias_pronosticos),
+            ("Time-lapse Térmico", self.visualizar_time_lapse_termico),
+            ("Exportar Time-lapse", self.exportar_time_lapse_termico)
         ]:
             btn = ttk.Button(button_frame,
                            text=texto,
@@ -1076,19 +4032,37 @@ class InterfazGraficaMejorada:
             self.visualizacion_buttons[texto] = btn
             btn.state(['disabled'])
 
+        # Cuadros por segundo del time-lapse (reproducción y exportación)
+        fps_frame = ttk.Frame(self.panel_visualizacion)
+        fps_frame.pack(pady=5)
+        ttk.Label(fps_frame, text="Cuadros por segundo:").pack(side='left')
+        self.fps_time_lapse = tk.IntVar(value=10)
+        ttk.Spinbox(fps_frame, from_=1, to=60, width=5,
+                    textvariable=self.fps_time_lapse).pack(side='left', padx=5)
+
     def mostrar_panel(self, panel):
-        """Muestra el panel seleccionado y oculta los demás."""
+        """Muestra el panel seleccionado (creándolo si aún no existe) y oculta los demás."""
+        if panel not in self.paneles:
+            t0 = time.perf_counter()
+            creador = {
+                'datos': self.crear_panel_datos,
+                'analisis': self.crear_panel_analisis,
+                'visualizacion': self.crear_panel_visualizacion,
+            }[panel]
+            creador()
+            self.paneles[panel] = getattr(self, f'panel_{panel}')
+            if panel != 'datos':
+                self.tiempos_arranque[f'panel_{panel}'] = time.perf_counter() - t0
+                # Los botones nacen deshabilitados; habilitarlos si ya hay datos
+                if self.analizador is not None:
+                    self.habilitar_botones_analisis()
+        
         # Ocultar todos los paneles
-        for p in [self.panel_datos, self.panel_analisis, self.panel_visualizacion]:
+        for p in self.paneles.values():
             p.pack_forget()
         
         # Mostrar el panel seleccionado
-        if panel == 'datos':
-            self.panel_datos.pack(fill='both', expand=True)
-        elif panel == 'analisis':
-            self.panel_analisis.pack(fill='both', expand=True)
-        elif panel == 'visualizacion':
-            self.panel_visualizacion.pack(fill='both', expand=True)
+        self.paneles[panel].pack(fill='both', expand=True)
         
         self.current_panel = panel
 
@@ -1118,7 +4092,9 @@ class InterfazGraficaMejorada:
         )
         
         if filename:
+            self.detener_seguimiento()
             try:
+                t0 = time.perf_counter()
                 # Cargar datos usando el manejador
                 self.datos = ManejadorDatos.cargar_archivo(filename)
                 
@@ -1126,6 +4102,9 @@ class InterfazGraficaMejorada:
                     # Convertir columna de fecha si existe
                     if 'Fecha_Hora' in self.datos.columns:
                         self.datos['Fecha_Hora'] = pd.to_datetime(self.datos['Fecha_Hora'])
+                        if not self.datos['Fecha_Hora'].is_monotonic_increasing:
+                            self.datos = self.datos.sort_values('Fecha_Hora', kind='stable').reset_index(drop=True)
+                        self.indice_temporal = IndiceTemporal(self.datos['Fecha_Hora'])
                     
                     # Calcular propiedades psicrométricas usando la altura ingresada
                     self.calcular_propiedades_psicrometricas(altura)
@@ -1134,15 +4113,24 @@ class InterfazGraficaMejorada:
                     self.actualizar_tabla()
                     
                     # Crear instancia del analizador
-                    self.analizador = AnalisisInvernadero(self.datos, self.calculadora)
+                    self.analizador = AnalisisInvernadero(self.datos, self.calculadora, self.fondos_carta, self.sol)
+                    self.refrescar_figuras()
                     
                     # Habilitar botones
                     self.habilitar_botones_analisis()
                     
                     # Actualizar estado
+                    self.ruta_datos = filename
                     self.archivo_label.config(text=f"Archivo: {os.path.basename(filename)}")
                     self.registros_label.config(text=f"{len(self.datos)} registros")
                     
+                    if 'primera_carga' not in self.tiempos_arranque:
+                        self.tiempos_arranque['primera_carga'] = time.perf_counter() - t0
+                        self.actualizar_estado(f"Datos cargados en "
+                                               f"{self.tiempos_arranque['primera_carga'] * 1000:.0f} ms")
+                        if self.depurar:
+                            print(self.informe_arranque())
+                    
                     messagebox.showinfo("Éxito", "Datos cargados correctamente")
             
             except Exception as e:
@@ -1166,160 +4154,533 @@ class InterfazGraficaMejorada:
             altura (float): Altura en metros sobre el nivel del mar
         """
         presion_atm = self.calculadora.calcular_presion(altura)
+        self.calculadora.agregar_propiedades(self.datos, presion_atm)
+        self.presion_datos = presion_atm
+
+    def actualizar_tabla(self):
+        """Actualiza la tabla con los datos procesados."""
+        self.filtro_var.set('')
+        self.selected_row = None
+        self.tabla_virtual.establecer_datos(self.datos)
         
-        # Iterar sobre cada fila
-        for idx, row in self.datos.iterrows():
-            try:
-                Tbs = row['Temp_interna_invernadero']
-                Hr = row['Hum_interna_invernadero']
-                
-                # Calcular propiedades
-                props = self.calculadora.calcular_propiedades_desde_Tbs_Hr(Tbs, Hr, presion_atm)
-                
-                # Actualizar DataFrame
-                for key, value in props.items():
-                    if key in ['Tbs (°C)', 'φ (%)']: continue
-                    self.datos.at[idx, key] = value
-                    
+    def guardar_datos(self):
+        """Guarda los datos en formato CSV o Excel."""
+        if self.datos is not None:
+            filename = filedialog.asksaveasfilename(
+                defaultextension=".xlsx",
+                filetypes=[
+                    ("Excel (*.xlsx)", "*.xlsx"),
+                    ("CSV (*.csv)", "*.csv"),
+                    ("Excel 97-2003 (*.xls)", "*.xls")
+                ]
+            )
+            
+            if filename:
+                try:
+                    ManejadorDatos.guardar_archivo(self.datos, filename)
+                    messagebox.showinfo("Éxito", "Datos guardados correctamente")
+                except Exception as e:
+                    messagebox.showerror("Error", f"Error al guardar datos: {str(e)}")
+        else:
+            messagebox.showwarning("Advertencia", "No hay datos para guardar")
+
+    def configurar_eventos(self):
+        """Configura los eventos de la interfaz."""
+        self.tabla.bind('<Button-3>', self.mostrar_menu_contextual)
+        self.tabla.bind('<Control-c>', lambda e: self.copiar_seleccion() or "break")
+        self.tabla.bind('<Control-C>', lambda e: self.copiar_seleccion() or "break")
+
+    def mostrar_menu_contextual(self, event):
+        """Muestra el menú contextual."""
+        item = self.tabla.identify_row(event.y)
+        if item:
+            fila = self.tabla_virtual.fila_de_item(item)
+            if fila is None:
+                return
+            # Si se hace clic fuera de la selección, seleccionar sólo esa fila
+            if not self.tabla_virtual.seleccion[fila]:
+                self.tabla_virtual.seleccionar(self.tabla_virtual.inicio + self.tabla_virtual.iids.index(item))
+            n = len(self.tabla_virtual.filas_seleccionadas())
+            menu = tk.Menu(self.root, tearoff=0)
+            menu.add_command(label="Copiar" if n == 1 else f"Copiar {n} filas", command=self.copiar_seleccion)
+            menu.post(event.x_root, event.y_root)
+
+    def on_select(self):
+        """Maneja la selección de elementos en la tabla."""
+        self.selected_row = self.tabla_virtual.fila_cursor()
+
+    def copiar_seleccion(self):
+        """Copia las filas seleccionadas al portapapeles como TSV."""
+        if self.datos is None:
+            return
+        filas = self.tabla_virtual.filas_seleccionadas()
+        if not len(filas):
+            return
+        self.root.clipboard_clear()
+        self.root.clipboard_append(self.tabla_virtual.texto_tsv(filas))
+        self.actualizar_estado(f"{len(filas)} filas copiadas al portapapeles")
+
+    # Métodos de análisis
+    def mostrar_figura(self, clave, titulo, construir, actualizar=None, figsize=(15, 10)):
+        """
+        Muestra una vista de análisis en su ventana embebida.
+        
+        Args:
+            clave (str): Identificador de la vista en el gestor de figuras
+            titulo (str): Título de la ventana
+            construir (callable): construir(fig) dibuja la vista
+            actualizar (callable): actualizar(fig) opcional para actualizar en sitio
+            figsize (tuple): Tamaño de la figura
+        """
+        if not self.analizador:
+            messagebox.showwarning("Advertencia", "Cargue datos primero")
+            return
+        
+        try:
+            self.gestor_figuras.mostrar(clave, titulo, construir,
+                                        self.analizador.version,
+                                        actualizar=actualizar,
+                                        figsize=figsize)
+            self.actualizar_estado(f"{titulo} generado")
+        except Exception as e:
+            messagebox.showerror("Error", f"Error al generar {titulo}: {str(e)}")
+            self.actualizar_estado(f"Error al generar {titulo}")
+
+    def refrescar_figuras(self):
+        """Actualiza las ventanas de gráficos abiertas con la versión actual de los datos."""
+        if self.analizador is None:
+            self.gestor_figuras.cerrar_todas()
+        else:
+            self.gestor_figuras.refrescar(self.analizador.version)
+
+    def analizar_perfil_vertical(self):
+        self.mostrar_figura('perfil_vertical', "Perfil Vertical de Temperatura",
+                            lambda fig: self.analizador.analizar_perfil_vertical(fig))
+
+    def analizar_temperaturas_planta(self):
+        self.mostrar_figura('temperaturas_planta', "Temperaturas de la Planta",
+                            lambda fig: self.analizador.analizar_temperaturas_planta(fig))
+
+    def analizar_condiciones_interno_externo(self):
+        self.mostrar_figura('interno_externo', "Condiciones Internas vs Externas",
+                            lambda fig: self.analizador.analizar_condiciones_interno_externo(fig))
+
+    def analizar_estres_termico(self):
+        self.mostrar_figura('estres_termico', "Análisis de Estrés Térmico",
+                            lambda fig: self.analizador.analizar_estres_termico(fig))
+
+    def analizar_correlaciones(self):
+        self.mostrar_figura('correlaciones', "Análisis de Correlaciones",
+                            lambda fig: self.analizador.graficar_correlaciones(fig),
+                            figsize=(15, 12))
+
+    def analizar_series_temporales(self):
+        self.mostrar_figura('series_temporales', "Análisis de Series Temporales",
+                            lambda fig: self.analizador.graficar_series_temporales(fig),
+                            actualizar=lambda fig: self.analizador.actualizar_lineas(fig),
+                            figsize=(12, 15))
+
+    def analizar_climograma(self):
+        self.mostrar_figura('climograma', "Climograma",
+                            lambda fig: self.analizador.graficar_climograma(fig),
+                            figsize=(14, 8))
+
+    def analizar_riesgo_condensacion(self):
+        self.mostrar_figura('condensacion', "Riesgo de Condensación",
+                            lambda fig: self.analizador.graficar_riesgo_condensacion(fig))
+
+    def analizar_dpv(self):
+        self.mostrar_figura('dpv', "Déficit de Presión de Vapor",
+                            lambda fig: self.analizador.graficar_dpv(fig))
+
+    def analizar_simulacion_control(self):
+        """
+        Muestra el barrido de consignas de control.
+
+        El barrido tarda segundos, así que nunca se calcula en el hilo de la
+        interfaz: la vista dibuja el último barrido guardado (o un aviso) y
+        lanza la simulación en segundo plano, también cuando se actualiza por
+        datos nuevos (recortes, seguimiento en vivo).
+        """
+        self.mostrar_figura('simulacion', "Simulación de Control", self._dibujar_simulacion,
+                            actualizar=self._actualizar_simulacion)
+
+    def _dibujar_simulacion(self, fig):
+        """Dibuja la simulación sin calcularla y, si está pendiente, la lanza en segundo plano."""
+        self.analizador.graficar_simulacion_control(fig, calcular=False)
+        if self.analizador.simulacion_pendiente():
+            self.iniciar_simulacion()
+
+    def _actualizar_simulacion(self, fig):
+        """Con datos nuevos, marca como anterior el barrido ya dibujado en lugar de redibujarlo."""
+        tabla = self.analizador.ultima_simulacion()
+        if tabla is None or getattr(fig, '_tabla_simulacion', None) is not tabla:
+            self._dibujar_simulacion(fig)
+            return
+        if self.analizador.simulacion_pendiente():
+            fig.suptitle('Barrido de los datos anteriores; recalculando la simulación...', color='gray')
+            self.iniciar_simulacion()
+
+    def iniciar_simulacion(self):
+        """
+        Calcula en un hilo el barrido de consignas de la versión actual.
+
+        El simulador (arreglos propios) se prepara en el hilo de la interfaz;
+        al terminar se guarda el barrido y se redibuja la vista si está
+        abierta, lo que vuelve a lanzar la simulación si los datos cambiaron
+        entretanto.
+        """
+        if self._simulacion_en_curso:
+            return
+        analizador = self.analizador
+        try:
+            simulador = analizador.simulador_control()
+        except Exception as e:
+            self.actualizar_estado(f"Error al preparar la simulación: {str(e)}")
+            return
+        version = analizador.version
+        self._simulacion_en_curso = True
+        self.actualizar_estado("Simulando consignas de control...")
+        resultado = {}
+
+        def simular():
+            try:
+                resultado['tabla'] = AnalisisInvernadero.barrer_consignas(simulador)
             except Exception as e:
-                print(f"Error en fila {idx}: {str(e)}")
+                resultado['error'] = e
 
-    def actualizar_tabla(self):
-        """Actualiza la tabla con los datos procesados."""
-        # Limpiar tabla
-        for row in self.tabla.get_children():
-            self.tabla.delete(row)
-            
-        # Insertar nuevos datos
-        for idx, row in self.datos.iterrows():
-            valores = [
-                row['Fecha_Hora'].strftime('%Y-%m-%d %H:%M:%S'),
-                row['S1_temp_sustrato'], row['S2_temp_tallo'],
-                row['S3_temp_hoja'], row['S4_temp_fruto'],
-                row['S5_temp_1m_altura'], row['S6_temp_2m_altura'],
-                row['S7_temp_3_altura'],
-                row['Temp_interna_invernadero'], row['Hum_interna_invernadero'],
-                row['Temp_externa_invernadero'], row['Hum_externa_invernadero'],
-                row.get('Pvs (kPa)', ''), row.get('Pv (kPa)', ''),
-                row.get('W (kg_vp/kg_AS)', ''), row.get('h (kJ/kg_AS)', ''),
-                row.get('Tpr (°C)', '')
-            ]
-            self.tabla.insert("", "end", values=valores)
-        
-        # Actualizar colores después de insertar datos
-        if hasattr(self, 'actualizar_colores_filas'):
-            self.actualizar_colores_filas()
-        
-    def guardar_datos(self):
-        """Guarda los datos en formato CSV o Excel."""
-        if self.datos is not None:
-            filename = filedialog.asksaveasfilename(
+        hilo = threading.Thread(target=simular, daemon=True)
+        hilo.start()
+
+        def terminar():
+            if hilo.is_alive():
+                self.root.after(100, terminar)
+                return
+            self._simulacion_en_curso = False
+            if 'error' in resultado:
+                messagebox.showerror("Error", f"Error en la simulación: {resultado['error']}")
+                self.actualizar_estado("Error en la simulación de control")
+                return
+            analizador.guardar_simulacion(version, resultado['tabla'])
+            if analizador is self.analizador:
+                self.actualizar_estado("Simulación de control terminada")
+                self.gestor_figuras.redibujar('simulacion')
+
+        self.root.after(100, terminar)
+
+    def analizar_cargas_ventilacion(self):
+        """Muestra las cargas de ventilación y su tabla horaria/diaria exportable."""
+        if not self.analizador:
+            messagebox.showwarning("Advertencia", "Cargue datos primero")
+            return
+        try:
+            renovaciones = float(self.renovaciones_ventilacion.get())
+        except (tk.TclError, ValueError):
+            renovaciones = AnalisisInvernadero.RENOVACIONES_HORA
+        if renovaciones <= 0:
+            messagebox.showerror("Error", "Las renovaciones por hora deben ser positivas")
+            return
+        # Una vista por tasa: el gestor sólo redibuja al cambiar la versión de los datos
+        self.mostrar_figura(f'cargas_{renovaciones:g}', f"Cargas de Ventilación ({renovaciones:g}/h)",
+                            lambda fig: self.analizador.graficar_cargas_ventilacion(fig, renovaciones))
+        try:
+            horaria, diaria = self.analizador.cargas_ventilacion(renovaciones)
+        except Exception as e:
+            messagebox.showerror("Error", f"Error al calcular las cargas: {str(e)}")
+            return
+
+        ventana = tk.Toplevel(self.root)
+        ventana.title(f"Cargas de Ventilación ({renovaciones:g} renovaciones/h)")
+        ventana.geometry("1000x400")
+        barra = ttk.Frame(ventana, padding=5)
+        barra.pack(fill='x')
+        contenedor = ttk.Frame(ventana)
+        contenedor.pack(fill='both', expand=True)
+        tablas = {nombre: t.reset_index().rename(columns={t.index.name: 'Inicio'}).round(3)
+                  for nombre, t in [('Diaria', diaria), ('Horaria', horaria)]}
+        tabla = TablaVirtual(contenedor, ('Inicio', *AnalisisInvernadero.COLUMNAS_CARGAS))
+        tabla.pack()
+        resolucion = tk.StringVar(value='Diaria')
+
+        def cambiar(event=None):
+            tabla.establecer_datos(tablas[resolucion.get()])
+
+        def exportar():
+            ruta = filedialog.asksaveasfilename(
                 defaultextension=".xlsx",
-                filetypes=[
-                    ("Excel (*.xlsx)", "*.xlsx"),
-                    ("CSV (*.csv)", "*.csv"),
-                    ("Excel 97-2003 (*.xls)", "*.xls")
-                ]
+                filetypes=[("Excel (*.xlsx)", "*.xlsx"), ("CSV (*.csv)", "*.csv")]
             )
-            
-            if filename:
+            if ruta:
                 try:
-                    ManejadorDatos.guardar_archivo(self.datos, filename)
-                    messagebox.showinfo("Éxito", "Datos guardados correctamente")
+                    ManejadorDatos.guardar_archivo(tablas[resolucion.get()], ruta)
+                    self.actualizar_estado(f"Cargas de ventilación guardadas en {os.path.basename(ruta)}")
                 except Exception as e:
-                    messagebox.showerror("Error", f"Error al guardar datos: {str(e)}")
-        else:
-            messagebox.showwarning("Advertencia", "No hay datos para guardar")
+                    messagebox.showerror("Error", f"Error al guardar las cargas: {str(e)}")
 
-    def configurar_eventos(self):
-        """Configura los eventos de la interfaz."""
-        self.tabla.bind('<Button-3>', self.mostrar_menu_contextual)
-        self.tabla.bind('<<TreeviewSelect>>', self.on_select)
-
-    def mostrar_menu_contextual(self, event):
-        """Muestra el menú contextual."""
-        item = self.tabla.identify_row(event.y)
-        if item:
-            self.tabla.selection_set(item)
-            menu = tk.Menu(self.root, tearoff=0)
-            menu.add_command(label="Copiar", command=self.copiar_seleccion)
-            menu.post(event.x_root, event.y_root)
+        ttk.Label(barra, text="Resolución:").pack(side='left')
+        selector = ttk.Combobox(barra, textvariable=resolucion, values=list(tablas),
+                                state='readonly', width=10)
+        selector.pack(side='left', padx=5)
+        selector.bind('<<ComboboxSelected>>', cambiar)
+        ttk.Button(barra, text="Exportar", command=exportar).pack(side='left', padx=5)
+        ttk.Label(barra, text=f"Total: {diaria['Calentamiento_kWh'].sum():,.0f} kWh de calentamiento, "
+                              f"{diaria['Enfriamiento_kWh'].sum():,.0f} kWh de enfriamiento").pack(side='right')
+        cambiar()
 
-    def on_select(self, event):
-        """Maneja la selección de elementos en la tabla."""
-        selected_items = self.tabla.selection()
-        if selected_items:
-            self.selected_row = selected_items[0]
+    # Milisegundos entre revisiones del archivo seguido en vivo
+    INTERVALO_SEGUIMIENTO = 5000
 
-    def copiar_seleccion(self):
-        """Copia la selección al portapapeles."""
-        if self.selected_row:
-            valores = self.tabla.item(self.selected_row)['values']
-            self.root.clipboard_clear()
-            self.root.clipboard_append('\t'.join(map(str, valores)))
+    def seguir_archivo(self):
+        """
+        Inicia (o detiene) el seguimiento en vivo del CSV cargado.
 
-    # Métodos de análisis
-    def analizar_perfil_vertical(self):
-        if self.analizador:
-            self.analizador.analizar_perfil_vertical()
-            plt.show()
-        else:
+        Cada INTERVALO_SEGUIMIENTO ms se leen las filas que el registrador
+        agregó al archivo; sus promedios de 10 minutos completos se anexan a la
+        tabla y al análisis (propiedades, estadísticas móviles y figuras
+        abiertas) y pasan por el motor de alarmas, que anexa sus eventos a
+        '<archivo>_alarmas.log' y los muestra en la barra de estado.
+        """
+        if self._seguimiento is not None:
+            self.detener_seguimiento()
+            self.actualizar_estado("Seguimiento en vivo detenido")
+            return
+        if not self.analizador or not self.ruta_datos:
             messagebox.showwarning("Advertencia", "Cargue datos primero")
+            return
+        if not self.ruta_datos.lower().endswith('.csv'):
+            messagebox.showwarning("Advertencia", "Sólo se puede seguir en vivo un archivo CSV")
+            return
+        try:
+            seguidor = SeguidorArchivo(self.ruta_datos, self.datos['Fecha_Hora'].max())
+            motor = MotorAlarmas(registro=os.path.splitext(self.ruta_datos)[0] + '_alarmas.log',
+                                 al_evento=lambda e: self.actualizar_estado(
+                                     f"{e['Fecha_Hora']:%Y-%m-%d %H:%M} {e['Mensaje']}"))
+        except Exception as e:
+            messagebox.showerror("Error", f"No se pudo seguir el archivo: {e}")
+            return
+        self.analizador.alarmas = motor
+        self._seguimiento = {'seguidor': seguidor, 'motor': motor}
+        self.boton_seguimiento.config(text="Detener Seguimiento")
+        self.actualizar_estado(f"Siguiendo {os.path.basename(self.ruta_datos)} en vivo...")
+        self.root.after(self.INTERVALO_SEGUIMIENTO, self._sondear_archivo)
 
-    def analizar_temperaturas_planta(self):
-        if self.analizador:
-            self.analizador.analizar_temperaturas_planta()
-            plt.show()
-        else:
-            messagebox.showwarning("Advertencia", "Cargue datos primero")
+    def detener_seguimiento(self):
+        """Detiene el seguimiento en vivo y cierra su motor de alarmas."""
+        if self._seguimiento is None:
+            return
+        self._seguimiento['motor'].cerrar()
+        if self.analizador is not None and self.analizador.alarmas is self._seguimiento['motor']:
+            self.analizador.alarmas = None
+        self._seguimiento = None
+        if hasattr(self, 'boton_seguimiento'):
+            self.boton_seguimiento.config(text="Seguir Archivo en Vivo")
 
-    def analizar_condiciones_interno_externo(self):
-        if self.analizador:
-            self.analizador.analizar_condiciones_interno_externo()
-            plt.show()
-        else:
-            messagebox.showwarning("Advertencia", "Cargue datos primero")
+    def _sondear_archivo(self):
+        """Lee lo nuevo del archivo seguido y programa la siguiente revisión."""
+        if self._seguimiento is None:
+            return
+        try:
+            filas = self._seguimiento['seguidor'].leer()
+            if filas is not None:
+                self.anexar_filas(filas)
+        except Exception as e:
+            self.detener_seguimiento()
+            messagebox.showerror("Error", f"Error al leer el archivo en vivo: {e}")
+            return
+        self.root.after(self.INTERVALO_SEGUIMIENTO, self._sondear_archivo)
 
-    def analizar_estres_termico(self):
-        if self.analizador:
-            self.analizador.analizar_estres_termico()
-            plt.show()
-        else:
-            messagebox.showwarning("Advertencia", "Cargue datos primero")
+    def anexar_filas(self, filas):
+        """
+        Agrega lecturas nuevas a la tabla y al análisis sin recargar los datos.
 
-    def analizar_correlaciones(self):
-        if self.analizador:
-            self.analizador.graficar_correlaciones()
-            plt.show()
-        else:
-            messagebox.showwarning("Advertencia", "Cargue datos primero")
+        Args:
+            filas (pd.DataFrame): Promedios nuevos con las columnas de la carga
+        """
+        self.calculadora.agregar_propiedades(filas, self.presion_datos)
+        self.datos = pd.concat([self.datos, filas], ignore_index=True)
+        self.indice_temporal.anexar(filas['Fecha_Hora'])
+        # El análisis calcula sus columnas derivadas sólo para las filas nuevas
+        # y las pasa por el motor de alarmas
+        self.analizador.anexar(filas)
+        # La tabla conserva desplazamiento, selección, orden y filtro
+        self.tabla_virtual.anexar(self.datos, len(filas))
+        self.actualizar_contador_registros()
+        self.refrescar_figuras()
+        self.actualizar_estado(f"{len(filas)} registros nuevos hasta {filas['Fecha_Hora'].iloc[-1]:%Y-%m-%d %H:%M}")
 
-    def analizar_series_temporales(self):
-        if self.analizador:
-            self.analizador.graficar_series_temporales()
-            plt.show()
-        else:
-            messagebox.showwarning("Advertencia", "Cargue datos primero")
+    def reproducir_alarmas(self):
+        """
+        Reproduce un archivo histórico por el motor de alarmas en segundo plano.
+
+        Los eventos se anexan a '<archivo>_alarmas.log' y se muestran en la barra
+        de estado. Si ya hay una reproducción en curso, la detiene.
+        """
+        if self._reproduccion_alarmas is not None:
+            self._reproduccion_alarmas['detener'].set()
+            return
+        ruta = filedialog.askopenfilename(
+            filetypes=[("Todos los formatos", "*.csv;*.xlsx;*.xls"), ("Todos los archivos", "*.*")]
+        )
+        if not ruta:
+            return
+        try:
+            velocidad = max(1, int(self.velocidad_alarmas.get()))
+        except (tk.TclError, ValueError):
+            velocidad = 3600
+        altura = self.obtener_altura() or None
+        eventos = queue.Queue()
+        try:
+            motor = MotorAlarmas(registro=os.path.splitext(ruta)[0] + '_alarmas.log',
+                                 al_evento=eventos.put)
+        except Exception as e:
+            messagebox.showerror("Error", f"Error en las reglas de alarma: {e}")
+            return
+        estado = {'detener': threading.Event(), 'resultado': {}}
+        self._reproduccion_alarmas = estado
+        self.actualizar_estado(f"Reproduciendo {os.path.basename(ruta)} a {velocidad}x...")
+
+        def reproducir():
+            try:
+                motor.reproducir(ruta, altura, velocidad, estado['detener'])
+            except Exception as e:
+                estado['resultado']['error'] = e
+            finally:
+                motor.cerrar()
+
+        hilo = threading.Thread(target=reproducir, daemon=True)
+        hilo.start()
+
+        # La barra de estado sólo se toca desde el hilo de la interfaz
+        def sondear():
+            vivo = hilo.is_alive()
+            # Se vacía la cola después de mirar el hilo: si ya terminó, no
+            # quedan eventos por llegar
+            while not eventos.empty():
+                evento = eventos.get()
+                self.actualizar_estado(f"{evento['Fecha_Hora']:%Y-%m-%d %H:%M} {evento['Mensaje']}")
+            if vivo:
+                self.root.after(100, sondear)
+                return
+            self._reproduccion_alarmas = None
+            if 'error' in estado['resultado']:
+                messagebox.showerror("Error", f"Error al reproducir: {estado['resultado']['error']}")
+            else:
+                aperturas = sum(e['Evento'] == 'apertura' for e in motor.eventos)
+                self.actualizar_estado(f"Reproducción terminada: {aperturas} alarmas; "
+                                       f"activas al final: {', '.join(motor.activas) or 'ninguna'}")
+
+        self.root.after(100, sondear)
 
     # Métodos de visualización
     def visualizar_mapa_calor_3d(self):
-        if self.analizador:
-            self.analizador.graficar_mapa_calor_3d()
-            plt.show()
-        else:
-            messagebox.showwarning("Advertencia", "Cargue datos primero")
+        self.mostrar_figura('mapa_calor_3d', "Mapa de Calor 3D",
+                            lambda fig: self.analizador.graficar_mapa_calor_3d(fig))
 
-    def visualizar_comparacion_diurna_nocturna(self):
+    def _fps_time_lapse(self):
+        """Cuadros por segundo elegidos para el time-lapse (10 si el valor no es válido)."""
+        try:
+            return max(1, min(60, int(self.fps_time_lapse.get())))
+        except (tk.TclError, ValueError):
+            return 10
+
+    def visualizar_time_lapse_termico(self):
+        """Reproduce el time-lapse del campo térmico en su ventana embebida."""
+        clave = 'time_lapse_termico'
+
+        def construir(fig):
+            self.time_lapse = {'animacion': AnimacionCampoTermico(self.analizador.cuadros_campo_termico(), fig),
+                               'cuadro': 0, 'registrado': False}
+
+        self.mostrar_figura(clave, "Time-lapse Térmico", construir, figsize=(15, 8))
+        if clave in self.gestor_figuras.entradas and not getattr(self, 'time_lapse_activo', False):
+            self.time_lapse_activo = True
+            self.root.after(0, self._avanzar_time_lapse)
+
+    def _avanzar_time_lapse(self):
+        """
+        Dibuja el siguiente cuadro del time-lapse y programa el próximo.
+
+        Se intenta mantener los cuadros por segundo elegidos: la espera descuenta
+        lo que tardó el dibujo y, si el dibujo va retrasado, se saltan cuadros.
+        """
+        clave = 'time_lapse_termico'
+        if clave not in self.gestor_figuras.entradas:
+            self.time_lapse_activo = False
+            return
+
+        periodo = 1.0 / self._fps_time_lapse()
+        t0 = time.perf_counter()
+        estado = self.time_lapse
+        if not estado['registrado']:
+            # La figura es nueva (o se reconstruyó con otros datos)
+            self.gestor_figuras.registrar_animados(clave, estado['animacion'].artistas)
+            estado['registrado'] = True
+        estado['animacion'].mostrar(estado['cuadro'])
+        self.gestor_figuras.blit(clave)
+
+        transcurrido = time.perf_counter() - t0
+        estado['cuadro'] += 1 + int(transcurrido // periodo)
+        espera = max(1, int((periodo - transcurrido % periodo) * 1000))
+        self.root.after(espera, self._avanzar_time_lapse)
+
+    def exportar_time_lapse_termico(self):
+        """Exporta el time-lapse del campo térmico a MP4 o GIF en segundo plano."""
         if not self.analizador:
             messagebox.showwarning("Advertencia", "Cargue datos primero")
             return
+        ruta = filedialog.asksaveasfilename(
+            defaultextension=".gif",
+            filetypes=[("GIF animado (*.gif)", "*.gif"), ("Video MP4 (*.mp4)", "*.mp4")]
+        )
+        if not ruta:
+            return
+        # Los cuadros se calculan aquí: el hilo sólo recibe arreglos de sólo
+        # lectura y no toca el análisis, que puede recortarse entretanto
+        try:
+            cuadros = self.analizador.cuadros_campo_termico()
+        except Exception as e:
+            messagebox.showerror("Error", f"Error al preparar el time-lapse: {str(e)}")
+            return
+        fps = self._fps_time_lapse()
+        self.actualizar_estado("Exportando time-lapse...")
+        resultado = {}
+
+        def exportar():
+            try:
+                AnimacionCampoTermico.exportar(cuadros, ruta, fps=fps)
+            except Exception as e:
+                resultado['error'] = e
+
+        hilo = threading.Thread(target=exportar, daemon=True)
+        hilo.start()
 
-        fig = plt.figure(figsize=(15, 10))
+        def terminar():
+            if hilo.is_alive():
+                self.root.after(100, terminar)
+                return
+            if 'error' in resultado:
+                messagebox.showerror("Error", f"Error al exportar el time-lapse: {resultado['error']}")
+                self.actualizar_estado("Error al exportar el time-lapse")
+            else:
+                self.actualizar_estado(f"Time-lapse guardado en {os.path.basename(ruta)}")
+
+        self.root.after(100, terminar)
+
+    def visualizar_comparacion_diurna_nocturna(self):
+        self.mostrar_figura('diurno_nocturno', "Análisis Diurno vs Nocturno",
+                            self.dibujar_comparacion_diurna_nocturna)
+
+    def dibujar_comparacion_diurna_nocturna(self, fig):
+        """Dibuja la comparación diurna/nocturna en la figura dada."""
+        fig.clear()
         gs = plt.GridSpec(2, 2)
 
         # Temperatura promedio por hora
         ax1 = fig.add_subplot(gs[0, :])
-        datos_hora = self.analizador.datos.groupby('Hora')['Temp_interna_invernadero'].agg(['mean', 'std'])
+        por_hora = self.analizador.cubo().agregar('Temp_interna_invernadero', por='hora')
+        hay_datos = por_hora['count'] > 0
+        datos_hora = pd.DataFrame({'mean': por_hora['mean'][hay_datos], 'std': por_hora['std'][hay_datos]},
+                                  index=por_hora['indice'][hay_datos])
         ax1.plot(datos_hora.index, datos_hora['mean'], 'b-')
         ax1.fill_between(datos_hora.index, 
                         datos_hora['mean'] - datos_hora['std'],
@@ -1331,125 +4692,139 @@ class InterfazGraficaMejorada:
 
         # Boxplot comparativo día/noche
         ax2 = fig.add_subplot(gs[1, 0])
-        sns.boxplot(data=self.analizador.datos, x='Periodo', y='Temp_interna_invernadero', ax=ax2)
+        self.analizador.dibujar_cajas(ax2, [self.analizador.estadisticas_caja('Temp_interna_invernadero', periodo)
+                                            for periodo in ['Día', 'Noche']])
+        ax2.set_xlabel('Periodo')
         ax2.set_title('Distribución de Temperaturas Día vs Noche')
         ax2.set_ylabel('Temperatura (°C)')
 
         # Humedad relativa día vs noche
         ax3 = fig.add_subplot(gs[1, 1])
-        sns.boxplot(data=self.analizador.datos, x='Periodo', y='Hum_interna_invernadero', ax=ax3)
+        self.analizador.dibujar_cajas(ax3, [self.analizador.estadisticas_caja('Hum_interna_invernadero', periodo)
+                                            for periodo in ['Día', 'Noche']])
+        ax3.set_xlabel('Periodo')
         ax3.set_title('Distribución de Humedad Día vs Noche')
         ax3.set_ylabel('Humedad Relativa (%)')
 
-        plt.tight_layout()
-        plt.show()
+        fig.tight_layout()
+        return fig
 
     def visualizar_analisis_psicrometrico(self):
-        if not self.analizador:
-            messagebox.showwarning("Advertencia", "Cargue datos primero")
-            return
+        self.mostrar_figura('analisis_psicrometrico', "Análisis Psicrométrico",
+                            self.dibujar_analisis_psicrometrico)
 
-        fig = plt.figure(figsize=(15, 10))
+    def dibujar_analisis_psicrometrico(self, fig):
+        """Dibuja el análisis psicrométrico en la figura dada."""
+        fig.clear()
         gs = plt.GridSpec(2, 2)
 
         # Diagrama de dispersión Temperatura vs Humedad
         ax1 = fig.add_subplot(gs[0, :])
-        scatter = ax1.scatter(self.analizador.datos['Temp_interna_invernadero'],
-                            self.analizador.datos['Hum_interna_invernadero'],
-                            c=self.analizador.datos['h (kJ/kg_AS)'],
-                            cmap='viridis')
-        plt.colorbar(scatter, ax=ax1, label='Entalpía (kJ/kg_AS)')
+        if len(self.analizador.datos) > self.analizador.UMBRAL_DENSIDAD:
+            # Densidad con la entalpía media por celda en lugar de un marcador por fila
+            densidad = self.analizador.densidad('Temp_interna_invernadero', 'Hum_interna_invernadero',
+                                                estadistica='h (kJ/kg_AS)')
+            self.analizador.dibujar_densidad(fig, ax1, densidad, etiqueta='Entalpía media (kJ/kg_AS)')
+        else:
+            scatter = ax1.scatter(self.analizador.datos['Temp_interna_invernadero'],
+                                self.analizador.datos['Hum_interna_invernadero'],
+                                c=self.analizador.datos['h (kJ/kg_AS)'],
+                                cmap='viridis')
+            fig.colorbar(scatter, ax=ax1, label='Entalpía (kJ/kg_AS)')
         ax1.set_xlabel('Temperatura (°C)')
         ax1.set_ylabel('Humedad Relativa (%)')
         ax1.set_title('Diagrama Psicrométrico')
 
         # Histograma 2D
         ax2 = fig.add_subplot(gs[1, 0])
-        plt.hist2d(self.analizador.datos['Temp_interna_invernadero'],
-                  self.analizador.datos['Hum_interna_invernadero'],
-                  bins=30, cmap='viridis')
+        densidad = self.analizador.densidad('Temp_interna_invernadero', 'Hum_interna_invernadero',
+                                            bins=(30, 30))
+        ax2.pcolormesh(densidad['x_bordes'], densidad['y_bordes'], densidad['cuentas'].T, cmap='viridis')
         ax2.set_xlabel('Temperatura (°C)')
         ax2.set_ylabel('Humedad Relativa (%)')
         ax2.set_title('Distribución de Condiciones')
 
         # Serie temporal de punto de rocío
         ax3 = fig.add_subplot(gs[1, 1])
-        ax3.plot(self.analizador.datos['Fecha_Hora'],
-                self.analizador.datos['Tpr (°C)'],
-                'b-', label='Punto de Rocío')
-        ax3.plot(self.analizador.datos['Fecha_Hora'],
-                self.analizador.datos['Temp_interna_invernadero'],
-                'r-', label='Temperatura')
+        ReductorLineas.graficar(ax3, self.analizador.datos['Fecha_Hora'],
+                                self.analizador.datos['Tpr (°C)'],
+                                'b-', label='Punto de Rocío')
+        ReductorLineas.graficar(ax3, self.analizador.datos['Fecha_Hora'],
+                                self.analizador.datos['Temp_interna_invernadero'],
+                                'r-', label='Temperatura')
         ax3.set_xlabel('Fecha/Hora')
         ax3.set_ylabel('Temperatura (°C)')
         ax3.set_title('Temperatura vs Punto de Rocío')
         ax3.legend()
 
-        plt.tight_layout()
-        plt.show()
+        fig.tight_layout()
+        return fig
 
     def visualizar_tendencias_pronosticos(self):
         """Genera y muestra las tendencias y pronósticos en una ventana separada."""
-        if not self.analizador:
-            messagebox.showwarning("Advertencia", "Cargue datos primero")
-            return
-            
-        try:
-            # Crear una nueva ventana
-            ventana = tk.Toplevel(self.root)
-            ventana.title("Tendencias y Pronósticos")
-            ventana.geometry("800x600")
-            
-            # Calcular tendencias usando medias móviles
-            ventana_media = 24  # 24 puntos para media móvil
-            datos = self.analizador.datos.copy()
-            datos['MM_Temp'] = datos['Temp_interna_invernadero'].rolling(window=ventana_media).mean()
-            datos['MM_Hum'] = datos['Hum_interna_invernadero'].rolling(window=ventana_media).mean()
-
-            # Crear figura
-            fig = plt.figure(figsize=(15, 10))
-            gs = plt.GridSpec(2, 1)
-
-            # Temperatura y tendencia
-            ax1 = fig.add_subplot(gs[0])
-            ax1.plot(datos['Fecha_Hora'], datos['Temp_interna_invernadero'],
-                    'b-', alpha=0.5, label='Temperatura Real')
-            ax1.plot(datos['Fecha_Hora'], datos['MM_Temp'],
-                    'r-', label='Tendencia (Media Móvil)')
-            ax1.set_title('Tendencia de Temperatura')
-            ax1.set_xlabel('Fecha/Hora')
-            ax1.set_ylabel('Temperatura (°C)')
-            ax1.legend()
-
-            # Humedad y tendencia
-            ax2 = fig.add_subplot(gs[1])
-            ax2.plot(datos['Fecha_Hora'], datos['Hum_interna_invernadero'],
-                    'g-', alpha=0.5, label='Humedad Real')
-            ax2.plot(datos['Fecha_Hora'], datos['MM_Hum'],
-                    'r-', label='Tendencia (Media Móvil)')
-            ax2.set_title('Tendencia de Humedad')
-            ax2.set_xlabel('Fecha/Hora')
-            ax2.set_ylabel('Humedad Relativa (%)')
-            ax2.legend()
+        self.mostrar_figura('tendencias', "Tendencias y Pronósticos",
+                            self.dibujar_tendencias_pronosticos)
 
-            plt.tight_layout()
-            
-            # Embeber el gráfico en la ventana
-            from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
-            canvas = FigureCanvasTkAgg(fig, master=ventana)
-            canvas.draw()
-            canvas.get_tk_widget().pack(fill='both', expand=True)
-            
-            # Agregar barra de herramientas de navegación
-            from matplotlib.backends.backend_tkagg import NavigationToolbar2Tk
-            toolbar = NavigationToolbar2Tk(canvas, ventana)
-            toolbar.update()
-            
-            self.actualizar_estado("Tendencias y pronósticos generados")
-            
-        except Exception as e:
-            messagebox.showerror("Error", f"Error al generar tendencias y pronósticos: {str(e)}")
-            self.actualizar_estado("Error al generar tendencias y pronósticos")
+    def dibujar_tendencias_pronosticos(self, fig):
+        """Dibuja las tendencias (medias móviles) y los pronósticos a 24 h en la figura dada."""
+        fig.clear()
+        
+        # Tendencias: medias móviles del motor compartido (sin copiar los datos)
+        datos = self.analizador.datos
+        motor = self.analizador.estadisticas_moviles()
+
+        gs = plt.GridSpec(2, 3)
+
+        # Temperatura y tendencia
+        ax1 = fig.add_subplot(gs[0, :2])
+        ReductorLineas.graficar(ax1, datos['Fecha_Hora'], datos['Temp_interna_invernadero'],
+                                'b-', alpha=0.5, label='Temperatura Real')
+        ReductorLineas.graficar(ax1, motor.tiempos, motor.serie('Temp_interna_invernadero', 'media'),
+                                'r-', label='Tendencia (Media Móvil)')
+        ax1.set_title('Tendencia de Temperatura')
+        ax1.set_xlabel('Fecha/Hora')
+        ax1.set_ylabel('Temperatura (°C)')
+        ax1.legend()
+
+        # Humedad y tendencia
+        ax2 = fig.add_subplot(gs[1, :2])
+        ReductorLineas.graficar(ax2, datos['Fecha_Hora'], datos['Hum_interna_invernadero'],
+                                'g-', alpha=0.5, label='Humedad Real')
+        ReductorLineas.graficar(ax2, motor.tiempos, motor.serie('Hum_interna_invernadero', 'media'),
+                                'r-', label='Tendencia (Media Móvil)')
+        ax2.set_title('Tendencia de Humedad')
+        ax2.set_xlabel('Fecha/Hora')
+        ax2.set_ylabel('Humedad Relativa (%)')
+        ax2.legend()
+
+        # Pronósticos a 24 h junto a las últimas 72 h de la serie horaria
+        pronosticador = self.analizador.pronosticador()
+        for fila, (variable, titulo, unidad) in enumerate([
+                ('Temp_interna_invernadero', 'Pronóstico de Temperatura', 'Temperatura (°C)'),
+                ('Hum_interna_invernadero', 'Pronóstico de Humedad', 'Humedad Relativa (%)')]):
+            ax = fig.add_subplot(gs[fila, 2])
+            if variable in pronosticador.series:
+                ax.plot(pd.to_datetime(pronosticador.tiempos[-72:]), pronosticador.series[variable][-72:],
+                        'k-', alpha=0.6, label='Observado (1 h)')
+            for modelo, color, etiqueta in [('estacional', 'r', 'Holt-Winters diario'),
+                                            ('regresion', 'm', 'Regresión exterior')]:
+                try:
+                    pronostico = pronosticador.pronosticar(variable, modelo)
+                except ValueError:
+                    continue
+                ax.plot(pronostico.index, pronostico['prediccion'], f'{color}-', label=etiqueta)
+                ax.fill_between(pronostico.index, pronostico['inferior'], pronostico['superior'],
+                                color=color, alpha=0.15)
+            if not ax.lines:
+                ax.text(0.5, 0.5, 'Datos insuficientes', ha='center', va='center', transform=ax.transAxes)
+            ax.set_title(titulo)
+            ax.set_ylabel(unidad)
+            ax.tick_params(axis='x', rotation=30)
+            if ax.lines:
+                ax.legend(fontsize=8)
+
+        fig.tight_layout()
+        return fig
         
     def actualizar_estado(self, mensaje):
         """Actualiza el mensaje de estado en la interfaz."""
@@ -1457,117 +4832,356 @@ class InterfazGraficaMejorada:
 
     def visualizar_carta_psicrometrica(self):
         """Genera y muestra la carta psicrométrica en una ventana separada."""
-        if not self.analizador:
-            messagebox.showwarning("Advertencia", "Cargue datos primero")
-            return
-            
-        try:
-            # Crear una nueva ventana
-            ventana = tk.Toplevel(self.root)
-            ventana.title("Carta Psicrométrica")
-            ventana.geometry("800x600")
-            
-            # Crear el gráfico
-            fig = self.analizador.visualizar_carta_psicrometrica()
-            
-            # Embeber el gráfico en la ventana
-            from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
-            canvas = FigureCanvasTkAgg(fig, master=ventana)
-            canvas.draw()
-            canvas.get_tk_widget().pack(fill='both', expand=True)
-            
-            # Agregar barra de herramientas de navegación
-            from matplotlib.backends.backend_tkagg import NavigationToolbar2Tk
-            toolbar = NavigationToolbar2Tk(canvas, ventana)
-            toolbar.update()
-            
-            self.actualizar_estado("Carta psicrométrica generada")
-            
-        except Exception as e:
-            messagebox.showerror("Error", f"Error al generar la carta psicrométrica: {str(e)}")
-            self.actualizar_estado("Error al generar carta psicrométrica")
+        self.mostrar_figura('carta_psicrometrica', "Carta Psicrométrica",
+                            lambda fig: self.analizador.visualizar_carta_psicrometrica(fig))
+
+    def visualizar_distribucion_espacial(self):
+        """Genera y muestra la distribución espacial en una ventana separada."""
+        self.mostrar_figura('distribucion_espacial', "Distribución Espacial de Temperaturas",
+                            lambda fig: self.analizador.visualizar_distribucion_espacial(fig),
+                            figsize=(12, 8))
+
+class AnalisisInvernadero:
+    # A partir de este número de filas los diagramas de dispersión se dibujan
+    # como una capa de densidad por celdas
+    UMBRAL_DENSIDAD = 100_000
+
+    def __init__(self, datos, calculadora=None, fondos_carta=None, sol=None):
+        self.datos = datos.copy()
+        self.calculadora = calculadora
+        # Los fondos de la carta psicrométrica no dependen de los datos: la
+        # interfaz comparte su caché entre cargas
+        if fondos_carta is None and calculadora is not None:
+            fondos_carta = FondoCartaPsicrometrica(calculadora, factor_presion=1000, escala_W=1000)
+        self.fondos_carta = fondos_carta
+        # Posición solar de la estación, con sus efemérides memorizadas por día
+        self.sol = sol if sol is not None else PosicionSolar()
+        self.version = next(_versiones_datos)
+        self._densidades = {}
+        self._cuadros_termicos = {}
+        self._cajas = {}
+        self._piramide = None
+        self._cubo = None
+        self._estadisticas_moviles = None
+        self._pronosticador = None
+        self._condensacion = {}
+        self._horas_dpv = {}
+        self._simulacion = None
+        self._cargas_ventilacion = {}
+        # Motor de alarmas que evalúa las filas anexadas en vivo (opcional)
+        self.alarmas = None
+        self.setup_data()
+        self.setup_plotting_style()
+
+    def recortar(self, i0, i1, conservar=False):
+        """
+        Borra (o conserva solamente) las filas [i0, i1) de los datos del análisis.
+
+        Las columnas derivadas (Hora, Periodo, índices de estrés) son por fila, así
+        que basta con recortarlas; no se vuelve a ejecutar setup_data. Los
+        agregados (cubo, pirámide) se rehacen al pedirlos con la nueva versión.
+
+        Args:
+            i0 (int): Primera posición del rango
+            i1 (int): Posición siguiente a la última del rango
+            conservar (bool): Si es True se conserva el rango y se borra el resto
+        """
+        if conservar:
+            self.datos = self.datos.iloc[i0:i1].reset_index(drop=True)
+        else:
+            self.datos = pd.concat(
+                [self.datos.iloc[:i0], self.datos.iloc[i1:]], ignore_index=True
+            )
+        self.version = next(_versiones_datos)
+
+    def anexar(self, filas):
+        """
+        Agrega lecturas nuevas al final de los datos (ingesta en vivo).
+
+        Las columnas derivadas se calculan sólo para las filas nuevas: las
+        propiedades psicrométricas (si los datos las tienen y las filas no, con
+        la misma presión), el tiempo, la posición solar y el estrés. El motor de
+        estadísticas móviles avanza con ellas en lugar de rehacerse; los demás
+        cachés se invalidan con la nueva versión. Si hay un motor de alarmas
+        (self.alarmas), las filas nuevas pasan por sus reglas.
+
+        Args:
+            filas (pd.DataFrame o dict): Lecturas nuevas, posteriores a las existentes
+        """
+        filas = pd.DataFrame(filas)
+        if ('h (kJ/kg_AS)' in self.datos.columns and 'h (kJ/kg_AS)' not in filas.columns
+                and self.calculadora is not None):
+            self.calculadora.agregar_propiedades(filas, self.presion_atmosferica())
+        self.derivar_columnas(filas)
+        motor = self.estadisticas_moviles()
+        self.datos = pd.concat([self.datos, filas], ignore_index=True)
+        self.version = next(_versiones_datos)
+        motor.extender(filas['Fecha_Hora'], filas)
+        self._estadisticas_moviles = (self.version, motor)
+        if self.alarmas is not None:
+            self.alarmas.procesar_bloque(filas)
+
+    def densidad(self, x, y, estadistica=None, bins=(200, 150), escala_y=1.0):
+        """
+        Agrupa dos columnas en una rejilla 2-D, con caché por versión de datos.
+
+        El agrupamiento es vectorizado (índice de celda + np.bincount), así que
+        cuesta lo mismo que una pasada sobre los datos.
+
+        Args:
+            x (str): Columna para el eje x
+            y (str): Columna para el eje y
+            estadistica (str): None para sólo conteos, 'hora_del_dia' para la hora
+                media (circular) de cada celda, o el nombre de una columna para
+                su media por celda
+            bins (tuple): Número de celdas en x e y
+            escala_y (float): Factor aplicado a y (p. ej. 1000 para W en g/kg)
+
+        Returns:
+            dict: 'x_bordes', 'y_bordes', 'cuentas' (nx, ny) y 'valores' (nx, ny)
+                  con la estadística por celda (NaN en celdas vacías) o None; sin
+                  filas válidas la rejilla queda vacía sobre [0, 1] × [0, 1]
+        """
+        clave = (self.version, x, y, estadistica, tuple(bins), escala_y)
+        if clave in self._densidades:
+            return self._densidades[clave]
+        # Las entradas de versiones anteriores ya no sirven
+        self._densidades = {k: v for k, v in self._densidades.items() if k[0] == self.version}
+
+        vx = self.datos[x].to_numpy(dtype=float)
+        vy = self.datos[y].to_numpy(dtype=float) * escala_y
+        validos = np.isfinite(vx) & np.isfinite(vy)
+        nx, ny = bins
+        if validos.any():
+            x_bordes = np.linspace(np.min(vx[validos]), np.max(vx[validos]), nx + 1)
+            y_bordes = np.linspace(np.min(vy[validos]), np.max(vy[validos]), ny + 1)
+        else:
+            # Datos recortados a cero filas o columnas sin valores: rejilla vacía
+            x_bordes = np.linspace(0, 1, nx + 1)
+            y_bordes = np.linspace(0, 1, ny + 1)
+        ix = np.clip(np.searchsorted(x_bordes, vx[validos], side='right') - 1, 0, nx - 1)
+        iy = np.clip(np.searchsorted(y_bordes, vy[validos], side='right') - 1, 0, ny - 1)
+        celda = ix * ny + iy
+        cuentas = np.bincount(celda, minlength=nx * ny)
+
+        valores = None
+        with np.errstate(invalid='ignore', divide='ignore'):
+            if estadistica == 'hora_del_dia':
+                fechas = self.datos['Fecha_Hora'][validos]
+                horas = (fechas.dt.hour + fechas.dt.minute / 60 + fechas.dt.second / 3600).to_numpy(dtype=float)
+                # Las filas sin fecha (NaT) cuentan en la densidad pero no en la hora
+                con_fecha = np.isfinite(horas)
+                angulo = horas[con_fecha] / 24 * 2 * np.pi
+                seno = np.bincount(celda[con_fecha], weights=np.sin(angulo), minlength=nx * ny)
+                coseno = np.bincount(celda[con_fecha], weights=np.cos(angulo), minlength=nx * ny)
+                n = np.bincount(celda[con_fecha], minlength=nx * ny)
+                valores = np.where(n > 0, np.mod(np.arctan2(seno, coseno) / (2 * np.pi) * 24, 24), np.nan)
+            elif estadistica is not None:
+                v = self.datos[estadistica].to_numpy(dtype=float)[validos]
+                finitos = np.isfinite(v)
+                suma = np.bincount(celda[finitos], weights=v[finitos], minlength=nx * ny)
+                n = np.bincount(celda[finitos], minlength=nx * ny)
+                valores = suma / n
+            if valores is not None:
+                valores = np.where(cuentas > 0, valores, np.nan).reshape(nx, ny)
+
+        resultado = {
+            'x_bordes': x_bordes,
+            'y_bordes': y_bordes,
+            'cuentas': cuentas.reshape(nx, ny),
+            'valores': valores,
+        }
+        self._densidades[clave] = resultado
+        return resultado
+
+    def dibujar_densidad(self, fig, ax, densidad, etiqueta=None, cmap='viridis', zorder=3):
+        """
+        Dibuja una rejilla de densidad con su barra de color.
+
+        Args:
+            fig (Figure): Figura que contiene los ejes
+            ax (Axes): Ejes donde dibujar
+            densidad (dict): Resultado de self.densidad
+            etiqueta (str): Etiqueta de la estadística (None para conteos)
+            cmap (str): Mapa de colores
+            zorder (float): Orden de dibujo (sobre el fondo de la carta)
+
+        Returns:
+            QuadMesh: Capa dibujada
+        """
+        cuentas = densidad['cuentas'].T
+        if densidad['valores'] is None:
+            malla = ax.pcolormesh(densidad['x_bordes'], densidad['y_bordes'],
+                                  np.ma.masked_equal(cuentas, 0), cmap=cmap,
+                                  norm=LogNorm(vmin=1, vmax=max(cuentas.max(), 1)), zorder=zorder)
+            fig.colorbar(malla, ax=ax, label='Registros por celda')
+        else:
+            malla = ax.pcolormesh(densidad['x_bordes'], densidad['y_bordes'],
+                                  np.ma.masked_invalid(densidad['valores'].T), cmap=cmap, zorder=zorder)
+            fig.colorbar(malla, ax=ax, label=etiqueta)
+        return malla
+
+    def _preparar_figura(self, fig, figsize):
+        """
+        Devuelve la figura donde dibujar un análisis.
+
+        Args:
+            fig (Figure): Figura existente a reutilizar (se limpia) o None
+            figsize (tuple): Tamaño de la figura nueva si fig es None
+
+        Returns:
+            Figure: Figura lista para dibujar
+        """
+        if fig is None:
+            return plt.figure(figsize=figsize)
+        fig.clear()
+        return fig
+
+    # Número máximo de valores atípicos que se dibujan por caja
+    MAX_ATIPICOS = 1000
+
+    @classmethod
+    def calcular_estadisticas_caja(cls, valores):
+        """
+        Estadísticos de un diagrama de caja sin ordenar los valores.
+
+        Los cuartiles se obtienen con np.partition (selección, O(n)) y coinciden
+        con los de Axes.boxplot: percentiles con interpolación lineal y bigotes
+        hasta el último valor dentro de 1.5 veces el rango intercuartílico.
+        Si hay más de MAX_ATIPICOS valores atípicos se conserva una muestra
+        fija que incluye el mínimo y el máximo.
+
+        Args:
+            valores (array): Valores de la caja (se ignoran los NaN)
+
+        Returns:
+            dict: Estadísticos en el formato de Axes.bxp
+        """
+        x = np.asarray(valores, dtype=float)
+        x = x[~np.isnan(x)]
+        if not len(x):
+            return {'med': np.nan, 'q1': np.nan, 'q3': np.nan, 'whislo': np.nan,
+                    'whishi': np.nan, 'mean': np.nan, 'iqr': np.nan, 'fliers': np.array([])}
+
+        posiciones = np.array([0.25, 0.5, 0.75]) * (len(x) - 1)
+        bajos = np.floor(posiciones).astype(int)
+        altos = np.ceil(posiciones).astype(int)
+        parcial = np.partition(x, np.unique(np.r_[bajos, altos]))
+        q1, med, q3 = parcial[bajos] + (posiciones - bajos) * (parcial[altos] - parcial[bajos])
+        iqr = q3 - q1
+
+        dentro = x[(x >= q1 - 1.5 * iqr) & (x <= q3 + 1.5 * iqr)]
+        whislo = min(dentro.min(), q1) if len(dentro) else q1
+        whishi = max(dentro.max(), q3) if len(dentro) else q3
+        atipicos = x[(x < whislo) | (x > whishi)]
+        if len(atipicos) > cls.MAX_ATIPICOS:
+            muestra = np.random.default_rng(0).choice(len(atipicos), cls.MAX_ATIPICOS - 2, replace=False)
+            atipicos = np.r_[atipicos.min(), atipicos[muestra], atipicos.max()]
+        return {'med': med, 'q1': q1, 'q3': q3, 'whislo': whislo, 'whishi': whishi,
+                'mean': x.mean(), 'iqr': iqr, 'fliers': atipicos}
+
+    def estadisticas_caja(self, columna, periodo=None, etiqueta=None):
+        """
+        Estadísticos de caja de una columna, con caché por versión de los datos.
+
+        Args:
+            columna (str): Columna de los datos
+            periodo (str): 'Día' o 'Noche' para limitarse a ese período
+            etiqueta (str): Etiqueta de la caja (por defecto, el período o la columna)
+
+        Returns:
+            dict: Estadísticos en el formato de Axes.bxp
+        """
+        clave = (self.version, columna, periodo)
+        if clave not in self._cajas:
+            self._cajas = {k: v for k, v in self._cajas.items() if k[0] == self.version}
+            valores = self.datos[columna]
+            if periodo is not None:
+                valores = valores[self.datos['Periodo'] == periodo]
+            self._cajas[clave] = self.calcular_estadisticas_caja(valores.to_numpy(dtype=float))
+        return dict(self._cajas[clave], label=etiqueta or periodo or columna)
+
+    @staticmethod
+    def dibujar_cajas(ax, estadisticas):
+        """
+        Dibuja diagramas de caja precalculados con Axes.bxp.
+
+        Args:
+            ax (Axes): Ejes donde dibujar
+            estadisticas (list): Estadísticos de cada caja (estadisticas_caja)
+
+        Returns:
+            dict: Artistas creados por Axes.bxp
+        """
+        artistas = ax.bxp(estadisticas, patch_artist=True,
+                          medianprops={'color': 'black'},
+                          flierprops={'marker': 'd', 'markersize': 4})
+        colores = plt.rcParams['axes.prop_cycle'].by_key()['color']
+        for caja, color in zip(artistas['boxes'], itertools.cycle(colores)):
+            caja.set_facecolor(color)
+        return artistas
 
-    def visualizar_distribucion_espacial(self):
-        """Genera y muestra la distribución espacial en una ventana separada."""
-        if not self.analizador:
-            messagebox.showwarning("Advertencia", "Cargue datos primero")
-            return
-            
-        try:
-            # Crear una nueva ventana
-            ventana = tk.Toplevel(self.root)
-            ventana.title("Distribución Espacial de Temperaturas")
-            ventana.geometry("800x600")
-            
-            # Crear el gráfico
-            fig = self.analizador.visualizar_distribucion_espacial()
-            
-            # Embeber el gráfico en la ventana
-            from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
-            canvas = FigureCanvasTkAgg(fig, master=ventana)
-            canvas.draw()
-            canvas.get_tk_widget().pack(fill='both', expand=True)
-            
-            # Agregar barra de herramientas de navegación
-            from matplotlib.backends.backend_tkagg import NavigationToolbar2Tk
-            toolbar = NavigationToolbar2Tk(canvas, ventana)
-            toolbar.update()
-            
-            self.actualizar_estado("Distribución espacial generada")
-            
-        except Exception as e:
-            messagebox.showerror("Error", f"Error al generar la distribución espacial: {str(e)}")
-            self.actualizar_estado("Error al generar distribución espacial")
+    def actualizar_lineas(self, fig):
+        """
+        Actualiza en sitio las líneas de una figura ligadas a columnas de los datos.
 
-class AnalisisInvernadero:
-    def __init__(self, datos, calculadora=None):
-        self.datos = datos.copy()
-        self.calculadora = calculadora
-        self.setup_data()
-        self.setup_plotting_style()
+        Las líneas cuyo gid es el nombre de una columna reciben los valores
+        actuales sin reconstruir la figura.
 
-    def visualizar_carta_psicrometrica(self):
+        Args:
+            fig (Figure): Figura generada por un método de este analizador
+        """
+        for ax in fig.axes:
+            for linea in ax.get_lines():
+                columna = linea.get_gid()
+                if columna in self.datos.columns:
+                    if not ReductorLineas.actualizar(linea, self.datos['Fecha_Hora'], self.datos[columna]):
+                        linea.set_data(self.datos['Fecha_Hora'], self.datos[columna])
+            ax.relim()
+            ax.autoscale_view()
+            if ReductorLineas.de(ax) is not None:
+                ReductorLineas.de(ax).recalcular()
+
+    def visualizar_carta_psicrometrica(self, fig=None):
         """Genera una carta psicrométrica."""
-        fig = plt.figure(figsize=(15, 10))
-        
-        # Crear malla de temperaturas y humedades relativas
-        T = np.linspace(0, 50, 100)
-        HR = np.array([10, 20, 30, 40, 50, 60, 70, 80, 90, 100])
+        fig = self._preparar_figura(fig, (15, 10))
+        ax = fig.add_subplot(111)
         
         # Calcular la presión atmosférica a 2240 msnm
         p_atm = self.calculadora.calcular_presion(2240)
         
-        # Líneas de humedad relativa constante
-        for hr in HR:
-            w = []
-            for t in T:
-                try:
-                    props = self.calculadora.calcular_propiedades_desde_Tbs_Hr(t, hr, p_atm)
-                    w.append(props['W (kg_vp/kg_AS)'] * 1000)  # Convertir a g/kg
-                except ValueError:
-                    w.append(np.nan)
-            plt.plot(T, w, 'k--', alpha=0.3, label=f'HR {hr}%' if hr % 20 == 0 else "")
+        # Fondo de la carta desde el caché, con el rango de los datos; sólo los datos se dibujan cada vez
+        W_datos = self.datos['W (kg_vp/kg_AS)'] * 1000  # Convertir a g/kg
+        T_rango, W_rango = self.fondos_carta.rango_ejes(self.datos['Temp_interna_invernadero'], W_datos)
+        self.fondos_carta.dibujar(ax, p_atm, T_rango, W_rango)
         
         # Datos del invernadero
-        scatter = plt.scatter(self.datos['Temp_interna_invernadero'],
-                             self.datos['W (kg_vp/kg_AS)'] * 1000,  # Convertir a g/kg
-                             c=mdates.date2num(self.datos['Fecha_Hora']),
-                             cmap='viridis',
-                             alpha=0.6)
+        if len(self.datos) > self.UMBRAL_DENSIDAD:
+            # Demasiados puntos para marcadores: densidad con la hora media por celda
+            densidad = self.densidad('Temp_interna_invernadero', 'W (kg_vp/kg_AS)',
+                                     estadistica='hora_del_dia', escala_y=1000)
+            self.dibujar_densidad(fig, ax, densidad, etiqueta='Hora del día media', cmap='twilight')
+        else:
+            scatter = ax.scatter(self.datos['Temp_interna_invernadero'],
+                                 W_datos,
+                                 c=mdates.date2num(self.datos['Fecha_Hora']),
+                                 cmap='viridis',
+                                 alpha=0.6,
+                                 zorder=3)
+            fig.colorbar(scatter, ax=ax, label='Tiempo')
         
         # Configuración del gráfico
-        plt.colorbar(scatter, label='Tiempo')
-        plt.xlabel('Temperatura de Bulbo Seco (°C)')
-        plt.ylabel('Humedad Absoluta (g/kg)')
-        plt.title('Carta Psicrométrica con Datos del Invernadero')
-        plt.grid(True, alpha=0.3)
-        plt.legend()
+        ax.set_xlabel('Temperatura de Bulbo Seco (°C)')
+        ax.set_ylabel('Humedad Absoluta (g/kg)')
+        ax.set_title('Carta Psicrométrica con Datos del Invernadero')
+        ax.grid(True, alpha=0.3)
+        ax.legend()
         
         return fig
 
-    def visualizar_distribucion_espacial(self):
+    def visualizar_distribucion_espacial(self, fig=None):
         """Genera una visualización 3D de la distribución espacial de temperaturas."""
-        fig = plt.figure(figsize=(12, 8))
+        fig = self._preparar_figura(fig, (12, 8))
         ax = fig.add_subplot(111, projection='3d')
         
         # Definir puntos de medición
@@ -1582,7 +5196,8 @@ class AnalisisInvernadero:
         }
         
         # Obtener temperaturas promedio
-        temps_promedio = {sensor: self.datos[sensor].mean() for sensor in puntos.keys()}
+        cubo = self.cubo()
+        temps_promedio = {sensor: cubo.agregar(sensor)['mean'] for sensor in puntos.keys()}
         
         # Crear arrays para la visualización
         x = [coord[0] for coord in puntos.values()]
@@ -1603,7 +5218,7 @@ class AnalisisInvernadero:
             ax.text(x, y, z, label, fontsize=8)
         
         # Configuración del gráfico
-        plt.colorbar(scatter, label='Temperatura (°C)')
+        fig.colorbar(scatter, ax=ax, label='Temperatura (°C)')
         ax.set_xlabel('X (m)')
         ax.set_ylabel('Y (m)')
         ax.set_zlabel('Altura (m)')
@@ -1618,16 +5233,31 @@ class AnalisisInvernadero:
 
     def setup_data(self):
         """Prepara los datos para el análisis."""
-        if not pd.api.types.is_datetime64_any_dtype(self.datos['Fecha_Hora']):
-            self.datos['Fecha_Hora'] = pd.to_datetime(self.datos['Fecha_Hora'])
+        self.derivar_columnas(self.datos)
+
+        # Agregados compartidos por los análisis (una sola pasada por los datos)
+        self.cubo()
+
+    def derivar_columnas(self, datos):
+        """
+        Agrega a un DataFrame las columnas de tiempo, la geometría solar
+        (Elevacion_solar, Salida_sol, Puesta_sol, Es_Dia) y los índices de estrés.
+
+        Args:
+            datos (pd.DataFrame): Datos con la columna Fecha_Hora (se modifican)
+        """
+        if not pd.api.types.is_datetime64_any_dtype(datos['Fecha_Hora']):
+            datos['Fecha_Hora'] = pd.to_datetime(datos['Fecha_Hora'])
         
         # Agregar columnas de tiempo
-        self.datos['Hora'] = self.datos['Fecha_Hora'].dt.hour
-        self.datos['Es_Dia'] = self.datos['Hora'].between(6, 18)
-        self.datos['Periodo'] = self.datos['Es_Dia'].map({True: 'Día', False: 'Noche'})
+        datos['Hora'] = datos['Fecha_Hora'].dt.hour
+        # Día y noche por la posición del sol en la estación, no por horas fijas
+        for col, valores in self.sol.calcular(datos['Fecha_Hora']).items():
+            datos[col] = valores
+        datos['Periodo'] = datos['Es_Dia'].map({True: 'Día', False: 'Noche'})
         
         # Calcular índices de estrés térmico
-        self.calcular_indices_estres()
+        self.calcular_indices_estres(datos)
 
     def setup_plotting_style(self):
         """Configura el estilo global de las visualizaciones."""
@@ -1639,43 +5269,40 @@ class AnalisisInvernadero:
         plt.rcParams['axes.labelsize'] = 12
         plt.rcParams['axes.titlesize'] = 14
 
-    def calcular_indices_estres(self):
+    # Temperatura óptima para tomates (°C)
+    TEMP_OPTIMA = 25
+
+    def calcular_indices_estres(self, datos=None):
         """Calcula índices de estrés térmico para las plantas."""
-        # Temperatura óptima para tomates
-        temp_optima = 25
+        datos = self.datos if datos is None else datos
+        temp_optima = self.TEMP_OPTIMA
         
         # Índice de estrés por calor
-        self.datos['Estres_Calor'] = np.where(
-            self.datos['Temp_interna_invernadero'] > temp_optima,
-            self.datos['Temp_interna_invernadero'] - temp_optima,
+        datos['Estres_Calor'] = np.where(
+            datos['Temp_interna_invernadero'] > temp_optima,
+            datos['Temp_interna_invernadero'] - temp_optima,
             0
         )
         
         # Índice de estrés por frío
-        self.datos['Estres_Frio'] = np.where(
-            self.datos['Temp_interna_invernadero'] < temp_optima,
-            temp_optima - self.datos['Temp_interna_invernadero'],
+        datos['Estres_Frio'] = np.where(
+            datos['Temp_interna_invernadero'] < temp_optima,
+            temp_optima - datos['Temp_interna_invernadero'],
             0
         )
 
-    def analizar_perfil_vertical(self):
+    def analizar_perfil_vertical(self, fig=None):
         """Análisis detallado del perfil vertical de temperatura."""
-        fig = plt.figure(figsize=(15, 10))
+        fig = self._preparar_figura(fig, (15, 10))
         gs = plt.GridSpec(2, 2)
         
         # Perfil promedio
         ax1 = fig.add_subplot(gs[0, 0])
         alturas = [1, 2, 3]
-        temps_dia = [
-            self.datos[self.datos['Es_Dia']]['S5_temp_1m_altura'].mean(),
-            self.datos[self.datos['Es_Dia']]['S6_temp_2m_altura'].mean(),
-            self.datos[self.datos['Es_Dia']]['S7_temp_3_altura'].mean()
-        ]
-        temps_noche = [
-            self.datos[~self.datos['Es_Dia']]['S5_temp_1m_altura'].mean(),
-            self.datos[~self.datos['Es_Dia']]['S6_temp_2m_altura'].mean(),
-            self.datos[~self.datos['Es_Dia']]['S7_temp_3_altura'].mean()
-        ]
+        cubo = self.cubo()
+        sensores = ['S5_temp_1m_altura', 'S6_temp_2m_altura', 'S7_temp_3_altura']
+        temps_dia = [cubo.agregar(sensor, periodo='Día')['mean'] for sensor in sensores]
+        temps_noche = [cubo.agregar(sensor, periodo='Noche')['mean'] for sensor in sensores]
         
         ax1.plot(temps_dia, alturas, 'o-', label='Día')
         ax1.plot(temps_noche, alturas, 'o-', label='Noche')
@@ -1698,28 +5325,25 @@ class AnalisisInvernadero:
         
         # Boxplot por altura y período
         ax3 = fig.add_subplot(gs[1, :])
-        data_to_plot = []
-        labels = []
-        sensores = ['S5_temp_1m_altura', 'S6_temp_2m_altura', 'S7_temp_3_altura']
+        cajas = []
         nombres = ['1m', '2m', '3m']  # Nombres corregidos para las etiquetas
         
         for sensor, nombre in zip(sensores, nombres):
             for periodo in ['Día', 'Noche']:
-                data = self.datos[self.datos['Periodo'] == periodo][sensor]
-                data_to_plot.append(data)
-                labels.append(f'{nombre} - {periodo}')
+                cajas.append(self.estadisticas_caja(sensor, periodo, f'{nombre} - {periodo}'))
         
-        ax3.boxplot(data_to_plot, labels=labels)
+        self.dibujar_cajas(ax3, cajas)
         ax3.set_title('Distribución de Temperaturas por Altura y Período')
         ax3.set_ylabel('Temperatura (°C)')
-        plt.xticks(rotation=45)
+        ax3.tick_params(axis='x', rotation=45)
         
-        plt.tight_layout()
+        fig.tight_layout()
         return fig
 
-    def analizar_temperaturas_planta(self):
+    def analizar_temperaturas_planta(self, fig=None):
         """Análisis de temperaturas en diferentes partes de la planta."""
-        fig = plt.figure(figsize=(15, 10))
+        import seaborn as sns
+        fig = self._preparar_figura(fig, (15, 10))
         gs = plt.GridSpec(2, 2)
         
         # Series temporales
@@ -1741,9 +5365,9 @@ class AnalisisInvernadero:
         
         # Boxplot comparativo
         ax2 = fig.add_subplot(gs[1, 0])
-        sns.boxplot(data=self.datos[list(partes_planta.keys())], ax=ax2)
-        ax2.set_xticklabels([partes_planta[col] for col in partes_planta.keys()],
-                           rotation=45)
+        self.dibujar_cajas(ax2, [self.estadisticas_caja(col, etiqueta=nombre)
+                                 for col, nombre in partes_planta.items()])
+        ax2.tick_params(axis='x', rotation=45)
         ax2.set_title('Distribución de Temperaturas')
         ax2.set_ylabel('Temperatura (°C)')
         
@@ -1755,12 +5379,12 @@ class AnalisisInvernadero:
                    yticklabels=[partes_planta[col] for col in partes_planta.keys()])
         ax3.set_title('Correlación entre Temperaturas')
         
-        plt.tight_layout()
+        fig.tight_layout()
         return fig
 
-    def analizar_condiciones_interno_externo(self):
+    def analizar_condiciones_interno_externo(self, fig=None):
         """Análisis de correlación entre condiciones internas y externas."""
-        fig = plt.figure(figsize=(15, 10))
+        fig = self._preparar_figura(fig, (15, 10))
         gs = plt.GridSpec(2, 2)
         
         # Scatter temperatura
@@ -1775,8 +5399,9 @@ class AnalisisInvernadero:
         z = np.polyfit(self.datos['Temp_externa_invernadero'],
                       self.datos['Temp_interna_invernadero'], 1)
         p = np.poly1d(z)
-        ax1.plot(self.datos['Temp_externa_invernadero'],
-                p(self.datos['Temp_externa_invernadero']), "r--",
+        # La recta de ajuste sólo necesita sus extremos
+        x_ajuste = np.array([self.datos['Temp_externa_invernadero'].min(), self.datos['Temp_externa_invernadero'].max()])
+        ax1.plot(x_ajuste, p(x_ajuste), "r--",
                 alpha=0.8, label=f'R² = {np.corrcoef(self.datos["Temp_externa_invernadero"], self.datos["Temp_interna_invernadero"])[0,1]**2:.3f}')
         ax1.legend()
         
@@ -1792,22 +5417,22 @@ class AnalisisInvernadero:
         z_hum = np.polyfit(self.datos['Hum_externa_invernadero'],
                           self.datos['Hum_interna_invernadero'], 1)
         p_hum = np.poly1d(z_hum)
-        ax2.plot(self.datos['Hum_externa_invernadero'],
-                p_hum(self.datos['Hum_externa_invernadero']), "r--",
+        x_ajuste = np.array([self.datos['Hum_externa_invernadero'].min(), self.datos['Hum_externa_invernadero'].max()])
+        ax2.plot(x_ajuste, p_hum(x_ajuste), "r--",
                 alpha=0.8, label=f'R² = {np.corrcoef(self.datos["Hum_externa_invernadero"], self.datos["Hum_interna_invernadero"])[0,1]**2:.3f}')
         ax2.legend()
         
         # Series temporales
         ax3 = fig.add_subplot(gs[1, :])
-        ax3.plot(self.datos['Fecha_Hora'], self.datos['Temp_interna_invernadero'],
-                label='Temp. Interna')
-        ax3.plot(self.datos['Fecha_Hora'], self.datos['Temp_externa_invernadero'],
-                label='Temp. Externa')
+        ReductorLineas.graficar(ax3, self.datos['Fecha_Hora'], self.datos['Temp_interna_invernadero'],
+                                label='Temp. Interna')
+        ReductorLineas.graficar(ax3, self.datos['Fecha_Hora'], self.datos['Temp_externa_invernadero'],
+                                label='Temp. Externa')
         ax3_twin = ax3.twinx()
-        ax3_twin.plot(self.datos['Fecha_Hora'], self.datos['Hum_interna_invernadero'],
-                     'g-', label='Hum. Interna')
-        ax3_twin.plot(self.datos['Fecha_Hora'], self.datos['Hum_externa_invernadero'],
-                     'y-', label='Hum. Externa')
+        ReductorLineas.graficar(ax3_twin, self.datos['Fecha_Hora'], self.datos['Hum_interna_invernadero'],
+                                'g-', label='Hum. Interna')
+        ReductorLineas.graficar(ax3_twin, self.datos['Fecha_Hora'], self.datos['Hum_externa_invernadero'],
+                                'y-', label='Hum. Externa')
         
         ax3.set_xlabel('Fecha/Hora')
         ax3.set_ylabel('Temperatura (°C)')
@@ -1816,12 +5441,12 @@ class AnalisisInvernadero:
         ax3_twin.legend(loc='upper right')
         ax3.set_title('Series Temporales de Condiciones Internas y Externas')
         
-        plt.tight_layout()
+        fig.tight_layout()
         return fig
 
-    def analizar_estres_termico(self):
+    def analizar_estres_termico(self, fig=None):
         """Análisis del estrés térmico en las plantas."""
-        fig = plt.figure(figsize=(15, 10))
+        fig = self._preparar_figura(fig, (15, 10))
         gs = plt.GridSpec(2, 2)
         
         # Índices de estrés a lo largo del tiempo
@@ -1837,7 +5462,8 @@ class AnalisisInvernadero:
         
         # Histograma de temperaturas
         ax2 = fig.add_subplot(gs[1, 0])
-        ax2.hist(self.datos['Temp_interna_invernadero'], bins=30)
+        conteos, bordes = self.cubo().histograma('Temp_interna_invernadero', bins=32)
+        ax2.hist(bordes[:-1], bins=bordes, weights=conteos)
         ax2.axvline(25, color='r', linestyle='--', label='Temp. Óptima')
         ax2.set_title('Distribución de Temperaturas')
         ax2.set_xlabel('Temperatura (°C)')
@@ -1846,57 +5472,129 @@ class AnalisisInvernadero:
         
         # Boxplot por período
         ax3 = fig.add_subplot(gs[1, 1])
-        sns.boxplot(data=self.datos, x='Periodo', y='Temp_interna_invernadero', ax=ax3)
+        self.dibujar_cajas(ax3, [self.estadisticas_caja('Temp_interna_invernadero', periodo)
+                                 for periodo in ['Día', 'Noche']])
+        ax3.set_xlabel('Periodo')
         ax3.axhline(25, color='r', linestyle='--', label='Temp. Óptima')
         ax3.set_title('Temperaturas por Período')
         ax3.set_ylabel('Temperatura (°C)')
         ax3.legend()
         
-        plt.tight_layout()
+        fig.tight_layout()
         return fig
 
-    def graficar_mapa_calor_3d(self):
+    # Posiciones de los sensores en el invernadero (x, y, z) en metros
+    POSICIONES_SENSORES = {
+        'S1_temp_sustrato': (0, 0, 0.1),    # Sustrato
+        'S2_temp_tallo': (0, 0, 0.5),       # Tallo
+        'S3_temp_hoja': (0.2, 0, 1.0),      # Hoja
+        'S4_temp_fruto': (0.1, 0.1, 0.8),   # Fruto
+        'S5_temp_1m_altura': (0, 0, 1.0),   # 1m
+        'S6_temp_2m_altura': (0, 0, 2.0),   # 2m
+        'S7_temp_3_altura': (0, 0, 3.0)     # 3m
+    }
+
+    # Malla del invernadero y planos de corte del mapa 3D
+    MALLA_3D = (np.linspace(-1, 1, 50), np.linspace(-1, 1, 50), np.linspace(0, 3.5, 50))
+    PLANOS_Z = [0.5, 1.5, 2.5]
+    PLANO_Y = 0
+
+    # La disposición de sensores y planos es fija: el interpolador se comparte
+    _interpolador_planos = None
+
+    @classmethod
+    def interpolador_planos(cls):
+        """
+        Interpolador de los planos de corte del mapa 3D (se crea una sola vez).
+
+        Los planos son los mismos cortes de la malla 50×50×50 que se tomaban del
+        volumen completo: uno horizontal por cada altura de PLANOS_Z y uno
+        vertical en PLANO_Y.
+
+        Returns:
+            InterpoladorPlanos: Interpolador compartido
+        """
+        if cls._interpolador_planos is None:
+            x, y, z = cls.MALLA_3D
+            X, Y, Z = np.meshgrid(x, y, z)
+            planos = {}
+            for z_plane in cls.PLANOS_Z:
+                k = np.argmin(np.abs(z - z_plane))
+                planos[('z', z_plane)] = (X[:, :, k], Y[:, :, k], Z[:, :, k])
+            k = np.argmin(np.abs(y - cls.PLANO_Y))
+            planos[('y', cls.PLANO_Y)] = (X[:, k, :], Y[:, k, :], Z[:, k, :])
+            cls._interpolador_planos = InterpoladorPlanos(
+                np.array(list(cls.POSICIONES_SENSORES.values())), planos)
+        return cls._interpolador_planos
+
+    def cuadros_campo_termico(self, frecuencia=None, max_cuadros=500):
+        """
+        Planos de corte del campo térmico para cada instante, con caché por versión.
+
+        Las lecturas de los sensores se promedian por intervalos de `frecuencia`
+        y todos los instantes se interpolan con un único producto de matrices.
+
+        Args:
+            frecuencia (str): Regla de pandas para el paso entre cuadros; None
+                usa 30 minutos o el paso (en minutos enteros) que deje a lo sumo
+                `max_cuadros` cuadros
+            max_cuadros (int): Límite de cuadros cuando frecuencia es None
+
+        Returns:
+            dict: 'tiempos' (DatetimeIndex), 'sensores' (n_cuadros, n_sensores) y
+                  'planos' (nombre -> arreglo (filas, columnas, n_cuadros))
+        """
+        if frecuencia is None:
+            fechas = self.datos['Fecha_Hora']
+            minutos = (fechas.max() - fechas.min()).total_seconds() / 60 if len(fechas) else 0
+            frecuencia = f"{max(30, math.ceil(minutos / max_cuadros))}min"
+        clave = (self.version, frecuencia)
+        if clave not in self._cuadros_termicos:
+            sensores = list(self.POSICIONES_SENSORES)
+            lecturas = (self.datos.set_index('Fecha_Hora')[sensores]
+                        .resample(frecuencia).mean().dropna(how='all'))
+            temps = lecturas.to_numpy(dtype=float)
+            self._cuadros_termicos = {k: v for k, v in self._cuadros_termicos.items()
+                                      if k[0] == self.version}
+            cuadros = {
+                'tiempos': lecturas.index,
+                'sensores': temps,
+                # float32: los planos de todos los cuadros se guardan en memoria
+                'planos': {nombre: plano.astype(np.float32) for nombre, plano
+                           in self.interpolador_planos().campo(temps.T).items()}
+            }
+            # De sólo lectura: la animación y la exportación en segundo plano
+            # los comparten sin copiarlos
+            for arreglo in [temps, *cuadros['planos'].values()]:
+                arreglo.setflags(write=False)
+            self._cuadros_termicos[clave] = cuadros
+        return self._cuadros_termicos[clave]
+
+    def graficar_mapa_calor_3d(self, fig=None):
         """Genera una visualización térmica 3D altamente visual del invernadero."""
-        fig = plt.figure(figsize=(15, 10))
+        fig = self._preparar_figura(fig, (15, 10))
         ax = fig.add_subplot(111, projection='3d')
         
-        # Crear una malla densa para el invernadero
-        x = np.linspace(-1, 1, 50)
-        y = np.linspace(-1, 1, 50)
-        z = np.linspace(0, 3.5, 50)
-        X, Y, Z = np.meshgrid(x, y, z)
-        
-        # Definir posiciones de sensores
-        puntos = {
-            'S1_temp_sustrato': (0, 0, 0.1),    # Sustrato
-            'S2_temp_tallo': (0, 0, 0.5),       # Tallo
-            'S3_temp_hoja': (0.2, 0, 1.0),      # Hoja
-            'S4_temp_fruto': (0.1, 0.1, 0.8),   # Fruto
-            'S5_temp_1m_altura': (0, 0, 1.0),   # 1m
-            'S6_temp_2m_altura': (0, 0, 2.0),   # 2m
-            'S7_temp_3_altura': (0, 0, 3.0)     # 3m
-        }
-        
+        x, y, z = self.MALLA_3D
+        puntos = self.POSICIONES_SENSORES
         coords = np.array(list(puntos.values()))
-        temps = np.array([self.datos[sensor].mean() for sensor in puntos.keys()])
+        cubo = self.cubo()
+        temps = np.array([cubo.agregar(sensor)['mean'] for sensor in puntos.keys()])
         
-        # Crear el volumen de temperatura interpolado
-        points = coords
-        grid_temps = griddata(points, temps, (X, Y, Z), method='linear')
+        # Sólo se interpolan los planos que se dibujan (pesos precalculados)
+        planos = self.interpolador_planos().campo(temps)
         
         # Crear planos de corte en diferentes posiciones
-        x_plane = 0
-        y_plane = 0
-        z_planes = [0.5, 1.5, 2.5]
+        y_plane = self.PLANO_Y
+        z_planes = self.PLANOS_Z
         
         # Configurar colormaps
         cmap = plt.cm.RdYlBu_r  # Red-Yellow-Blue reversed (rojo=caliente, azul=frío)
-        norm = plt.Normalize(temps.min()-1, temps.max()+1)
+        norm = plt.Normalize(np.nanmin(temps) - 1, np.nanmax(temps) + 1)
         
         # Dibujar planos de corte
         for z_plane in z_planes:
-            z_idx = np.argmin(np.abs(z - z_plane))
-            plane = grid_temps[:, :, z_idx]
+            plane = planos[('z', z_plane)]
             X_plane, Y_plane = np.meshgrid(x, y)
             Z_plane = np.full_like(X_plane, z_plane)
             surf = ax.plot_surface(X_plane, Y_plane, Z_plane,
@@ -1904,8 +5602,7 @@ class AnalisisInvernadero:
                                  alpha=0.3)
         
         # Dibujar planos verticales
-        y_idx = np.argmin(np.abs(y - y_plane))
-        plane = grid_temps[:, y_idx, :]
+        plane = planos[('y', y_plane)]
         X_plane, Z_plane = np.meshgrid(x, z)
         Y_plane = np.full_like(X_plane, y_plane)
         surf = ax.plot_surface(X_plane, Y_plane, Z_plane,
@@ -1925,7 +5622,7 @@ class AnalisisInvernadero:
                     horizontalalignment='center', fontsize=8)
         
         # Agregar una barra de color clara
-        cbar = plt.colorbar(scatter, ax=ax, pad=0.1)
+        cbar = fig.colorbar(scatter, ax=ax, pad=0.1)
         cbar.set_label('Temperatura (°C)', fontsize=12)
         
         # Configuración del gráfico
@@ -1944,28 +5641,29 @@ class AnalisisInvernadero:
         ax.grid(True, alpha=0.3)
         
         # Ajustar el espaciado
-        plt.tight_layout()
+        fig.tight_layout()
         
         return fig
 
-    def graficar_series_temporales(self):
+    def graficar_series_temporales(self, fig=None):
         """Genera gráficos de series temporales."""
-        fig, (ax1, ax2, ax3) = plt.subplots(3, 1, figsize=(12, 15))
+        fig = self._preparar_figura(fig, (12, 15))
+        ax1, ax2, ax3 = fig.subplots(3, 1)
         
         # Temperaturas
         cols_temp = [col for col in self.datos.columns if 'temp' in col.lower()]
         for col in cols_temp:
-            ax1.plot(self.datos['Fecha_Hora'], self.datos[col], label=col)
+            ReductorLineas.graficar(ax1, self.datos['Fecha_Hora'], self.datos[col], label=col, gid=col)
         ax1.set_title('Temperaturas')
         ax1.set_xlabel('Fecha/Hora')
         ax1.set_ylabel('Temperatura (°C)')
         ax1.legend(bbox_to_anchor=(1.05, 1), loc='upper left')
         
         # Humedad
-        ax2.plot(self.datos['Fecha_Hora'], self.datos['Hum_interna_invernadero'],
-                label='Humedad Interna')
-        ax2.plot(self.datos['Fecha_Hora'], self.datos['Hum_externa_invernadero'],
-                label='Humedad Externa')
+        ReductorLineas.graficar(ax2, self.datos['Fecha_Hora'], self.datos['Hum_interna_invernadero'],
+                                label='Humedad Interna', gid='Hum_interna_invernadero')
+        ReductorLineas.graficar(ax2, self.datos['Fecha_Hora'], self.datos['Hum_externa_invernadero'],
+                                label='Humedad Externa', gid='Hum_externa_invernadero')
         ax2.set_title('Humedad Relativa')
         ax2.set_xlabel('Fecha/Hora')
         ax2.set_ylabel('Humedad (%)')
@@ -1974,17 +5672,575 @@ class AnalisisInvernadero:
         # Propiedades psicrométricas
         props = ['W (kg_vp/kg_AS)', 'h (kJ/kg_AS)', 'Tpr (°C)']
         for prop in props:
-            ax3.plot(self.datos['Fecha_Hora'], self.datos[prop], label=prop)
+            ReductorLineas.graficar(ax3, self.datos['Fecha_Hora'], self.datos[prop], label=prop, gid=prop)
         ax3.set_title('Propiedades Psicrométricas')
         ax3.set_xlabel('Fecha/Hora')
         ax3.set_ylabel('Valor')
         ax3.legend()
         
-        plt.tight_layout()
+        fig.tight_layout()
+        return fig
+
+    def piramide(self):
+        """
+        Pirámide de agregados (crudo, 10 min, 1 h, 1 día, 1 semana) de los datos.
+
+        Se construye una sola vez por versión de los datos.
+
+        Returns:
+            PiramideAgregados: Agregados de todas las columnas numéricas
+        """
+        if self._piramide is None or self._piramide[0] != self.version:
+            self._piramide = (self.version, PiramideAgregados(self.datos))
+        return self._piramide[1]
+
+    # Columnas del cubo de agregados
+    COLUMNAS_CUBO = list(POSICIONES_SENSORES) + [
+        'Temp_interna_invernadero', 'Hum_interna_invernadero',
+        'Temp_externa_invernadero', 'Hum_externa_invernadero',
+        'Estres_Calor', 'Estres_Frio',
+    ]
+
+    def cubo(self):
+        """
+        Cubo de agregados (día × hora × período) de sensores y condiciones.
+
+        Se construye una sola vez por versión de los datos y lo comparten todos
+        los análisis que necesitan medias, desviaciones, extremos o cuantiles
+        por hora, día o período.
+
+        Returns:
+            CuboAgregados: Agregados de COLUMNAS_CUBO
+        """
+        if self._cubo is None or self._cubo[0] != self.version:
+            self._cubo = (self.version, CuboAgregados(self.datos, self.COLUMNAS_CUBO))
+        return self._cubo[1]
+
+    # Canales del motor de estadísticas móviles (canal -> ventana en muestras)
+    CANALES_MOVILES = {
+        'Temp_interna_invernadero': 24,
+        'Hum_interna_invernadero': 24,
+    }
+
+    def estadisticas_moviles(self):
+        """
+        Motor de estadísticas móviles de CANALES_MOVILES.
+
+        Se alimenta una vez por versión de los datos; anexar() lo hace avanzar
+        con las filas nuevas sin rehacerlo.
+
+        Returns:
+            EstadisticasMoviles: Motor con las series de todas las filas
+        """
+        if self._estadisticas_moviles is None or self._estadisticas_moviles[0] != self.version:
+            motor = EstadisticasMoviles()
+            for canal, ventana in self.CANALES_MOVILES.items():
+                if canal in self.datos.columns:
+                    motor.agregar_canal(canal, ventana)
+            motor.extender(self.datos['Fecha_Hora'], self.datos)
+            self._estadisticas_moviles = (self.version, motor)
+        return self._estadisticas_moviles[1]
+
+    def pronosticador(self):
+        """
+        Modelos de pronóstico de temperatura y humedad internas.
+
+        Se ajustan una sola vez por versión de los datos, sobre el nivel horario
+        de la pirámide.
+
+        Returns:
+            PronosticadorClima: Modelos ajustados
+        """
+        if self._pronosticador is None or self._pronosticador[0] != self.version:
+            self._pronosticador = (self.version, PronosticadorClima(
+                self.piramide(),
+                ['Temp_interna_invernadero', 'Hum_interna_invernadero'],
+                ['Temp_externa_invernadero', 'Hum_externa_invernadero']))
+        return self._pronosticador[1]
+
+    def punto_rocio(self):
+        """
+        Punto de rocío del aire interno por fila (°C).
+
+        Usa la columna 'Tpr (°C)' de las propiedades psicrométricas o, si no
+        está, la calcula; el punto de rocío no depende de la presión.
+        """
+        if 'Tpr (°C)' in self.datos.columns:
+            return self.datos['Tpr (°C)'].to_numpy(dtype=float)
+        calculadora = self.calculadora or CalculadoraPropiedades()
+        return calculadora.calcular_propiedades_lote(self.datos['Temp_interna_invernadero'],
+                                                     self.datos['Hum_interna_invernadero'],
+                                                     101.325)['Tpr (°C)']
+
+    def riesgo_condensacion(self, umbral=2.0):
+        """
+        Márgenes y eventos de riesgo de condensación, con caché por versión.
+
+        Args:
+            umbral (float): Margen superficie - punto de rocío (°C) que marca riesgo
+
+        Returns:
+            tuple: (márgenes por superficie, DataFrame de eventos)
+        """
+        clave = (self.version, umbral)
+        if clave not in self._condensacion:
+            self._condensacion = {k: v for k, v in self._condensacion.items() if k[0] == self.version}
+            detector = DetectorCondensacion(umbral)
+            margenes = detector.margenes(self.datos, self.punto_rocio())
+            self._condensacion[clave] = (margenes, detector.eventos(self.datos['Fecha_Hora'], margenes))
+        return self._condensacion[clave]
+
+    def graficar_riesgo_condensacion(self, fig=None, umbral=2.0):
+        """
+        Márgenes de hoja y fruto sobre el punto de rocío y eventos de riesgo.
+
+        Args:
+            fig (Figure): Figura existente a reutilizar o None
+            umbral (float): Margen (°C) por debajo del cual hay riesgo
+
+        Returns:
+            Figure: Figura con los márgenes y las horas de riesgo por día
+        """
+        fig = self._preparar_figura(fig, (15, 10))
+        gs = plt.GridSpec(2, 1)
+        margenes, eventos = self.riesgo_condensacion(umbral)
+        colores = {'Hoja': 'g', 'Fruto': 'r'}
+
+        # Márgenes con los eventos sombreados (una colección por superficie)
+        ax1 = fig.add_subplot(gs[0])
+        for col, margen in margenes.items():
+            nombre = DetectorCondensacion.SUPERFICIES[col]
+            ReductorLineas.graficar(ax1, self.datos['Fecha_Hora'], margen,
+                                    f'{colores[nombre]}-', lw=0.8, label=f'Margen {nombre}')
+            propios = eventos[eventos['Superficie'] == nombre]
+            if len(propios):
+                ax1.broken_barh(list(zip(mdates.date2num(propios['Inicio']),
+                                         propios['Duracion'].dt.total_seconds() / 86400)),
+                                (0, 1), transform=ax1.get_xaxis_transform(),
+                                color=colores[nombre], alpha=0.15)
+        ax1.axhline(umbral, color='orange', linestyle='--', label=f'Umbral ({umbral:g} °C)')
+        ax1.axhline(0, color='k', linestyle=':', label='Condensación')
+        ax1.set_title('Margen de las Superficies sobre el Punto de Rocío')
+        ax1.set_xlabel('Fecha/Hora')
+        ax1.set_ylabel('Temperatura - Tpr (°C)')
+        ax1.legend(loc='upper right')
+
+        # Horas de riesgo por día (según el inicio de cada evento)
+        ax2 = fig.add_subplot(gs[1])
+        if len(eventos):
+            horas = (eventos.assign(Dia=eventos['Inicio'].dt.floor('D'),
+                                    Horas=eventos['Duracion'].dt.total_seconds() / 3600)
+                     .pivot_table(index='Dia', columns='Superficie', values='Horas', aggfunc='sum')
+                     .fillna(0))
+            ancho = 0.8 / len(horas.columns)
+            for k, nombre in enumerate(horas.columns):
+                ax2.bar(mdates.date2num(horas.index) + (k - (len(horas.columns) - 1) / 2) * ancho,
+                        horas[nombre], width=ancho, color=colores.get(nombre), label=nombre)
+            ax2.xaxis_date()
+            ax2.legend()
+        n_condensacion = int(eventos['Condensacion'].sum())
+        ax2.set_title(f'Horas de Riesgo por Día ({len(eventos)} eventos, '
+                      f'{n_condensacion} con condensación)')
+        ax2.set_xlabel('Fecha')
+        ax2.set_ylabel('Horas')
+
+        fig.tight_layout()
+        return fig
+
+    # Banda de déficit de presión de vapor del cultivo (kPa)
+    BANDA_DPV = (0.5, 1.2)
+    COLUMNAS_DPV = {'DPV (kPa)': 'DPV', 'DPV hoja (kPa)': 'DPV_hoja'}
+
+    @staticmethod
+    def horas_por_lectura(tiempos):
+        """
+        Horas que representa cada lectura: el tiempo hasta la siguiente.
+
+        Los huecos de más de diez intervalos típicos (y los saltos hacia atrás)
+        cuentan como un intervalo típico; la última lectura también.
+
+        Args:
+            tiempos (np.ndarray): Fechas en nanosegundos (int64), ordenadas
+
+        Returns:
+            np.ndarray: Duración de cada lectura en horas
+        """
+        pasos = np.diff(tiempos)
+        tipico = np.median(pasos) if len(pasos) else pd.Timedelta('1h').value
+        pasos = np.append(pasos, tipico)
+        return np.where((pasos > 10 * tipico) | (pasos < 0), tipico, pasos) / 3.6e12
+
+    def horas_dpv(self, banda=None):
+        """
+        Horas diarias con el déficit de presión de vapor por encima y por debajo
+        de la banda del cultivo, con caché por versión.
+
+        Cada lectura cuenta lo que da horas_por_lectura.
+
+        Args:
+            banda (tuple): (mínimo, máximo) en kPa; None usa BANDA_DPV
+
+        Returns:
+            pd.DataFrame: Una fila por día con columnas '<canal>_alto' y
+                          '<canal>_bajo' (horas) para DPV y DPV_hoja
+        """
+        banda = tuple(self.BANDA_DPV if banda is None else banda)
+        clave = (self.version, banda)
+        if clave not in self._horas_dpv:
+            self._horas_dpv = {k: v for k, v in self._horas_dpv.items() if k[0] == self.version}
+            tiempos = self.datos['Fecha_Hora'].to_numpy(dtype='datetime64[ns]').view('int64')
+            columnas = {}
+            dias = np.array([], dtype='datetime64[ns]')
+            if len(tiempos):
+                pasos = self.horas_por_lectura(tiempos)
+                dia = tiempos // pd.Timedelta('1D').value
+                inicios = np.flatnonzero(np.r_[True, dia[1:] != dia[:-1]])
+                dias = (dia[inicios] * pd.Timedelta('1D').value).view('datetime64[ns]')
+                for col, nombre in self.COLUMNAS_DPV.items():
+                    if col not in self.datos.columns:
+                        continue
+                    dpv = self.datos[col].to_numpy(dtype=float)
+                    columnas[f'{nombre}_alto'] = np.add.reduceat(pasos * (dpv > banda[1]), inicios)
+                    columnas[f'{nombre}_bajo'] = np.add.reduceat(pasos * (dpv < banda[0]), inicios)
+            self._horas_dpv[clave] = pd.DataFrame(columnas, index=pd.DatetimeIndex(dias, name='Dia'))
+        return self._horas_dpv[clave]
+
+    def graficar_dpv(self, fig=None, banda=None):
+        """
+        Déficit de presión de vapor del aire y de la hoja con la banda del cultivo.
+
+        Args:
+            fig (Figure): Figura existente a reutilizar o None
+            banda (tuple): (mínimo, máximo) en kPa; None usa BANDA_DPV
+
+        Returns:
+            Figure: Figura con las series y las horas diarias fuera de la banda
+        """
+        banda = tuple(self.BANDA_DPV if banda is None else banda)
+        fig = self._preparar_figura(fig, (15, 10))
+        gs = plt.GridSpec(2, 1)
+
+        ax1 = fig.add_subplot(gs[0])
+        for (col, nombre), estilo in zip(self.COLUMNAS_DPV.items(), ['b-', 'g-']):
+            if col in self.datos.columns:
+                ReductorLineas.graficar(ax1, self.datos['Fecha_Hora'], self.datos[col],
+                                        estilo, lw=0.8, label=col, gid=col)
+        ax1.axhspan(*banda, color='green', alpha=0.1, label=f'Banda del cultivo ({banda[0]:g}-{banda[1]:g} kPa)')
+        ax1.set_title('Déficit de Presión de Vapor')
+        ax1.set_xlabel('Fecha/Hora')
+        ax1.set_ylabel('DPV (kPa)')
+        ax1.legend(loc='upper right')
+
+        # Horas por día fuera de la banda: arriba las de exceso, abajo las de defecto
+        ax2 = fig.add_subplot(gs[1])
+        horas = self.horas_dpv(banda)
+        x = mdates.date2num(horas.index) + 0.5  # barras centradas en el día
+        for k, (nombre, color) in enumerate([('DPV', 'tab:blue'), ('DPV_hoja', 'tab:green')]):
+            if f'{nombre}_alto' not in horas:
+                continue
+            desplazamiento = (k - 0.5) * 0.4
+            ax2.bar(x + desplazamiento, horas[f'{nombre}_alto'], width=0.4, color=color,
+                    label=f'{nombre} > {banda[1]:g} kPa')
+            ax2.bar(x + desplazamiento, -horas[f'{nombre}_bajo'], width=0.4, color=color, alpha=0.5,
+                    label=f'{nombre} < {banda[0]:g} kPa')
+        ax2.axhline(0, color='k', lw=0.8)
+        ax2.xaxis_date()
+        ax2.set_title('Horas Diarias Fuera de la Banda de DPV')
+        ax2.set_xlabel('Fecha')
+        ax2.set_ylabel('Horas (arriba: exceso, abajo: defecto)')
+        if ax2.patches:
+            ax2.legend()
+
+        fig.tight_layout()
+        return fig
+
+    def presion_atmosferica(self):
+        """
+        Presión atmosférica (kPa) con la que se calcularon las propiedades.
+
+        Se despeja de razon_humedad (P = Pv (0.622 + W) / W) con las columnas
+        Pv y W; sin ellas se supone el nivel del mar.
+        """
+        if {'Pv (kPa)', 'W (kg_vp/kg_AS)'} <= set(self.datos.columns):
+            W = self.datos['W (kg_vp/kg_AS)'].to_numpy(dtype=float)
+            Pv = self.datos['Pv (kPa)'].to_numpy(dtype=float)
+            with np.errstate(invalid='ignore', divide='ignore'):
+                presion = np.nanmedian(np.where(W > 0, Pv * (0.622 + W) / W, np.nan))
+            if np.isfinite(presion):
+                return float(presion)
+        return 101.325
+
+    # Volumen de aire del invernadero (m³; 1000 m² con 4 m de altura media) y
+    # renovaciones por hora predeterminadas de las cargas de ventilación
+    VOLUMEN_INVERNADERO = 4000.0
+    RENOVACIONES_HORA = 1.0
+    COLUMNAS_CARGAS = ['Horas', 'Delta_h_medio', 'Sensible_kWh', 'Latente_kWh', 'Total_kWh',
+                       'Calentamiento_kWh', 'Enfriamiento_kWh']
+
+    def cargas_ventilacion(self, renovaciones=None, volumen=None):
+        """
+        Energía para llevar el aire exterior que entra por ventilación a las
+        condiciones interiores, por hora y por día, con caché por versión.
+
+        Por lectura: m = renovaciones · V / (3600 · Veh_int) kg_AS/s y
+        carga = m (h_int - h_ext), que se reparte exactamente en
+        sensible m (1.006 + 1.805 W_ext)(T_int - T_ext) y latente
+        m (W_int - W_ext)(2501 + 1.805 T_int). Positiva: hay que calentar (o
+        humidificar) el aire que entra; negativa: enfriarlo (o secarlo). Cada
+        lectura pesa lo que da horas_por_lectura; las que no tienen estado
+        interior o exterior válido no suman.
+
+        Args:
+            renovaciones (float): Renovaciones de aire por hora; None usa RENOVACIONES_HORA
+            volumen (float): Volumen del invernadero (m³); None usa VOLUMEN_INVERNADERO
+
+        Returns:
+            tuple: (horaria, diaria), DataFrames indexados por el inicio de la
+                   hora ('Hora') y del día ('Dia') con COLUMNAS_CARGAS: horas
+                   con datos, Δh medio (kJ/kg_AS) y energías en kWh
+                   (calentamiento y enfriamiento son las partes positiva y
+                   negativa de la carga total, ambas como valores positivos)
+        """
+        renovaciones = float(self.RENOVACIONES_HORA if renovaciones is None else renovaciones)
+        volumen = float(self.VOLUMEN_INVERNADERO if volumen is None else volumen)
+        clave = (self.version, renovaciones, volumen)
+        if clave not in self._cargas_ventilacion:
+            self._cargas_ventilacion = {k: v for k, v in self._cargas_ventilacion.items()
+                                        if k[0] == self.version}
+            calculadora = self.calculadora or CalculadoraPropiedades()
+            presion = self.presion_atmosferica()
+            interior = calculadora.calcular_propiedades_lote(self.datos['Temp_interna_invernadero'],
+                                                             self.datos['Hum_interna_invernadero'], presion)
+            exterior = calculadora.calcular_propiedades_lote(self.datos['Temp_externa_invernadero'],
+                                                             self.datos['Hum_externa_invernadero'], presion)
+            T_int, W_int = interior['Tbs (°C)'], interior['W (kg_vp/kg_AS)']
+            T_ext, W_ext = exterior['Tbs (°C)'], exterior['W (kg_vp/kg_AS)']
+            masa = renovaciones * volumen / (3600 * interior['Veh (m³/kg_AS)'])   # kg_AS/s
+            delta_h = interior['h (kJ/kg_AS)'] - exterior['h (kJ/kg_AS)']
+            sensible = masa * (1.006 + 1.805 * W_ext) * (T_int - T_ext)           # kW
+            latente = masa * (W_int - W_ext) * (2501 + 1.805 * T_int)
+            total = masa * delta_h
+
+            tiempos = self.datos['Fecha_Hora'].to_numpy(dtype='datetime64[ns]').view('int64')
+            horas = self.horas_por_lectura(tiempos) if len(tiempos) else np.zeros(0)
+            horas = np.where(np.isfinite(total), horas, 0.0)
+            # Sumas por lectura en una matriz: una sola reducción por hora
+            sumandos = np.nan_to_num(np.column_stack([
+                np.ones_like(horas), delta_h, sensible, latente, total,
+                np.maximum(total, 0), np.maximum(-total, 0)]) * horas[:, None])
+
+            hora_ns = pd.Timedelta('1h').value
+            dia_ns = pd.Timedelta('1D').value
+            hora = tiempos // hora_ns
+            inicios = np.flatnonzero(np.r_[True, hora[1:] != hora[:-1]]) if len(hora) else np.zeros(0, int)
+            por_hora = np.add.reduceat(sumandos, inicios, axis=0) if len(inicios) else np.zeros((0, 7))
+            # Los días se agregan desde las horas (cada hora cae en un solo día)
+            dia = hora[inicios] * hora_ns // dia_ns
+            inicios_dia = np.flatnonzero(np.r_[True, dia[1:] != dia[:-1]]) if len(dia) else np.zeros(0, int)
+            por_dia = np.add.reduceat(por_hora, inicios_dia, axis=0) if len(inicios_dia) else np.zeros((0, 7))
+
+            def armar(sumas, inicio, nombre):
+                tabla = pd.DataFrame(sumas, columns=self.COLUMNAS_CARGAS,
+                                     index=pd.DatetimeIndex(inicio.view('datetime64[ns]'), name=nombre))
+                with np.errstate(invalid='ignore', divide='ignore'):
+                    tabla['Delta_h_medio'] = np.where(tabla['Horas'] > 0,
+                                                      tabla['Delta_h_medio'] / tabla['Horas'], np.nan)
+                return tabla
+
+            self._cargas_ventilacion[clave] = (armar(por_hora, hora[inicios] * hora_ns, 'Hora'),
+                                               armar(por_dia, dia[inicios_dia] * dia_ns, 'Dia'))
+        return self._cargas_ventilacion[clave]
+
+    def graficar_cargas_ventilacion(self, fig=None, renovaciones=None):
+        """
+        Cargas sensible y latente de la ventilación por hora y energía diaria.
+
+        Args:
+            fig (Figure): Figura existente a reutilizar o None
+            renovaciones (float): Renovaciones por hora; None usa RENOVACIONES_HORA
+
+        Returns:
+            Figure: Figura con la energía horaria y los totales diarios
+        """
+        renovaciones = self.RENOVACIONES_HORA if renovaciones is None else renovaciones
+        fig = self._preparar_figura(fig, (15, 10))
+        gs = plt.GridSpec(2, 1)
+        horaria, diaria = self.cargas_ventilacion(renovaciones)
+
+        ax1 = fig.add_subplot(gs[0])
+        for col, estilo, nombre in [('Sensible_kWh', 'r-', 'Sensible'), ('Latente_kWh', 'b-', 'Latente'),
+                                    ('Total_kWh', 'k-', 'Total')]:
+            ReductorLineas.graficar(ax1, horaria.index, horaria[col], estilo, lw=0.8,
+                                    label=nombre, gid=col)
+        ax1.axhline(0, color='k', lw=0.8, linestyle=':')
+        ax1.set_title(f'Carga de Ventilación por Hora ({renovaciones:g} renovaciones/h, '
+                      f'{self.VOLUMEN_INVERNADERO:g} m³)')
+        ax1.set_xlabel('Fecha/Hora')
+        ax1.set_ylabel('kWh por hora (+ calentar, - enfriar)')
+        ax1.legend(loc='upper right')
+
+        # Energía diaria: calentamiento arriba, enfriamiento abajo
+        ax2 = fig.add_subplot(gs[1])
+        x = mdates.date2num(diaria.index) + 0.5  # barras centradas en el día
+        ax2.bar(x, diaria['Calentamiento_kWh'], width=0.8, color='tab:red', label='Calentamiento')
+        ax2.bar(x, -diaria['Enfriamiento_kWh'], width=0.8, color='tab:blue', label='Enfriamiento')
+        ax2.plot(x, diaria['Latente_kWh'], 'c.', label='Latente (neta)')
+        ax2.axhline(0, color='k', lw=0.8)
+        ax2.xaxis_date()
+        ax2.set_title(f"Energía Diaria: {diaria['Calentamiento_kWh'].sum():,.0f} kWh de calentamiento, "
+                      f"{diaria['Enfriamiento_kWh'].sum():,.0f} kWh de enfriamiento")
+        ax2.set_xlabel('Fecha')
+        ax2.set_ylabel('kWh')
+        ax2.legend()
+
+        fig.tight_layout()
+        return fig
+
+    # Consignas barridas en la simulación de control (°C)
+    CONSIGNAS_CALOR = np.arange(10, 19, 1.0)
+    CONSIGNAS_VENTILACION = np.arange(22, 31, 1.0)
+
+    def simulacion_consignas(self):
+        """
+        Barrido de consignas de calefacción y ventilación (PoliticaConsigna)
+        sobre los datos, con caché por versión.
+
+        Returns:
+            pd.DataFrame: Resultado de SimuladorControl.simular para la rejilla
+                          CONSIGNAS_CALOR × CONSIGNAS_VENTILACION
+        """
+        if self.simulacion_pendiente():
+            self._simulacion = (self.version, self.barrer_consignas(self.simulador_control()))
+        return self._simulacion[1]
+
+    def simulacion_pendiente(self):
+        """Indica si el barrido de consignas de la versión actual está por calcular."""
+        return self._simulacion is None or self._simulacion[0] != self.version
+
+    def ultima_simulacion(self):
+        """Último barrido guardado, aunque sea de una versión anterior (None si no hay)."""
+        return None if self._simulacion is None else self._simulacion[1]
+
+    def simulador_control(self):
+        """Simulador de control sobre la pirámide de los datos actuales."""
+        return SimuladorControl.desde_piramide(self.piramide(), self.presion_atmosferica(),
+                                               self.calculadora)
+
+    @classmethod
+    def barrer_consignas(cls, simulador):
+        """
+        Simula la rejilla CONSIGNAS_CALOR × CONSIGNAS_VENTILACION.
+
+        Sólo usa los arreglos del simulador, así que puede ejecutarse en un
+        hilo aparte mientras los datos del análisis cambian.
+        """
+        rejilla = SimuladorControl.rejilla(consigna_calor=cls.CONSIGNAS_CALOR,
+                                           consigna_ventilacion=cls.CONSIGNAS_VENTILACION)
+        return simulador.simular(PoliticaConsigna(), rejilla, banda_dpv=cls.BANDA_DPV)
+
+    def guardar_simulacion(self, version, tabla):
+        """
+        Guarda un barrido calculado aparte si es más reciente que el guardado.
+
+        Un barrido de una versión anterior de los datos no deja de estar
+        pendiente (simulacion_pendiente), pero se muestra mientras se calcula
+        el de la versión actual.
+        """
+        if self._simulacion is None or version > self._simulacion[0]:
+            self._simulacion = (version, tabla)
+
+    def graficar_simulacion_control(self, fig=None, calcular=True):
+        """
+        Energía de calefacción y horas fuera de banda para cada par de consignas.
+
+        Args:
+            fig (Figure): Figura existente a reutilizar o None
+            calcular (bool): Si el barrido de la versión actual falta, calcularlo
+                aquí. La interfaz pasa False y lo calcula en segundo plano: se
+                dibuja el último barrido guardado, o un aviso si no hay ninguno
+
+        Returns:
+            Figure: Mapas de energía, horas fuera de la banda de temperatura y
+                    de DPV, y el frente energía / confort
+        """
+        fig = self._preparar_figura(fig, (15, 10))
+        if calcular or not self.simulacion_pendiente():
+            tabla = self.simulacion_consignas()
+        elif self.ultima_simulacion() is not None:
+            tabla = self.ultima_simulacion()
+            fig.suptitle('Barrido de los datos anteriores; recalculando la simulación...', color='gray')
+        else:
+            ax = fig.add_subplot(111)
+            ax.set_axis_off()
+            ax.text(0.5, 0.5, 'Recalculando la simulación de control...', ha='center', va='center',
+                    transform=ax.transAxes, fontsize=14, color='gray')
+            return fig
+        gs = plt.GridSpec(2, 2)
+        forma = (len(self.CONSIGNAS_CALOR), len(self.CONSIGNAS_VENTILACION))
+        extension = [self.CONSIGNAS_VENTILACION[0] - 0.5, self.CONSIGNAS_VENTILACION[-1] + 0.5,
+                     self.CONSIGNAS_CALOR[0] - 0.5, self.CONSIGNAS_CALOR[-1] + 0.5]
+
+        for posicion, (columna, titulo, cmap) in zip(
+                [gs[0, 0], gs[0, 1], gs[1, 0]],
+                [('Energia_calefaccion_kWh', 'Energía de Calefacción (kWh)', 'Reds'),
+                 ('Horas_fuera_T', 'Horas Fuera de la Banda de Temperatura', 'Blues'),
+                 ('Horas_fuera_DPV', 'Horas Fuera de la Banda de DPV', 'Greens')]):
+            ax = fig.add_subplot(posicion)
+            imagen = ax.imshow(tabla[columna].to_numpy().reshape(forma), origin='lower',
+                               extent=extension, aspect='auto', cmap=cmap)
+            fig.colorbar(imagen, ax=ax)
+            ax.set_title(titulo)
+            ax.set_xlabel('Consigna de ventilación (°C)')
+            ax.set_ylabel('Consigna de calefacción (°C)')
+
+        ax4 = fig.add_subplot(gs[1, 1])
+        dispersion = ax4.scatter(tabla['Energia_calefaccion_kWh'], tabla['Horas_fuera_T'],
+                                 c=tabla['consigna_calor'], cmap='viridis')
+        fig.colorbar(dispersion, ax=ax4, label='Consigna de calefacción (°C)')
+        ax4.set_title('Energía frente a Confort')
+        ax4.set_xlabel('Energía de calefacción (kWh)')
+        ax4.set_ylabel('Horas fuera de la banda de temperatura')
+
+        fig.tight_layout()
+        # La interfaz compara con esto para no redibujar el mismo barrido
+        fig._tabla_simulacion = tabla
+        return fig
+
+    def graficar_climograma(self, fig=None):
+        """
+        Genera el climograma de temperatura y humedad internas.
+
+        Se dibuja la media con una banda mínimo-máximo al nivel de la pirámide
+        de agregados que corresponde al rango visible (de semanas a datos
+        crudos al hacer zoom).
+        """
+        fig = self._preparar_figura(fig, (14, 8))
+        ax1 = fig.add_subplot(111)
+        piramide = self.piramide()
+        
+        ax1.set_xlabel("Fecha")
+        ax1.set_ylabel("Temperatura Promedio (°C)", color="tab:red")
+        VistaPiramide.graficar(ax1, piramide, 'Temp_interna_invernadero', color="red", label="Tbs (°C)")
+        ax1.tick_params(axis="y", labelcolor="tab:red")
+        
+        ax2 = ax1.twinx()
+        ax2.set_ylabel("Humedad Relativa Promedio (%)", color="tab:blue")
+        VistaPiramide.graficar(ax2, piramide, 'Hum_interna_invernadero', color="blue", label="φ (%)")
+        ax2.tick_params(axis="y", labelcolor="tab:blue")
+        
+        fig.autofmt_xdate()
+        ax1.legend(loc='upper left')
+        ax2.legend(loc='upper right')
+        ax1.set_title("Climograma: Temperatura y Humedad Internas")
+        fig.tight_layout()
+        # El tamaño final de los ejes se conoce tras tight_layout
+        VistaPiramide.de(ax1).recalcular(forzar=True)
+        VistaPiramide.de(ax2).recalcular(forzar=True)
         return fig
 
-    def graficar_correlaciones(self):
+    def graficar_correlaciones(self, fig=None):
         """Genera matriz de correlaciones."""
+        import seaborn as sns
         # Seleccionar variables numéricas
         numeric_cols = [col for col in self.datos.columns 
                        if self.datos[col].dtype in ['float64', 'int64']]
@@ -1993,16 +6249,192 @@ class AnalisisInvernadero:
         corr = self.datos[numeric_cols].corr()
         
         # Crear figura
-        plt.figure(figsize=(15, 12))
-        sns.heatmap(corr, annot=True, cmap='coolwarm', center=0, fmt='.2f')
-        plt.title('Matriz de Correlaciones')
-        plt.xticks(rotation=45, ha='right')
-        plt.yticks(rotation=0)
+        fig = self._preparar_figura(fig, (15, 12))
+        ax = fig.add_subplot(111)
+        sns.heatmap(corr, annot=True, cmap='coolwarm', center=0, fmt='.2f', ax=ax)
+        ax.set_title('Matriz de Correlaciones')
+        plt.setp(ax.get_xticklabels(), rotation=45, ha='right')
+        plt.setp(ax.get_yticklabels(), rotation=0)
         
-        return plt.gcf()
+        return fig
+
+
+class RenderizadorLote:
+    """
+    Genera sin ventanas las figuras de análisis de varios archivos de datos.
+
+    Cada archivo se procesa en un proceso aparte (ProcessPoolExecutor). Las
+    figuras se crean como Figure con lienzo Agg, sin pasar por pyplot, y se
+    limpian después de guardarlas, así que la memoria no crece con el número
+    de figuras.
+    """
+
+    # Nombre de la vista -> (método de AnalisisInvernadero, tamaño de la figura)
+    VISTAS = {
+        'carta': ('visualizar_carta_psicrometrica', (15, 10)),
+        'climograma': ('graficar_climograma', (14, 8)),
+        'perfil': ('analizar_perfil_vertical', (15, 10)),
+        'estres': ('analizar_estres_termico', (15, 10)),
+        'correlaciones': ('graficar_correlaciones', (15, 12)),
+        'series': ('graficar_series_temporales', (12, 15)),
+        'condensacion': ('graficar_riesgo_condensacion', (15, 10)),
+        'dpv': ('graficar_dpv', (15, 10)),
+        'simulacion': ('graficar_simulacion_control', (15, 10)),
+        'cargas': ('graficar_cargas_ventilacion', (15, 10)),
+    }
+    FORMATOS = ('png', 'svg', 'pdf')
+
+    def __init__(self, carpeta, vistas=None, formatos=('png',), altura=2240, dpi=100):
+        """
+        Args:
+            carpeta (str): Carpeta de salida de las figuras
+            vistas (list): Nombres de VISTAS a generar (None para todas)
+            formatos (tuple): Formatos de archivo (png, svg y/o pdf)
+            altura (float): Altura en msnm para calcular las propiedades
+            dpi (int): Resolución de las imágenes
+        """
+        vistas = list(self.VISTAS) if vistas is None else list(vistas)
+        desconocidas = [v for v in vistas if v not in self.VISTAS]
+        if desconocidas:
+            raise ValueError(f"Vistas desconocidas: {', '.join(desconocidas)}")
+        formatos = [f.lower() for f in formatos]
+        no_soportados = [f for f in formatos if f not in self.FORMATOS]
+        if no_soportados:
+            raise ValueError(f"Formatos no soportados: {', '.join(no_soportados)}")
+        self.carpeta = carpeta
+        self.vistas = vistas
+        self.formatos = formatos
+        self.altura = altura
+        self.dpi = dpi
+
+    def renderizar_archivo(self, ruta):
+        """
+        Carga un archivo de datos y guarda sus figuras.
+
+        Args:
+            ruta (str): Archivo de datos (CSV o Excel)
+
+        Returns:
+            list: Un dict por vista con 'archivo', 'vista', 'segundos', 'rutas'
+                  y, si falló, 'error'
+        """
+        from matplotlib.figure import Figure
+        from matplotlib.backends.backend_agg import FigureCanvasAgg
+
+        base = os.path.splitext(os.path.basename(ruta))[0]
+        try:
+            t0 = time.perf_counter()
+            datos = ManejadorDatos.cargar_archivo(ruta, interactivo=False)
+            datos['Fecha_Hora'] = pd.to_datetime(datos['Fecha_Hora'])
+            if not datos['Fecha_Hora'].is_monotonic_increasing:
+                datos = datos.sort_values('Fecha_Hora', kind='stable').reset_index(drop=True)
+            calculadora = CalculadoraPropiedades()
+            calculadora.agregar_propiedades(datos, calculadora.calcular_presion(self.altura))
+            analizador = AnalisisInvernadero(datos, calculadora)
+            carga = time.perf_counter() - t0
+        except Exception as e:
+            return [{'archivo': ruta, 'vista': 'carga', 'segundos': 0.0, 'rutas': [], 'error': str(e)}]
+
+        resultados = [{'archivo': ruta, 'vista': 'carga', 'segundos': carga, 'rutas': []}]
+        for vista in self.vistas:
+            metodo, figsize = self.VISTAS[vista]
+            resultado = {'archivo': ruta, 'vista': vista, 'rutas': []}
+            t0 = time.perf_counter()
+            fig = Figure(figsize=figsize, dpi=self.dpi)
+            FigureCanvasAgg(fig)
+            try:
+                getattr(analizador, metodo)(fig)
+                for formato in self.formatos:
+                    destino = os.path.join(self.carpeta, f"{base}_{vista}.{formato}")
+                    fig.savefig(destino, format=formato, dpi=self.dpi, bbox_inches='tight')
+                    resultado['rutas'].append(destino)
+            except Exception as e:
+                resultado['error'] = str(e)
+            finally:
+                fig.clear()
+            resultado['segundos'] = time.perf_counter() - t0
+            resultados.append(resultado)
+        return resultados
+
+    def ejecutar(self, archivos, procesos=None):
+        """
+        Renderiza las figuras de todos los archivos en un grupo de procesos.
+
+        Args:
+            archivos (list): Archivos de datos
+            procesos (int): Número de procesos (None para uno por núcleo)
+
+        Returns:
+            list: Resultados de renderizar_archivo de todos los archivos, en orden
+        """
+        from concurrent.futures import ProcessPoolExecutor
+
+        os.makedirs(self.carpeta, exist_ok=True)
+        if procesos == 1 or len(archivos) == 1:
+            return [r for ruta in archivos for r in self.renderizar_archivo(ruta)]
+        with ProcessPoolExecutor(max_workers=procesos) as grupo:
+            return [r for resultados in grupo.map(self.renderizar_archivo, archivos)
+                    for r in resultados]
+
+    @staticmethod
+    def informe(resultados):
+        """
+        Resume los tiempos de renderizado por archivo y vista.
+
+        Args:
+            resultados (list): Resultados de ejecutar
+
+        Returns:
+            str: Tabla de tiempos y errores
+        """
+        lineas = [f"{'Archivo':<40} {'Vista':<14} {'Tiempo (s)':>10}"]
+        for r in resultados:
+            nombre = os.path.basename(r['archivo'])
+            estado = f"  ERROR: {r['error']}" if 'error' in r else ''
+            lineas.append(f"{nombre:<40} {r['vista']:<14} {r['segundos']:>10.3f}{estado}")
+        total = sum(r['segundos'] for r in resultados)
+        errores = sum('error' in r for r in resultados)
+        lineas.append(f"Total: {total:.3f} s de trabajo, {errores} errores")
+        return "\n".join(lineas)
 
 
 if __name__ == "__main__":
-    calculadora = CalculadoraPropiedades()
-    interfaz = InterfazGraficaMejorada(calculadora)
-    interfaz.iniciar_interfaz()
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Análisis psicrométrico de invernaderos")
+    parser.add_argument('--lote', nargs='+', metavar='ARCHIVO',
+                        help="Genera las figuras de estos archivos sin abrir la interfaz")
+    parser.add_argument('--salida', default='figuras', help="Carpeta de salida del modo lote")
+    parser.add_argument('--vistas', nargs='+', choices=list(RenderizadorLote.VISTAS),
+                        help="Vistas a generar (por defecto todas)")
+    parser.add_argument('--formatos', nargs='+', default=['png'], choices=RenderizadorLote.FORMATOS)
+    parser.add_argument('--altura', type=float, default=2240, help="Altura en msnm")
+    parser.add_argument('--dpi', type=int, default=100)
+    parser.add_argument('--procesos', type=int, default=None,
+                        help="Procesos en paralelo (por defecto uno por núcleo)")
+    parser.add_argument('--alarmas', metavar='ARCHIVO',
+                        help="Reproduce un archivo histórico por el motor de alarmas")
+    parser.add_argument('--reglas', metavar='JSON', help="Archivo de reglas de alarma")
+    parser.add_argument('--velocidad', type=float, default=None,
+                        help="Veces el tiempo real de la reproducción (por defecto sin esperas)")
+    parser.add_argument('--depurar', action='store_true',
+                        help="Imprime el informe de tiempos de arranque de la interfaz")
+    args = parser.parse_args()
+
+    if args.alarmas:
+        motor = MotorAlarmas(MotorAlarmas.cargar_reglas(args.reglas),
+                             registro=os.path.splitext(args.alarmas)[0] + '_alarmas.log',
+                             al_evento=lambda e: print(f"{e['Fecha_Hora']}  {e['Mensaje']}"))
+        try:
+            motor.reproducir(args.alarmas, args.altura, args.velocidad)
+        finally:
+            motor.cerrar()
+    elif args.lote:
+        plt.switch_backend('Agg')
+        renderizador = RenderizadorLote(args.salida, args.vistas, args.formatos,
+                                        altura=args.altura, dpi=args.dpi)
+        print(RenderizadorLote.informe(renderizador.ejecutar(args.lote, args.procesos)))
+    else:
+        calculadora = CalculadoraPropiedades()
+        interfaz = InterfazGraficaMejorada(calculadora, depurar=args.depurar)
+        interfaz.iniciar_interfaz()